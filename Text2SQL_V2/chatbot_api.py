@@ -210,6 +210,7 @@ from Text2SQL_V2.agents.text2sql_agent import Text2SQLAgent
 from Text2SQL_V2.agents.summarizer_agent import SummarizerAgent
 from Text2SQL_V2.utils.intent import wants_chart
 from Text2SQL_V2.utils.persist import persist_order_log
+from Text2SQL_V2.utils.stage_timing import timed_stage
 import os
 from Text2SQL_V2.mailer import send_success_email
 from Text2SQL_V2.summary_generator import generate_llm_summary
@@ -342,8 +343,10 @@ summarizer = SummarizerAgent()
 
 
 def run_chatbot_query(question: str):
-    sql = t2s.run(question)
-    result = execute_sql(db_path, sql)
+    with timed_stage("sql_generation"):
+        sql = t2s.run(question)
+    with timed_stage("execution"):
+        result = execute_sql(db_path, sql)
 
     # ==================================================
     # WRITE operations handling (INSERT / UPDATE / DELETE)
@@ -382,10 +385,11 @@ def run_chatbot_query(question: str):
         for summary_attempt in range(1, summary_retries + 1):
             try:
                 logger.info(f"📧 Generating email summary (attempt {summary_attempt}/{summary_retries})...")
-                email_content = generate_llm_summary(
-                    sql_query=sql,
-                    row_count=rows_affected
-                )
+                with timed_stage("summarization"):
+                    email_content = generate_llm_summary(
+                        sql_query=sql,
+                        row_count=rows_affected
+                    )
                 
                 # Validate that email_content is a dict with required keys
                 if not isinstance(email_content, dict):
@@ -416,7 +420,8 @@ def run_chatbot_query(question: str):
         # Persist correct CSV (for INSERT/UPDATE/DELETE)
         # --------------------
         try:
-            persist_order_log(db_path, table)
+            with timed_stage("persist"):
+                persist_order_log(db_path, table)
             logger.info(f"✅ {table} persisted successfully")
         except Exception as e:
             logger.warning(f"Failed to persist {table}: {str(e)}")
@@ -426,10 +431,11 @@ def run_chatbot_query(question: str):
         # --------------------
         if email_content:
             try:
-                email_sent = send_success_email(
-                    subject=email_content["subject"],
-                    body=email_content["body"]
-                )
+                with timed_stage("email"):
+                    email_sent = send_success_email(
+                        subject=email_content["subject"],
+                        body=email_content["body"]
+                    )
                 if email_sent:
                     logger.info("✅ Success email sent")
                 else:
@@ -462,7 +468,8 @@ def run_chatbot_query(question: str):
         data = []
     else:
         try:
-            summary = summarizer.summarize(question, df)
+            with timed_stage("summarization"):
+                summary = summarizer.summarize(question, df)
         except Exception as e:
             logger.warning(f"Summarization failed: {str(e)}")
             summary = f"Query returned {len(df)} row(s)."
@@ -474,7 +481,8 @@ def run_chatbot_query(question: str):
     if wants_chart(question) and not df.empty:
         try:
             logger.info(f"Generating visualization for: {question}")
-            viz, mime = summarizer.generate_viz(question, df)
+            with timed_stage("viz"):
+                viz, mime = summarizer.generate_viz(question, df)
             logger.info("✅ Visualization generated successfully")
         except Exception as e:
             logger.warning(f"Visualization generation failed: {str(e)}")
@@ -12,6 +12,14 @@ class Config:
     GOOGLE_MODEL = "models/gemini-2.5-flash"
     OPENAI_MODEL = "gpt-4o-mini"
 
+    # Chatbot SQL with its EXPLAIN QUERY PLAN, one JSON line per query ("" disables)
+    QUERY_LOG_PATH = os.getenv(
+        "CHATBOT_QUERY_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_log.jsonl")
+    )
+    # Index (table, columns) scan patterns once seen this many times (off unless set)
+    AUTO_INDEX = os.getenv("CHATBOT_AUTO_INDEX", "0") == "1"
+    AUTO_INDEX_MIN_SCANS = int(os.getenv("CHATBOT_AUTO_INDEX_MIN_SCANS", "5"))
+
     if LLM_PROVIDER == "google" and not GOOGLE_API_KEY:
         print("⚠️ WARNING: GOOGLE_API_KEY is missing")
 
@@ -1,23 +1,157 @@
+from Text2SQL_V2.config import config
 from Text2SQL_V2.utils.persist import persist_order_log
+from Text2SQL_V2.utils.query_log import QueryPlanLog, create_index_sql, index_name
+import hashlib
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 import pandas as pd
 
+# One row per seed table: fingerprint of the CSV it was last built from
+FINGERPRINT_TABLE = "_source_fingerprints"
+
+# Applied to every connection. WAL lets readers run alongside a writer;
+# cache_size is in KiB when negative (64 MB), mmap_size in bytes (256 MB).
+SQLITE_PRAGMAS = (
+    ("busy_timeout", 5000),
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -65536),
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+)
+
+# Built with the seed tables: the sku / store / material filters and date
+# ranges generated queries use (composite keys serve their prefixes too)
+TABLE_INDEXES = {
+    "sku_daily_sales": [("sku_id", "store_id", "date"), ("store_id", "date"), ("date",)],
+    "sku_daily_forecast_7day": [("sku_id", "store_id", "date"), ("store_id", "date"), ("date",)],
+    "sku_daily_forecast_30day": [("sku_id", "store_id", "date"), ("store_id", "date"), ("date",)],
+    "sku_product_demand": [("sku_id", "store_id", "date"), ("product_id", "date")],
+    "sku_forecast": [("sku_id", "store_id")],
+    "sku_master": [("sku_id",), ("product_id",)],
+    "product_bom": [("product_id",), ("raw_material",)],
+    "raw_material_demand": [("raw_material", "date")],
+    "raw_material_inventory": [("raw_material", "date"), ("date",)],
+    "raw_material_inventory_ledger": [("raw_material", "date"), ("date",)],
+}
+
+_pool = threading.local()
+
+QUERY_LOG = QueryPlanLog(
+    config.QUERY_LOG_PATH,
+    auto_index=config.AUTO_INDEX,
+    min_scans=config.AUTO_INDEX_MIN_SCANS,
+)
+
+
+def open_connection(db_path, autocommit=True):
+    """
+    New connection with SQLITE_PRAGMAS applied. autocommit=False keeps
+    sqlite3's implicit transactions (needed for fast DataFrame.to_sql).
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None if autocommit else "")
+    for name, value in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def get_connection(db_path):
+    """This thread's connection to db_path, opened on first use and reused."""
+    if getattr(_pool, "pid", None) != os.getpid():
+        # Never reuse a connection inherited across a fork
+        _pool.pid, _pool.connections = os.getpid(), {}
+    conn = _pool.connections.get(db_path)
+    if conn is None:
+        conn = _pool.connections[db_path] = open_connection(db_path)
+    return conn
+
+
+@contextmanager
+def write_transaction(conn):
+    """BEGIN IMMEDIATE: take the write lock up front instead of failing mid-transaction."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
 def load_schema(schema_list):
     """
     Convert schema list into a dict describing tables + columns.
     """
     schema = {}
     for item in schema_list:
-        df = pd.read_csv(item["path"])
+        # Header only: column names without reading the rows
+        df = pd.read_csv(item["path"], nrows=0)
         schema[item["table_name"]] = list(df.columns)
     return schema
 
 
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _missing_indexes(conn, table):
+    """CREATE INDEX statements for table's TABLE_INDEXES entries it lacks (and has the columns for)."""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+    existing = {row[1] for row in conn.execute(f'PRAGMA index_list("{table}")')}
+    return [
+        create_index_sql(table, cols, prefix="idx")
+        for cols in TABLE_INDEXES.get(table, [])
+        if set(cols) <= columns and index_name(table, cols, prefix="idx") not in existing
+    ]
+
+
+def _stored_fingerprints(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha256 TEXT,
+            built_at REAL
+        )
+    """)
+    rows = conn.execute(f"SELECT table_name, size, mtime_ns, sha256 FROM {FINGERPRINT_TABLE}")
+    return {table: (size, mtime_ns, sha256) for table, size, mtime_ns, sha256 in rows}
+
+
+def _save_fingerprint(conn, table, size, mtime_ns, sha256):
+    conn.execute(
+        f"INSERT OR REPLACE INTO {FINGERPRINT_TABLE} VALUES (?, ?, ?, ?, ?)",
+        (table, size, mtime_ns, sha256, time.time()),
+    )
+
+
 # SEED_TABLES = {"dc_168h_forecasts", "store_168h_forecasts"}
 # TRANSACTIONAL_TABLES = {"order_log"}
 
 def build_database(schema_list, db_path="local.db"):
-    conn = sqlite3.connect(db_path)
+    """
+    Load the seed CSVs into db_path, rebuilding only the tables whose
+    source changed since the last build.
+
+    A table is current when its stored fingerprint matches the CSV: same
+    size and mtime, or (after a touch / copy) the same content hash.
+
+    Changed tables are loaded into a staging table and swapped in with one
+    write transaction, so readers always see a complete table and builds
+    running in several processes at once do not collide.
+    """
+    conn = open_connection(db_path, autocommit=False)
+    stored = _stored_fingerprints(conn)
+    conn.commit()
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    rebuilt = []
 
     for item in schema_list:
         table = item["table_name"]
@@ -52,20 +186,72 @@ def build_database(schema_list, db_path="local.db"):
 
 
         # For Seed Tables
+        stat = os.stat(item["path"])
+        previous = stored.get(table) if table in existing else None
+        if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            continue
+        sha256 = file_sha256(item["path"])
+        if previous is not None and previous[2] == sha256:
+            # Same content, new mtime: nothing to reload
+            with write_transaction(conn):
+                _save_fingerprint(conn, table, stat.st_size, stat.st_mtime_ns, sha256)
+            continue
+
         df = pd.read_csv(item["path"])
+        staging = f"{table}__staging_{os.getpid()}"
         # if table in SEED_TABLES:
-        df.to_sql(table, conn, if_exists="replace", index=False)
+        df.to_sql(staging, conn, if_exists="replace", index=False)
+        with write_transaction(conn):
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+            for statement in _missing_indexes(conn, table):
+                conn.execute(statement)
+            _save_fingerprint(conn, table, stat.st_size, stat.st_mtime_ns, sha256)
+        rebuilt.append(table)
 
         # elif table in TRANSACTIONAL_TABLES:
         #     df.head(0).to_sql(table, conn, if_exists="append", index=False)
 
+    # Current tables built before an index was added to TABLE_INDEXES
+    missing = [s for item in schema_list for s in _missing_indexes(conn, item["table_name"])]
+    if missing:
+        with write_transaction(conn):
+            for statement in missing:
+                conn.execute(statement)
+        print(f"[db_builder] {db_path}: created {len(missing)} missing index(es)")
+
+    conn.commit()
     conn.close()
+    print(f"[db_builder] {db_path}: rebuilt {len(rebuilt)} table(s) {rebuilt}" if rebuilt
+          else f"[db_builder] {db_path}: all tables current")
+    return rebuilt
+
+
 
+def _execute_write(conn, sql):
+    started = time.perf_counter()
+    with write_transaction(conn):
+        rows_affected = conn.execute(sql).rowcount
+    _log_query(conn, sql, time.perf_counter() - started, rows_affected)
+    return rows_affected
+
+
+def _log_query(conn, sql, seconds, rows):
+    """Query log entry with the plan; index recurring scans when auto-indexing is on."""
+    try:
+        for table, columns in QUERY_LOG.record(conn, sql, seconds, rows):
+            print(f"[db_builder] {table} scanned on {list(columns)} by "
+                  f"{QUERY_LOG.min_scans}+ queries: creating index")
+            with write_transaction(conn):
+                conn.execute(create_index_sql(table, columns))
+    except Exception as e:
+        # Logging must never fail the query itself
+        print(f"[db_builder] query log failed: {e}")
 
 
 def execute_sql(db_path, sql):
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+    # Pooled per thread: no connection setup per query
+    conn = get_connection(db_path)
 
     sql_clean = sql.strip().lower()
 
@@ -74,8 +260,9 @@ def execute_sql(db_path, sql):
         # READ queries
         # --------------------
         if sql_clean.startswith("select"):
+            started = time.perf_counter()
             df = pd.read_sql_query(sql, conn)
-            conn.close()
+            _log_query(conn, sql, time.perf_counter() - started, len(df))
             return df
 
         # --------------------
@@ -90,11 +277,7 @@ def execute_sql(db_path, sql):
                     "INSERT is only allowed on order_log or raw_material_log tables"
                 )
 
-            cur.execute(sql)
-            conn.commit()
-            rows_affected = cur.rowcount
-            conn.close()
-            return rows_affected
+            return _execute_write(conn, sql)
 
         # --------------------
         # UPDATE (allowed tables)
@@ -108,11 +291,7 @@ def execute_sql(db_path, sql):
                     "UPDATE is only allowed on order_log or raw_material_log tables"
                 )
 
-            cur.execute(sql)
-            conn.commit()
-            rows_affected = cur.rowcount
-            conn.close()
-            return rows_affected
+            return _execute_write(conn, sql)
 
         # --------------------
         # DELETE (allowed tables)
@@ -126,11 +305,7 @@ def execute_sql(db_path, sql):
                     "DELETE is only allowed on order_log or raw_material_log tables"
                 )
 
-            cur.execute(sql)
-            conn.commit()
-            rows_affected = cur.rowcount
-            conn.close()
-            return rows_affected
+            return _execute_write(conn, sql)
 
         # --------------------
         # BLOCK everything else
@@ -141,5 +316,4 @@ def execute_sql(db_path, sql):
 
 
     except Exception as e:
-        conn.close()
         raise RuntimeError(f"SQL execution failed: {e}")
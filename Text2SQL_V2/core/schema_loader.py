@@ -3,4 +3,4 @@ class SchemaLoader:
     def __init__(self, schema):
         self.schema = schema
     def load(self):
-        return [{"table_name": t["table_name"], "columns": list(pd.read_csv(t["path"]).columns)} for t in self.schema]
+        return [{"table_name": t["table_name"], "columns": list(pd.read_csv(t["path"], nrows=0).columns)} for t in self.schema]
@@ -3,6 +3,10 @@ from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 def load_llm(temp=0, max_tokens=None):
+    if config.LLM_PROVIDER == "stub":
+        from Text2SQL_V2.utils.stub_llm import StubLLM
+        return StubLLM()
+
     if config.LLM_PROVIDER == "openai":
         return ChatOpenAI(
             model=config.OPENAI_MODEL,
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+# EXPLAIN QUERY PLAN details (SQLite >= 3.24; older versions say "SCAN TABLE t")
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+# SQLite built a throwaway index for this query: a permanent one would do
+AUTOMATIC_INDEX = re.compile(r"^SEARCH (?:TABLE )?(\w+)(?: AS \w+)? USING AUTOMATIC (?:COVERING |PARTIAL )*INDEX \(([^)]*)\)")
+
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+\"?(\w+)\"?(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|GROUP|ORDER|LIMIT|INNER|LEFT|CROSS|NATURAL|USING)\b)(\w+))?", re.IGNORECASE)
+PREDICATE = re.compile(r"(?:\b(\w+)\.)?\b(\w+)\b\s*(=|==|\bIN\b|<=|>=|<|>|\bBETWEEN\b)", re.IGNORECASE)
+EQUALITY_OPS = ("=", "==", "in")
+
+
+def index_name(table, columns, prefix="auto_idx"):
+    return f"{prefix}_{table}_{'_'.join(columns)}"
+
+
+def create_index_sql(table, columns, prefix="auto_idx"):
+    cols = ", ".join(f'"{c}"' for c in columns)
+    return f'CREATE INDEX IF NOT EXISTS "{index_name(table, columns, prefix)}" ON "{table}" ({cols})'
+
+
+def _aliases(sql):
+    """{name or alias used in the query: table}."""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table.lower()] = table
+        if alias:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def scan_patterns(sql, plan, table_columns):
+    """
+    [(table, columns)] for every table the plan reads without a usable index.
+
+    columns is the index that would serve the query: equality-filtered
+    columns first, then one range-filtered column (from the SQL's
+    predicates; empty when nothing filters the table).
+    """
+    aliases = _aliases(sql)
+    patterns = []
+    for detail in plan:
+        automatic = AUTOMATIC_INDEX.match(detail)
+        if automatic:
+            table = aliases.get(automatic.group(1).lower(), automatic.group(1))
+            columns = tuple(part.split("=")[0].strip() for part in automatic.group(2).split(" AND "))
+            patterns.append((table, columns))
+            continue
+        scan = FULL_SCAN.match(detail)
+        if not scan:
+            continue
+        name = scan.group(1).lower()
+        table = aliases.get(name, scan.group(1))
+        columns = table_columns(table)
+        if not columns:
+            continue  # subquery / CTE, not a stored table
+
+        equality, ranges = [], []
+        for qualifier, column, op in PREDICATE.findall(sql):
+            if column not in columns:
+                continue
+            if qualifier and aliases.get(qualifier.lower()) != table:
+                continue
+            target = equality if op.lower() in EQUALITY_OPS else ranges
+            if column not in target:
+                target.append(column)
+        ranges = [c for c in ranges if c not in equality]
+        patterns.append((table, tuple(equality + ranges[:1])))
+    return patterns
+
+
+class QueryPlanLog:
+    """
+    Logs each chatbot query with its EXPLAIN QUERY PLAN to a JSON-lines
+    file and counts recurring scan patterns. With auto_index, record()
+    returns each (table, columns) pattern once it was seen min_scans times,
+    for the caller to index.
+    """
+
+    def __init__(self, path, auto_index=False, min_scans=5, max_bytes=10_000_000):
+        self.path = path
+        self.auto_index = auto_index
+        self.min_scans = min_scans
+        self.max_bytes = max_bytes
+        self.scans = Counter()  # {(table, columns): queries}
+        self.created = set()
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def _table_columns(self, conn, table):
+        if table not in self._columns:
+            self._columns[table] = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+        return self._columns[table]
+
+    def record(self, conn, sql, seconds, rows=None):
+        """Explain sql on conn, log it and count its scans; returns the patterns now due an index."""
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        patterns = [
+            p for p in scan_patterns(sql, plan, lambda table: self._table_columns(conn, table)) if p[1]
+        ]
+        entry = {
+            "ts": time.time(),
+            "sql": sql,
+            "ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "plan": plan,
+            "scans": [{"table": table, "columns": list(columns)} for table, columns in patterns],
+        }
+
+        due = []
+        with self._lock:
+            for pattern in patterns:
+                self.scans[pattern] += 1
+                if self.auto_index and self.scans[pattern] >= self.min_scans and pattern not in self.created:
+                    self.created.add(pattern)
+                    due.append(pattern)
+            if self.path:
+                self._append(entry)
+        return due
+
+    def _append(self, entry):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def recommendations(self, min_scans=None):
+        """[{"table", "columns", "queries", "sql"}] for patterns seen at least min_scans times."""
+        return recommend(self.scans, self.min_scans if min_scans is None else min_scans)
+
+
+def recommend(scans, min_scans):
+    return [
+        {"table": table, "columns": list(columns), "queries": count, "sql": create_index_sql(table, columns)}
+        for (table, columns), count in scans.most_common()
+        if count >= min_scans
+    ]
+
+
+def read_scans(path):
+    """Scan pattern counts from a query log file."""
+    scans = Counter()
+    with open(path) as f:
+        for line in f:
+            for scan in json.loads(line).get("scans", []):
+                scans[(scan["table"], tuple(scan["columns"]))] += 1
+    return scans
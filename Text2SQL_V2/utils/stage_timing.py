@@ -0,0 +1,24 @@
+import time
+from contextlib import contextmanager
+
+# callback(stage, seconds, ok) for every timed chatbot stage
+_observers = []
+
+
+def add_stage_observer(callback):
+    """Report chatbot stage durations to callback (e.g. a metrics histogram)."""
+    _observers.append(callback)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Time one stage of a chatbot query; ok is False when it raised."""
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        seconds = time.perf_counter() - started
+        for callback in _observers:
+            callback(stage, seconds, ok)
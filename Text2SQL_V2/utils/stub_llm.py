@@ -0,0 +1,37 @@
+import os
+import time
+import zlib
+
+from langchain_core.messages import AIMessage
+
+# Simulated LLM round trip in seconds (LLM_PROVIDER=stub)
+STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0.8"))
+
+# Read-only queries over the chatbot tables; one is picked per question
+STUB_QUERIES = (
+    "SELECT sku_id, SUM(actual_sales_units) AS total_sales FROM sku_daily_sales "
+    "GROUP BY sku_id ORDER BY total_sales DESC LIMIT 5",
+    "SELECT date, SUM(forecast_units) AS forecast_units FROM sku_daily_forecast_7day "
+    "GROUP BY date ORDER BY date",
+    "SELECT raw_material, SUM(material_demand_units) AS demand FROM raw_material_demand "
+    "GROUP BY raw_material ORDER BY demand DESC",
+    "SELECT raw_material, closing_inventory, safety_stock FROM raw_material_inventory "
+    "WHERE closing_inventory < safety_stock ORDER BY date DESC LIMIT 20",
+)
+
+STUB_SUMMARY = "- Stub summary: results returned without an LLM call.\n- Latency is simulated."
+
+
+class StubLLM:
+    """Offline stand-in for the chat model (load tests): canned answers after a fixed delay."""
+
+    def __init__(self, latency: float = STUB_LATENCY):
+        self.latency = latency
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        prompt = str(prompt)
+        if "SQLite SQL generator" in prompt:
+            # Same question, same query (prompt text is fixed apart from the question)
+            return AIMessage(content=STUB_QUERIES[zlib.crc32(prompt.encode()) % len(STUB_QUERIES)])
+        return AIMessage(content=STUB_SUMMARY)
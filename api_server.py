@@ -1,11 +1,39 @@
 import os
 import pandas as pd
 import numpy as np
+import base64
+import time
 import traceback
-from flask import Flask, jsonify, request, send_from_directory
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from datetime import timedelta
-from Text2SQL_V2.chatbot_api import run_chatbot_query
+from cache_prewarm import CachePrewarmer, PopularRequests
+from chatbot_service import ChatbotService, ChatbotUnavailable
+from dataset_cache import DatasetCache
+from json_provider import OrjsonProvider, raw_json
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, STAGE_BUCKETS, MetricsRegistry
+from response_cache import ResponseCache
+from static_assets import StaticManifest, serve_asset, serve_index
+from request_timing import (
+    PROFILE_ENGINES,
+    PROFILE_SORT_KEYS,
+    TIMING_REQUEST_HEADER,
+    finish_timing,
+    mark_section,
+    profile_call,
+    start_timing,
+)
+from table_index import TableIndex
+from dashboard_cube import (
+    CUBE_FILE,
+    SOURCE_FILES as CUBE_SOURCE_FILES,
+    build_cube_from_sources,
+    split_cube,
+)
+import duckdb_engine
+from Text2SQL_V2.utils.stage_timing import add_stage_observer
 
 # =========================================================
 # APP CONFIGURATION - Connect to Woodland Frontend
@@ -13,10 +41,11 @@ from Text2SQL_V2.chatbot_api import run_chatbot_query
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 WOODLAND_DIST_DIR = os.path.join(BASE_DIR, "Woodland", "dist")
 
-if os.path.exists(WOODLAND_DIST_DIR):
-    app = Flask(__name__, static_folder=WOODLAND_DIST_DIR, static_url_path="")
-else:
-    app = Flask(__name__)
+# The built frontend is served from a manifest (see FRONTEND SERVING ROUTES)
+app = Flask(__name__, static_folder=None)
+
+# orjson encoder: NumPy scalars/arrays and DataFrames serialized natively
+app.json = OrjsonProvider(app)
 
 # =========================================================
 # DATE RANGE HELPER
@@ -77,7 +106,7 @@ CORS(app, resources={
             "https://woodland-final-lxcg.onrender.com"
         ],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", TIMING_REQUEST_HEADER]
     }
 })
 
@@ -86,6 +115,85 @@ CORS(app, resources={
 # =========================================================
 DATA_DIR = os.path.join(BASE_DIR, "datasets")
 
+# Cached frames are shared across requests; copy-on-write guarantees a
+# handler's column edits never leak back into the cache (default in pandas 3).
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Served on /api/metrics (Prometheus text format, see METRICS below)
+METRICS = MetricsRegistry()
+HTTP_REQUESTS = METRICS.counter(
+    "woodland_http_requests_total", "HTTP requests by route, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_LATENCY = METRICS.histogram(
+    "woodland_http_request_duration_seconds", "HTTP request latency by route.",
+    ("route", "method"),
+)
+CHATBOT_STAGE_LATENCY = METRICS.histogram(
+    "woodland_chatbot_stage_duration_seconds", "Chatbot query stage latency (LLM, SQL, email).",
+    ("stage", "outcome"), STAGE_BUCKETS,
+)
+DATASET_LOAD_LATENCY = METRICS.histogram(
+    "woodland_dataset_load_duration_seconds", "Dataset (re)load time by file and source.",
+    ("file", "source"),
+)
+
+DATASET_CACHE = DatasetCache(
+    DATA_DIR,
+    on_load=lambda filename, seconds, mapped: DATASET_LOAD_LATENCY.observe(
+        seconds, filename, "arrow" if mapped else "csv"
+    ),
+)
+
+RESPONSE_CACHE = ResponseCache(
+    max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+# Serialized dashboard panel fragments (see DASHBOARD PANELS)
+PANEL_CACHE = ResponseCache(
+    max_entries=int(os.environ.get("PANEL_CACHE_MAX_ENTRIES", 2048)),
+    max_bytes=int(os.environ.get("PANEL_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+# Dashboard query params that shape a response, with the handler defaults.
+# Filter dimensions treat missing, empty and "all" the same.
+DASHBOARD_FILTER_PARAMS = ("channel", "store", "sku", "product", "rawMaterial", "category")
+DASHBOARD_OPTION_DEFAULTS = {"dateRange": "next-30", "aggregation": "daily", "rollingWindow": "7"}
+
+# /api/debug/profile is only routed when this is set (it reruns requests cold)
+PROFILING_ENDPOINT_ENABLED = os.environ.get("ENABLE_PROFILING_ENDPOINT", "").lower() in ("1", "true", "yes")
+
+# WSGI environ flag set on profiled requests: skip the response and panel caches
+CACHE_BYPASS_ENVIRON_KEY = "woodland.bypass_cache"
+
+# Popular dashboard filter combinations re-requested after each pipeline
+# run, in every horizon x aggregation (see CACHE PREWARMING); 0 disables
+PREWARM_TOP_N = int(os.environ.get("PREWARM_TOP_N", 20))
+PREWARM_VARIANTS = [
+    {"dateRange": date_range, "aggregation": aggregation}
+    for date_range in ("next-7", "next-30")
+    for aggregation in ("daily", "weekly")
+]
+PREWARM_VARIANT_PARAMS = ("dateRange", "aggregation")
+PREWARM_ENVIRON_KEY = "woodland.prewarm"
+
+# Dashboard aggregation engine: "pandas" (default) or "duckdb" (see duckdb_engine.py)
+DASHBOARD_ENGINE = os.environ.get("DASHBOARD_ENGINE", "pandas").lower()
+if DASHBOARD_ENGINE not in ("pandas", "duckdb"):
+    raise ValueError(f"DASHBOARD_ENGINE must be pandas or duckdb, got {DASHBOARD_ENGINE!r}")
+if DASHBOARD_ENGINE == "duckdb" and not duckdb_engine.available():
+    print("Warning: DASHBOARD_ENGINE=duckdb but duckdb is not installed; using pandas.")
+    DASHBOARD_ENGINE = "pandas"
+
+# /api/batch: sub-requests per call, and threads running the heavy ones
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 20))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 4))
+
+# Seconds a chat request waits for the chatbot to finish warming up before a 503
+CHATBOT_WAIT_SECONDS = float(os.environ.get("CHATBOT_WAIT_SECONDS", 10))
+
 # =========================================================
 # HELPERS
 # =========================================================
@@ -99,15 +207,727 @@ def json_safe(value):
     return value
 
 def load_csv(filename):
-    path = os.path.join(DATA_DIR, filename)
-    if not os.path.exists(path):
-        print(f"Warning: {filename} not found.")
-        return pd.DataFrame()
+    """Parsed dataset from the shared cache (dates already parsed)."""
+    return DATASET_CACHE.get(filename)
+
+# =========================================================
+# REQUEST TIMING (opt-in Server-Timing, see request_timing.py)
+# =========================================================
+@app.before_request
+def start_request_timing():
+    start_timing(request.headers)
+
+
+@app.after_request
+def add_server_timing(response):
+    return finish_timing(response, request.path)
+
+
+# =========================================================
+# METRICS (request counts / latency, cache gauges)
+# =========================================================
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get("metrics_started")
+    # Pre-warm requests are background work, not traffic
+    if started is not None and not request.environ.get(PREWARM_ENVIRON_KEY):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+        HTTP_LATENCY.observe(time.perf_counter() - started, route, request.method)
+    return response
+
+
+add_stage_observer(
+    lambda stage, seconds, ok: CHATBOT_STAGE_LATENCY.observe(seconds, stage, "ok" if ok else "error")
+)
+
+
+def _cache_stats():
+    """{cache name: stats} for the dataset, response and panel caches."""
+    return {
+        "datasets": DATASET_CACHE.stats(),
+        "responses": RESPONSE_CACHE.stats(),
+        "panels": PANEL_CACHE.stats(),
+    }
+
+
+def _collect_cache_lookups():
+    for cache, stats in _cache_stats().items():
+        yield (cache, "hit"), stats["hits"]
+        yield (cache, "miss"), stats["misses"]
+
+
+METRICS.counter_callback(
+    "woodland_cache_lookups_total", "Cache lookups by cache and result.",
+    ("cache", "result"), _collect_cache_lookups,
+)
+METRICS.gauge_callback(
+    "woodland_cache_hit_ratio", "Cache hit ratio since start.",
+    ("cache",), lambda: (((cache,), stats["hitRatio"]) for cache, stats in _cache_stats().items()),
+)
+METRICS.gauge_callback(
+    "woodland_cache_entries", "Entries held per cache.",
+    ("cache",), lambda: (((cache,), stats["entries"]) for cache, stats in _cache_stats().items()),
+)
+METRICS.gauge_callback(
+    "woodland_cache_bytes", "Bytes held per cache (dataset frames: pandas deep memory usage).",
+    ("cache",), lambda: (
+        ((cache,), stats["memoryBytes"] if cache == "datasets" else stats["bytes"])
+        for cache, stats in _cache_stats().items()
+    ),
+)
+METRICS.counter_callback(
+    "woodland_cache_evictions_total", "LRU evictions per response cache.",
+    ("cache",), lambda: (
+        ((cache,), stats["evictions"]) for cache, stats in _cache_stats().items() if "evictions" in stats
+    ),
+)
+METRICS.counter_callback(
+    "woodland_dataset_reloads_total", "Datasets reloaded after their file changed.",
+    (), lambda: [((), DATASET_CACHE.stats()["reloads"])],
+)
+METRICS.gauge_callback(
+    "woodland_dataset_memory_bytes", "Memory held per loaded dataset.",
+    ("file",), lambda: (((f["file"],), f["memoryBytes"]) for f in DATASET_CACHE.stats()["files"]),
+)
+METRICS.gauge_callback(
+    "woodland_dataset_rows", "Rows per loaded dataset.",
+    ("file",), lambda: (((f["file"],), f["rows"]) for f in DATASET_CACHE.stats()["files"]),
+)
+
+
+# =========================================================
+# RESPONSE CACHE
+# =========================================================
+def dashboard_arg(args, name):
+    """Normalized value of one dashboard query param."""
+    if name in DASHBOARD_FILTER_PARAMS:
+        return args.get(name) or "all"
+    return args.get(name, DASHBOARD_OPTION_DEFAULTS[name])
+
+
+def dashboard_cache_key(path, args, datasets):
+    """(path, version of datasets, normalized filters and panels) for a dashboard request."""
+    params = tuple(
+        (name, dashboard_arg(args, name))
+        for name in DASHBOARD_FILTER_PARAMS + tuple(DASHBOARD_OPTION_DEFAULTS)
+    )
+    panels = ",".join(sorted({p.strip() for p in (args.get("panels") or "all").split(",")}))
+    return (path, DATASET_CACHE.files_version(datasets), params + (("panels", panels),))
+
+
+def cached_dashboard(datasets):
+    """
+    Serve a dashboard from RESPONSE_CACHE, computing it only on a miss.
+
+    datasets: the files the dashboard reads; cached responses expire only
+    when one of them changes.
+
+    Responses carry a strong ETag; a matching If-None-Match gets 304.
+    Only successful responses are cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.environ.get(CACHE_BYPASS_ENVIRON_KEY):
+                return view(*args, **kwargs)
+
+            key = dashboard_cache_key(request.path, request.args, datasets)
+            if not request.environ.get(PREWARM_ENVIRON_KEY):
+                POPULAR_DASHBOARD_REQUESTS.record(
+                    request.path, [(name, value) for name, value in key[2] if name not in PREWARM_VARIANT_PARAMS]
+                )
+            entry = RESPONSE_CACHE.get(key)
+            cache_status = "HIT"
+
+            if entry is None:
+                cache_status = "MISS"
+                response = app.make_response(view(*args, **kwargs))
+                mark_section("encode")
+                if response.status_code != 200:
+                    return response
+                entry = RESPONSE_CACHE.put(key, response.get_data(), response.mimetype)
+            mark_section("responseCache")
+
+            response = app.response_class(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.headers["Cache-Control"] = "no-cache"
+            response.headers["X-Cache"] = cache_status
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
+
+
+# =========================================================
+# CACHE PREWARMING (see cache_prewarm.py)
+# =========================================================
+POPULAR_DASHBOARD_REQUESTS = PopularRequests()
+
+
+def dashboard_data_version():
+    """Version of every file a cached dashboard reads; changes trigger a pre-warm."""
+    return DATASET_CACHE.files_version(tuple(dict.fromkeys(CONSUMPTION_DATASETS + SALES_DATASETS)))
+
+
+def prewarm_dashboard(path, params):
+    """Compute one dashboard response into the response and panel caches."""
+    response = app.test_client().get(path, query_string=params, environ_overrides={PREWARM_ENVIRON_KEY: True})
+    if response.status_code != 200:
+        print(f"Pre-warm of {path} {params} returned {response.status_code}")
+
+
+CACHE_PREWARMER = CachePrewarmer(
+    POPULAR_DASHBOARD_REQUESTS,
+    version=dashboard_data_version,
+    fetch=prewarm_dashboard,
+    variants=PREWARM_VARIANTS,
+    top_n=PREWARM_TOP_N,
+)
+
+
+@app.before_request
+def start_cache_prewarmer():
+    # Started in the serving process, so a pre-fork parent never owns the thread
+    CACHE_PREWARMER.ensure_started()
+
+
+# =========================================================
+# DASHBOARD PANELS
+# =========================================================
+# Each panel declares the response keys it fills, the query params and
+# datasets it depends on, and the panels it needs computed alongside.
+# Handlers compute only the requested panels (?panels=kpis,trend; default
+# all) and memoize each fragment in PANEL_CACHE under its own params, so
+# e.g. a new rollingWindow recomputes the rolling error chart only.
+#
+# Every panel reads the dashboard's aggregates (see DASHBOARD ENGINES),
+# so its datasets are everything those load.
+CONSUMPTION_DATASETS = (
+    "raw_material_demand.csv",
+    "product_bom_expanded.csv",
+    "raw_material_inventory_ledger.csv",
+    "sku_daily_forecast.csv",
+    "sku_daily_sales.csv",
+    "sku_master.csv",
+    "product_bom.csv",
+) + CUBE_SOURCE_FILES + (CUBE_FILE,)
+CONSUMPTION_PARAMS = DASHBOARD_FILTER_PARAMS + ("dateRange",)
+
+CONSUMPTION_PANELS = {
+    "kpis": {"keys": ("kpis",), "params": CONSUMPTION_PARAMS, "datasets": CONSUMPTION_DATASETS},
+    "trend": {
+        "keys": ("rawMaterialDemandTrend",),
+        "params": CONSUMPTION_PARAMS + ("aggregation",),
+        "datasets": CONSUMPTION_DATASETS,
+    },
+    "comparison": {"keys": ("forecastComparison",), "params": CONSUMPTION_PARAMS, "datasets": CONSUMPTION_DATASETS},
+    "funnel": {"keys": ("demandFlowFunnel",), "params": CONSUMPTION_PARAMS, "datasets": CONSUMPTION_DATASETS},
+    "heatmap": {"keys": ("consumptionErrorHeatmap",), "params": CONSUMPTION_PARAMS, "datasets": CONSUMPTION_DATASETS},
+    "riskTable": {"keys": ("rawMaterialRiskTable",), "params": CONSUMPTION_PARAMS, "datasets": CONSUMPTION_DATASETS},
+}
+
+SALES_DATASETS = (
+    "sku_daily_forecast.csv",
+    "sku_daily_sales.csv",
+    "sku_master.csv",
+) + CUBE_SOURCE_FILES + (CUBE_FILE,)
+SALES_FILTER_PARAMS = ("channel", "store", "sku", "product", "category")
+SALES_PARAMS = SALES_FILTER_PARAMS + ("dateRange",)
+# Accuracy KPI baseline: last 30 days of sales (more stable than matching the forecast period)
+SALES_ACCURACY_BASELINE_DAYS = 30
+
+SALES_PANELS = {
+    # highRiskSKUsCount comes from the SKU performance table
+    "kpis": {"keys": ("kpis",), "params": SALES_PARAMS, "datasets": SALES_DATASETS, "requires": ("performance",)},
+    "trend": {"keys": ("skuSalesTrend",), "params": SALES_PARAMS, "datasets": SALES_DATASETS},
+    "performance": {"keys": ("skuPerformance",), "params": SALES_PARAMS, "datasets": SALES_DATASETS},
+    "riskAlerts": {
+        "keys": ("riskAlerts", "highRiskSkus"),
+        "params": SALES_PARAMS,
+        "datasets": SALES_DATASETS,
+        "requires": ("performance",),
+    },
+    "heatmap": {"keys": ("skuContributionHeatmap",), "params": SALES_PARAMS, "datasets": SALES_DATASETS},
+    "topDrivers": {"keys": ("topDemandDrivers",), "params": SALES_PARAMS, "datasets": SALES_DATASETS},
+    "rollingError": {
+        "keys": ("rollingError",),
+        "params": SALES_PARAMS + ("rollingWindow",),
+        "datasets": SALES_DATASETS,
+    },
+    "deviation": {"keys": ("forecastDeviationHistogram",), "params": SALES_PARAMS, "datasets": SALES_DATASETS},
+}
+
+
+class PanelRequestError(ValueError):
+    """Invalid ?panels= value (mapped to HTTP 400)."""
+
+
+def requested_panels(specs):
+    """Panel names from ?panels= (comma-separated), in request order; all by default."""
+    raw = request.args.get("panels")
+    if not raw or raw == "all":
+        return list(specs)
+
+    panels = list(dict.fromkeys(p.strip() for p in raw.split(",") if p.strip()))
+    unknown = [p for p in panels if p not in specs]
+    if unknown:
+        raise PanelRequestError(
+            f"Unknown panel(s): {', '.join(unknown)}. Available: {', '.join(specs)}"
+        )
+    return panels
+
+
+def panel_cache_keys(dashboard, specs):
+    """{panel: (dashboard, panel, version of its datasets, its normalized params)}."""
+    versions = {}
+    keys = {}
+    for panel, spec in specs.items():
+        datasets = spec["datasets"]
+        if datasets not in versions:
+            versions[datasets] = DATASET_CACHE.files_version(datasets)
+        params = tuple((name, dashboard_arg(request.args, name)) for name in spec["params"])
+        keys[panel] = (dashboard, panel, versions[datasets], params)
+    return keys
+
+
+def cached_panels(keys, specs, panels):
+    """
+    (memoized fragments {panel: {key: value}}, set of panels to compute).
+
+    Panels to compute include the ones a missing panel requires.
+    """
+    fragments = {}
+    compute = set()
+    bypass = request.environ.get(CACHE_BYPASS_ENVIRON_KEY)
+    for panel in panels:
+        entry = None if bypass else PANEL_CACHE.get(keys[panel])
+        if entry is None:
+            compute.add(panel)
+            compute.update(specs[panel].get("requires", ()))
+        else:
+            fragments[panel] = app.json.loads(entry.body)
+    mark_section("panelCache")
+    return fragments, compute
+
+
+def store_panels(keys, computed):
+    """Memoize freshly computed fragments and return them."""
+    for panel, fragment in computed.items():
+        PANEL_CACHE.put(keys[panel], app.json.dumps(fragment).encode())
+    mark_section("encode")
+    return computed
+
+
+def panel_response(panels, fragments):
+    """Response body: the requested panels' keys plus the horizon metadata."""
+    forecast_days = get_forecast_horizon_days(dashboard_arg(request.args, "dateRange"))
+    body = {
+        "forecastCutoffDate": FORECAST_CUTOFF_DATE.strftime('%Y-%m-%d'),  # Cutoff date for UI visualization
+        "forecastHorizon": f"{forecast_days}day",
+        "historicalDays": forecast_days,  # Historical period matches the forecast period
+    }
+    for panel in panels:
+        body.update(fragments[panel])
+    return body
+
+
+# =========================================================
+# DASHBOARD AGGREGATE CUBE
+# =========================================================
+def _cube_file_is_fresh():
+    """The published cube is newer than every dataset it was built from."""
+    cube_path = os.path.join(DATA_DIR, CUBE_FILE)
+    if not os.path.exists(cube_path):
+        return False
+    cube_mtime = os.path.getmtime(cube_path)
+    for filename in CUBE_SOURCE_FILES:
+        path = os.path.join(DATA_DIR, filename)
+        if os.path.exists(path) and os.path.getmtime(path) > cube_mtime:
+            return False
+    return True
+
+
+def _build_cube_grains(*frames):
+    *source_frames, cube = frames
+    if not cube.empty and _cube_file_is_fresh():
+        return split_cube(cube)
+    # Cube stage not run since the last pipeline change: aggregate in-process
+    return split_cube(build_cube_from_sources(dict(zip(CUBE_SOURCE_FILES, source_frames))))
+
+
+def load_cube():
+    """Dashboard cube grains ({grain: DataFrame}), rebuilt when any input changes."""
+    return DATASET_CACHE.derive(
+        "dashboard_cube", CUBE_SOURCE_FILES + (CUBE_FILE,), _build_cube_grains
+    )
+
+
+def cube_slice(grain, start=None, end=None, **dims):
+    """
+    Rows of one cube grain with start <= date <= end and matching dimensions.
+
+    Dimension values may be a scalar or a collection; None means no filter.
+    """
+    df = load_cube()[grain]
+    if df.empty:
+        return df
+
+    # Grains are sorted by date: bound the window by binary search
+    dates = df["date"].to_numpy()
+    lo = 0 if start is None else dates.searchsorted(np.datetime64(start), side="left")
+    hi = len(df) if end is None else dates.searchsorted(np.datetime64(end), side="right")
+    df = df.iloc[lo:hi]
+
+    for col, value in dims.items():
+        if value is None:
+            continue
+        if pd.api.types.is_list_like(value):
+            df = df[df[col].isin(value)]
+        else:
+            df = df[df[col] == value]
+    return df
+
+
+def weighted_units(values, channel_weight):
+    """Unit values scaled by the channel weight, each row rounded to an int."""
+    if channel_weight >= 1.0:
+        return values
+    return (values * channel_weight).round().astype(int)
+
+
+def apply_channel_weight(df, cols, channel_weight):
+    """Scale one or more unit columns by the channel weight (see weighted_units)."""
+    if channel_weight >= 1.0 or df.empty:
+        return df
+    if isinstance(cols, str):
+        cols = (cols,)
+    return df.assign(**{col: weighted_units(df[col], channel_weight) for col in cols if col in df.columns})
+
+
+# =========================================================
+# FILTER INDEXES
+# =========================================================
+FILTER_INDEX_FILES = (
+    "product_bom.csv",
+    "sku_master.csv",
+    "sku_daily_sales.csv",
+    "sku_daily_forecast.csv",
+    "raw_material_demand.csv",
+)
+
+
+def _sorted_str(values):
+    return sorted(str(v) for v in values)
+
+
+def _unique_values(df, column):
+    if df.empty or column not in df.columns:
+        return []
+    return _sorted_str(df[column].dropna().unique())
+
+
+def _grouped_values(df, key, column):
+    """{key value: sorted str values of column} over the rows of df."""
+    if df.empty or not {key, column}.issubset(df.columns):
+        return {}
+    return {k: _sorted_str(v) for k, v in df.groupby(key, sort=False)[column].unique().items()}
+
+
+def _build_filter_index(df_bom, df_sku_master, df_sales, df_forecast, df_demand):
+    has_bom = not df_bom.empty and "raw_material" in df_bom.columns
+    has_categories = not df_sku_master.empty and "category" in df_sku_master.columns
+
+    # category → SKUs, restricted to SKUs that have forecast data
+    forecast_skus = set(_sorted_str(df_forecast["sku_id"].unique())) if not df_forecast.empty else set()
+    skus_by_category = {
+        category: [sku for sku in skus if sku in forecast_skus]
+        for category, skus in _grouped_values(df_sku_master, "category", "sku_id").items()
+    }
+
+    # sku → stores, from both sales and forecast data
+    stores_by_sku = {}
+    for df in (df_sales, df_forecast):
+        if df.empty or "store_id" not in df.columns:
+            continue
+        for sku, stores in df.groupby("sku_id", sort=False)["store_id"].unique().items():
+            stores_by_sku.setdefault(sku, set()).update(stores)
+
+    return {
+        "metadata": {
+            "channels": _unique_values(df_sales, "sales_channel"),
+            "stores": _unique_values(df_sales, "store_id"),
+            "skus": _unique_values(df_forecast, "sku_id"),
+            "products": _unique_values(df_sku_master, "product_id"),
+            "categories": _unique_values(df_sku_master, "category"),
+            "rawMaterials": _unique_values(df_demand, "raw_material"),
+            "forecastHorizons": _unique_values(df_forecast, "forecast_horizon"),
+        },
+        "products_by_raw_material": _grouped_values(df_bom, "raw_material", "product_id") if has_bom else None,
+        "raw_materials_by_product": _grouped_values(df_bom, "product_id", "raw_material") if has_bom else None,
+        "skus_by_category": skus_by_category if has_categories else None,
+        "stores_by_sku": {sku: _sorted_str(stores) for sku, stores in stores_by_sku.items()},
+        "all_stores": sorted(set(_unique_values(df_sales, "store_id")) | set(_unique_values(df_forecast, "store_id"))),
+    }
+
+
+def load_filter_index():
+    """Dimension lookups for the filter endpoints, rebuilt once per data version."""
+    return DATASET_CACHE.derive("filter_index", FILTER_INDEX_FILES, _build_filter_index)
+
+
+# =========================================================
+# PRODUCT DEMAND SHARES
+# =========================================================
+def _demand_matrix(df_bom_expanded):
+    """(raw_material × product demand matrix, total demand by raw_material)."""
+    demand = df_bom_expanded.assign(
+        material_demand_units=df_bom_expanded["product_units"] * df_bom_expanded["consumption_per_unit"]
+    )
+    by_product = demand.groupby(["raw_material", "product_id"])["material_demand_units"].sum()
+    total = demand.groupby("raw_material")["material_demand_units"].sum()
+    return by_product.unstack("product_id"), total
+
+
+def _build_product_share_matrix(df_bom_expanded):
+    if df_bom_expanded.empty:
+        return {}
+    matrices = {None: _demand_matrix(df_bom_expanded)}
+    if "forecast_horizon" in df_bom_expanded.columns:
+        for horizon, part in df_bom_expanded.groupby("forecast_horizon", sort=False):
+            matrices[horizon] = _demand_matrix(part)
+    return matrices
+
+
+def load_product_share_matrix():
+    """{horizon (None = all): (demand matrix, total by raw_material)}, rebuilt when the BOM changes."""
+    return DATASET_CACHE.derive(
+        "product_share_matrix", ("product_bom_expanded.csv",), _build_product_share_matrix
+    )
+
+
+def product_demand_share(product, horizon=None):
+    """
+    Product's share of each raw material's BOM demand.
+
+    horizon=None uses every forecast horizon in product_bom_expanded.
+
+    Returns:
+        (share, has_demand) Series indexed by raw_material, where
+        share = product demand / total demand and has_demand = total > 0;
+        None when the product has no BOM rows for that horizon.
+    """
+    matrices = load_product_share_matrix()
+    if horizon not in matrices:
+        return None
+    by_product, total = matrices[horizon]
+    if product not in by_product.columns or by_product[product].isna().all():
+        return None
+    product_demand = by_product[product].reindex(total.index).fillna(0)
+    return product_demand / total, total > 0
+
+
+def allocate_by_share(values, shares):
+    """values (indexed by raw_material) scaled by the product's demand share; 0 where no demand."""
+    share, has_demand = shares
+    factor = share.reindex(values.index).fillna(0)
+    mask = has_demand.reindex(values.index, fill_value=False)
+    return (values * factor).where(mask, 0)
+
+
+# =========================================================
+# TABLE INDEXES (paginated table endpoints)
+# =========================================================
+# Query params → filter columns. Values may be comma-separated lists.
+TABLE_SPECS = {
+    "risk": {
+        "file": "raw_material_risk.csv",
+        "filters": {
+            "material": "raw_material",
+            "riskFlag": "inventory_risk_flag",
+            "forecastHorizon": "forecast_horizon",
+        },
+        # Historical response order: newest first
+        "default_order": lambda df: df.sort_values("date", ascending=False).index,
+    },
+    "material": {
+        "file": "raw_material_reconciliation.csv",
+        "filters": {
+            "material": "raw_material",
+            "forecastHorizon": "forecast_horizon",
+        },
+    },
+    "forecast": {
+        "file": "sku_daily_forecast.csv",
+        "filters": {
+            "sku": "sku_id",
+            "store": "store_id",
+        },
+        # One index per horizon: every request is scoped to a single horizon
+        "partition": ("forecastHorizon", "forecast_horizon"),
+    },
+}
+
+TABLE_DEFAULT_PAGE_SIZE = 100
+TABLE_MAX_PAGE_SIZE = 5000
+
+
+class TableRequestError(ValueError):
+    """Invalid table query parameter (answered with 400)."""
+
+
+def build_table_index(name, df):
+    """TableIndex over rows of one table (empty frames included)."""
+    spec = TABLE_SPECS[name]
+    default_order = spec["default_order"](df) if "default_order" in spec and not df.empty else None
+    return TableIndex(
+        df,
+        sort_columns=df.columns,
+        filter_columns=spec["filters"].values(),
+        default_order=default_order,
+    )
+
+
+def load_table_index(name):
+    """
+    {partition value: TableIndex} over one table file.
+
+    Unpartitioned tables (or empty files, or files without the partition
+    column) have a single index under the key None.
+    """
+    spec = TABLE_SPECS[name]
+
+    def build(df):
+        partition = spec.get("partition")
+        if df.empty or partition is None or partition[1] not in df.columns:
+            return {None: build_table_index(name, df)}
+        return {
+            str(value): build_table_index(name, part)
+            for value, part in df.groupby(partition[1], sort=False)
+        }
+
+    return DATASET_CACHE.derive(f"table_index:{name}", (spec["file"],), build)
+
+
+def table_version(name):
+    """Version of one table's file; cursors expire only when it changes."""
+    return DATASET_CACHE.files_version((TABLE_SPECS[name]["file"],))
+
+
+def encode_table_cursor(name, offset):
+    token = f"{table_version(name)}:{offset}"
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+
+def decode_table_cursor(name, cursor):
+    """Offset encoded in a cursor; cursors from an older version of the table are rejected."""
     try:
-        return pd.read_csv(path)
-    except Exception as e:
-        print(f"Error reading {filename}: {e}")
-        return pd.DataFrame()
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, offset = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        offset = int(offset)
+    except Exception:
+        raise TableRequestError("invalid cursor")
+    if version != table_version(name):
+        raise TableRequestError("cursor expired: data changed, restart from the first page")
+    return offset
+
+
+def _int_arg(args, name, default, minimum, maximum=None):
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        raise TableRequestError(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise TableRequestError(f"{name} out of range")
+    return value
+
+
+def _date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value)
+    except ValueError:
+        raise TableRequestError(f"{name} must be a date (YYYY-MM-DD)")
+
+
+def table_response(name, defaults=None):
+    """
+    Serve a table endpoint from its index.
+
+    Without limit/cursor the full (filtered, sorted, projected) list is
+    returned as before; with them the response is one page:
+    {"items", "total", "offset", "limit", "nextCursor"}.
+
+    Params: fields, sort (prefix "-" for descending), dateFrom, dateTo,
+    limit, offset, cursor, plus the table's filter params.
+    """
+    args = request.args
+    indexes = load_table_index(name)
+    mark_section("index")
+
+    partition = TABLE_SPECS[name].get("partition")
+    key = None
+    if partition is not None and None not in indexes:
+        key = args.get(partition[0], (defaults or {}).get(partition[0]))
+    index = indexes.get(key)
+    if index is None:
+        # Unknown partition value (e.g. horizon): nothing matches
+        index = build_table_index(name, next(iter(indexes.values())).df.iloc[:0])
+
+    filters = {}
+    for param, col in TABLE_SPECS[name]["filters"].items():
+        value = args.get(param, (defaults or {}).get(param))
+        if value and value != "all" and col in index.postings:
+            filters[col] = value.split(",")
+
+    sort = args.get("sort") or None
+    descending = False
+    if sort and sort.startswith("-"):
+        sort, descending = sort[1:], True
+    if sort is not None and sort not in index.orders:
+        raise TableRequestError(f"cannot sort by {sort}")
+
+    fields = [f for f in args.get("fields", "").split(",") if f]
+    unknown = [f for f in fields if f not in index.columns]
+    if unknown:
+        raise TableRequestError(f"unknown fields: {', '.join(unknown)}")
+
+    paginated = "limit" in args or "cursor" in args
+    offset, limit = 0, None
+    if paginated:
+        limit = _int_arg(args, "limit", TABLE_DEFAULT_PAGE_SIZE, 1, TABLE_MAX_PAGE_SIZE)
+        offset = decode_table_cursor(name, args["cursor"]) if args.get("cursor") else _int_arg(args, "offset", 0, 0)
+
+    selected = index.select(filters, _date_arg(args, "dateFrom"), _date_arg(args, "dateTo"))
+    mark_section("filter")
+    page, total = index.page(selected, sort=sort, descending=descending, offset=offset, limit=limit)
+    if fields:
+        page = page[fields]
+    mark_section("page")
+
+    # DataFrames are encoded column-wise by the JSON provider
+    if not paginated:
+        response = jsonify(page)
+    else:
+        next_offset = offset + len(page)
+        response = jsonify({
+            "items": page,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "nextCursor": encode_table_cursor(name, next_offset) if next_offset < total else None,
+        })
+    mark_section("encode")
+    return response
+
 
 def safe_sum(df, col_name):
     if df.empty or col_name not in df.columns:
@@ -152,6 +972,20 @@ def get_days_from_range(date_range):
 # =========================================================
 # CHATBOT INTEGRATION
 # =========================================================
+def _load_chatbot():
+    # Heavy: langchain, LLM SDKs, matplotlib, mailer, chatbot.db build, agents
+    from Text2SQL_V2.chatbot_api import run_chatbot_query
+    return run_chatbot_query
+
+
+CHATBOT = ChatbotService(_load_chatbot, wait_seconds=CHATBOT_WAIT_SECONDS)
+
+
+@app.before_request
+def start_chatbot_warmup():
+    # Loaded in the background once this process serves traffic (never pre-fork)
+    CHATBOT.ensure_started()
+
 
 @app.route("/api/chat", methods=["POST"])
 def chat_query_alias():
@@ -166,8 +1000,12 @@ def chat_query():
         return jsonify({"error": "Question is required"}), 400
 
     try:
-        result = run_chatbot_query(question)
+        result = CHATBOT.query(question)
         return jsonify(result)
+    except ChatbotUnavailable as e:
+        response = jsonify({"error": str(e), "status": e.state})
+        response.headers["Retry-After"] = "5"
+        return response, 503
     except Exception as e:
         print("🔥 Chatbot error:")
         traceback.print_exc()
@@ -180,1000 +1018,1009 @@ def chat_query():
 
 
 # =========================================================
-# CONSUMPTION DASHBOARD
+# DASHBOARD ENGINES
 # =========================================================
-@app.route('/api/consumption/dashboard', methods=['GET'])
-def consumption_dashboard():
-    try:
-        # ===============================
-        # READ QUERY PARAMS
-        # ===============================
-        channel = request.args.get("channel")
-        store = request.args.get("store")
-        sku = request.args.get("sku")
-        product = request.args.get("product")
-        raw_material = request.args.get("rawMaterial")
-        category = request.args.get("category")
-        date_range = request.args.get("dateRange", "next-30")
-        aggregation = request.args.get("aggregation", "daily")
-        
-        
-        # Determine forecast horizon from new filter format
-        forecast_days = get_forecast_horizon_days(date_range)
-        forecast_horizon = f"{forecast_days}day"
+# Each dashboard is computed in two steps:
+# - aggregates: the request's filters applied to the daily datasets, and
+#   every scan, join and group-by the panels need, reduced to small frames
+#   (date x raw material, one row per material or per SKU, ...).
+#   consumption_aggregates() / sales_aggregates() below run them in pandas;
+#   DASHBOARD_ENGINE=duckdb runs the same steps as SQL (duckdb_engine.py).
+# - panels: the response fragments, built from those aggregates by the
+#   same code for both engines.
+def dashboard_filters(names):
+    """{param: value} for the given filter params; None when unset or "all"."""
+    values = {}
+    for name in names:
+        value = request.args.get(name)
+        values[name] = value if value and value != "all" else None
+    return values
+
+
+def load_dashboard_sql():
+    """DuckDB tables over the dashboard datasets, rebuilt when one changes."""
+    return DATASET_CACHE.derive(
+        "dashboard_sql",
+        duckdb_engine.SOURCE_FILES,
+        lambda *frames: duckdb_engine.DashboardSQL(
+            *frames, cutoff=FORECAST_CUTOFF_DATE, accuracy_baseline_days=SALES_ACCURACY_BASELINE_DAYS
+        ),
+    )
 
-        # ===============================
-        # LOAD DATA (DAILY-LEVEL FORMAT)
-        # ===============================
-        df_demand = load_csv("raw_material_demand.csv")  # Daily RM demand with forecast_horizon (aggregated, no product info)
-        df_bom_expanded = load_csv("product_bom_expanded.csv")  # Product-level BOM with material demand calculation
-        df_inventory = load_csv("raw_material_inventory_ledger.csv")
-        df_reconcile = load_csv("raw_material_reconciliation.csv")
-        df_forecast = load_csv("sku_daily_forecast.csv")  # Daily SKU forecast
-        df_sales = load_csv("sku_daily_sales.csv")
-        df_sku_master = load_csv("sku_master.csv")
-        df_bom = load_csv("product_bom.csv")
 
-        # ===============================
-        # FILTER BY FORECAST HORIZON (7day or 30day)
-        # ===============================
-        if not df_demand.empty and "forecast_horizon" in df_demand.columns:
-            df_demand = df_demand[df_demand["forecast_horizon"] == forecast_horizon]
-        
-        # Filter BOM expanded by forecast horizon (needed for product-specific demand calculation)
-        if not df_bom_expanded.empty and "forecast_horizon" in df_bom_expanded.columns:
-            df_bom_expanded = df_bom_expanded[df_bom_expanded["forecast_horizon"] == forecast_horizon].copy()
-        
-        if not df_forecast.empty and "forecast_horizon" in df_forecast.columns:
-            df_forecast = df_forecast[df_forecast["forecast_horizon"] == forecast_horizon]
+def dashboard_aggregates(dashboard, forecast_days, compute, **filters):
+    """The dashboard's aggregates ("consumption" or "sales") from the configured engine."""
+    if DASHBOARD_ENGINE == "duckdb":
+        engine = load_dashboard_sql()
+        aggregate = engine.consumption_aggregates if dashboard == "consumption" else engine.sales_aggregates
+    else:
+        aggregate = consumption_aggregates if dashboard == "consumption" else sales_aggregates
+    return aggregate(forecast_days, compute, **filters)
 
-        # ===============================
-        # PARSE DATES
-        # ===============================
-        if not df_demand.empty:
-            df_demand["date"] = pd.to_datetime(df_demand["date"], errors="coerce")
-        if not df_forecast.empty:
-            df_forecast["date"] = pd.to_datetime(df_forecast["date"], errors="coerce")
-        if not df_inventory.empty:
-            df_inventory["date"] = pd.to_datetime(df_inventory["date"], errors="coerce")
-        if not df_sales.empty:
-            df_sales["date"] = pd.to_datetime(df_sales["date"], errors="coerce")
-        
-        # ===============================
-        # DEFINE HISTORICAL PERIOD (Dynamic based on filter)
-        # ===============================
-        historical_days = forecast_days  # Match historical period to forecast period
-        historical_start = FORECAST_CUTOFF_DATE - timedelta(days=historical_days - 1)
-        df_inventory_full = df_inventory.copy()
 
-        # ===============================
-        # Consumption Forecast Accuracy KPI: use UNFILTERED data so dashboard shows
-        # consistent overall accuracy regardless of channel/store/product filters.
-        # ===============================
-        df_inv_hist_all = df_inventory[
-            (df_inventory["date"] >= historical_start) & 
-            (df_inventory["date"] <= FORECAST_CUTOFF_DATE)
-        ] if not df_inventory.empty else pd.DataFrame()
-        trailing_consumption_all = safe_sum(df_inv_hist_all, "consumed_quantity")
-        total_forecasted_demand_all = safe_sum(df_demand, "material_demand_units")
-        forecast_daily_avg_consumption = total_forecasted_demand_all / forecast_days if forecast_days > 0 else 0
-        historical_daily_avg_consumption = trailing_consumption_all / historical_days if historical_days > 0 and trailing_consumption_all > 0 else 0
-        if historical_daily_avg_consumption > 0:
-            mape_consumption = abs(forecast_daily_avg_consumption - historical_daily_avg_consumption) / historical_daily_avg_consumption * 100
-            accuracy_consumption_kpi = max(0, min(100, 100 - mape_consumption))
-        else:
-            accuracy_consumption_kpi = 0
+# =========================================================
+# CONSUMPTION DASHBOARD
+# =========================================================
+def latest_inventory_rows(df_inventory, channel_weight):
+    """
+    Each material's latest ledger row with stock (channel-weighted closing
+    inventory > 0), else its latest row.
+
+    Stocked materials come first, each group in date (then file) order.
+    Closing inventory and safety stock are channel-weighted.
+    """
+    columns = ["raw_material", "date", "closing_inventory", "safety_stock"]
+    if df_inventory.empty or not set(columns).issubset(df_inventory.columns):
+        return pd.DataFrame(columns=columns)
+
+    df_inv_sorted = df_inventory.sort_values("date", kind="stable")
+    has_stock = weighted_units(df_inv_sorted["closing_inventory"], channel_weight) > 0
+    latest_positive = df_inv_sorted[has_stock].groupby("raw_material", as_index=False).tail(1)
+    latest_any = df_inv_sorted.groupby("raw_material", as_index=False).tail(1)
+    fallback = latest_any[~latest_any["raw_material"].isin(latest_positive["raw_material"])]
+    latest = pd.concat([part for part in (latest_positive, fallback) if not part.empty] or [latest_any])
+    return apply_channel_weight(
+        latest[columns].reset_index(drop=True), ("closing_inventory", "safety_stock"), channel_weight
+    )
 
-        # ===============================
-        # CHANNEL / STORE FILTER
-        # ===============================
-        channel_store_raw_materials = None
-        channel_weight = 1.0  # Default: no scaling
-        
-        # Calculate channel contribution weight if channel filter is applied
-        if channel and channel != "all" and not df_sales.empty:
-            # Calculate total sales by channel
-            total_all_channels = df_sales["actual_sales_units"].sum()
-            channel_sales = df_sales[df_sales["sales_channel"] == channel]["actual_sales_units"].sum()
-            
-            if total_all_channels > 0:
-                channel_weight = channel_sales / total_all_channels
-            
-            # Filter sales data by channel
-            df_sales = df_sales[df_sales["sales_channel"].astype(str) == str(channel)]
-
-        if store and store != "all":
-            df_sales = df_sales[df_sales["store_id"].astype(str) == str(store)]
-            if not df_forecast.empty and "store_id" in df_forecast.columns:
-                df_forecast = df_forecast[df_forecast["store_id"].astype(str) == str(store)]
-
-        # Apply channel weight to forecast, demand, and inventory data
-        if channel_weight < 1.0:
-            if not df_forecast.empty and "forecast_units" in df_forecast.columns:
-                df_forecast = df_forecast.copy()
-                df_forecast["forecast_units"] = (df_forecast["forecast_units"] * channel_weight).round().astype(int)
-            
-            if not df_demand.empty and "material_demand_units" in df_demand.columns:
-                df_demand = df_demand.copy()
-                df_demand["material_demand_units"] = (df_demand["material_demand_units"] * channel_weight).round().astype(int)
-            
-            # Scale inventory consumption and quantities by channel weight
-            if not df_inventory.empty:
-                df_inventory = df_inventory.copy()
-                if "consumed_quantity" in df_inventory.columns:
-                    df_inventory["consumed_quantity"] = (df_inventory["consumed_quantity"] * channel_weight).round().astype(int)
-                if "closing_inventory" in df_inventory.columns:
-                    df_inventory["closing_inventory"] = (df_inventory["closing_inventory"] * channel_weight).round().astype(int)
-                if "opening_inventory" in df_inventory.columns:
-                    df_inventory["opening_inventory"] = (df_inventory["opening_inventory"] * channel_weight).round().astype(int)
-                if "inflow_quantity" in df_inventory.columns:
-                    df_inventory["inflow_quantity"] = (df_inventory["inflow_quantity"] * channel_weight).round().astype(int)
-                if "safety_stock" in df_inventory.columns:
-                    df_inventory["safety_stock"] = (df_inventory["safety_stock"] * channel_weight).round().astype(int)
-            
-            # Also scale the full inventory for latest calculations
-            if not df_inventory_full.empty:
-                df_inventory_full = df_inventory_full.copy()
-                if "consumed_quantity" in df_inventory_full.columns:
-                    df_inventory_full["consumed_quantity"] = (df_inventory_full["consumed_quantity"] * channel_weight).round().astype(int)
-                if "closing_inventory" in df_inventory_full.columns:
-                    df_inventory_full["closing_inventory"] = (df_inventory_full["closing_inventory"] * channel_weight).round().astype(int)
-                if "safety_stock" in df_inventory_full.columns:
-                    df_inventory_full["safety_stock"] = (df_inventory_full["safety_stock"] * channel_weight).round().astype(int)
-            
-            # Scale reconciliation data
-            if not df_reconcile.empty:
-                df_reconcile = df_reconcile.copy()
-                for col in ["material_demand_units", "closing_inventory", "safety_stock", "inventory_gap_units", "cumulative_demand", "running_inventory_balance"]:
-                    if col in df_reconcile.columns:
-                        df_reconcile[col] = (df_reconcile[col] * channel_weight).round().astype(int)
-
-        if not df_sales.empty and "sku_id" in df_sales.columns:
-            valid_skus_from_sales = df_sales["sku_id"].unique()
-            df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus_from_sales)]
-            
-            if (channel and channel != "all") or (store and store != "all"):
-                products_from_channel_store = df_sku_master[
-                    df_sku_master["sku_id"].isin(valid_skus_from_sales)
-                ]["product_id"].unique()
-                
-                if len(products_from_channel_store) > 0 and not df_bom.empty:
-                    channel_store_raw_materials = df_bom[
-                        df_bom["product_id"].isin(products_from_channel_store)
-                    ]["raw_material"].unique()
 
-        # ===============================
-        # SKU FILTER
-        # ===============================
-        sku_raw_materials = None
-        if sku and sku != "all":
-            df_forecast = df_forecast[df_forecast["sku_id"] == sku]
-            
-            if not df_sku_master.empty and not df_bom.empty:
-                products_for_sku = df_sku_master[
-                    df_sku_master["sku_id"] == sku
-                ]["product_id"].unique()
-                if len(products_for_sku) > 0:
-                    sku_raw_materials = df_bom[
-                        df_bom["product_id"].isin(products_for_sku)
-                    ]["raw_material"].unique()
+def consumption_aggregates(forecast_days, compute, channel=None, store=None, sku=None,
+                           product=None, raw_material=None, category=None):
+    """
+    Consumption dashboard aggregates for the filtered view, in pandas.
+
+    Filters are None when not set. Returns a dict:
+    - consumption_all / demand_all: unfiltered historical consumption and
+      horizon demand (accuracy KPI)
+    - demand: demand by date x raw_material (material_demand_units)
+    - consumption: historical consumed_quantity by date x raw_material,
+      channel-weighted per date x material (as the cube grain)
+    - historical_consumption: the same, channel-weighted per ledger row
+    - has_material_demand: demand rows are left after the filters
+    - inventory (kpis / riskTable): latest_inventory_rows() with each
+      material's forecasted_demand and avg_daily_inflow
+    - product_demand / shares: product filter with BOM rows for the
+      horizon, and the product's demand shares (product_demand_share)
+    - product_bom / shares_all: the same over every horizon
+    - sku_units, product_count, product_forecast_units (funnel)
+    """
+    forecast_horizon = f"{forecast_days}day"
+    historical_start = FORECAST_CUTOFF_DATE - timedelta(days=forecast_days - 1)
+
+    # ===============================
+    # LOAD DATA (DAILY-LEVEL FORMAT)
+    # ===============================
+    df_demand = load_csv("raw_material_demand.csv")  # Daily RM demand with forecast_horizon (aggregated, no product info)
+    df_bom_expanded = load_csv("product_bom_expanded.csv")  # Product-level BOM with material demand calculation
+    df_inventory = load_csv("raw_material_inventory_ledger.csv")
+    df_forecast = load_csv("sku_daily_forecast.csv")  # Daily SKU forecast
+    df_sales = load_csv("sku_daily_sales.csv")
+    df_sku_master = load_csv("sku_master.csv")
+    df_bom = load_csv("product_bom.csv")
+
+    mark_section("load")
+
+    # ===============================
+    # FILTER BY FORECAST HORIZON (7day or 30day)
+    # ===============================
+    if not df_demand.empty and "forecast_horizon" in df_demand.columns:
+        df_demand = df_demand[df_demand["forecast_horizon"] == forecast_horizon]
+
+    # Filter BOM expanded by forecast horizon (needed for product-specific demand calculation)
+    if not df_bom_expanded.empty and "forecast_horizon" in df_bom_expanded.columns:
+        df_bom_expanded = df_bom_expanded[df_bom_expanded["forecast_horizon"] == forecast_horizon].copy()
+
+    if not df_forecast.empty and "forecast_horizon" in df_forecast.columns:
+        df_forecast = df_forecast[df_forecast["forecast_horizon"] == forecast_horizon]
+
+    # ===============================
+    # PARSE DATES
+    # ===============================
+    if not df_demand.empty:
+        df_demand["date"] = pd.to_datetime(df_demand["date"], errors="coerce")
+    if not df_forecast.empty:
+        df_forecast["date"] = pd.to_datetime(df_forecast["date"], errors="coerce")
+    if not df_inventory.empty:
+        df_inventory["date"] = pd.to_datetime(df_inventory["date"], errors="coerce")
+    if not df_sales.empty:
+        df_sales["date"] = pd.to_datetime(df_sales["date"], errors="coerce")
+
+    # ===============================
+    # Consumption Forecast Accuracy KPI: use UNFILTERED data so dashboard shows
+    # consistent overall accuracy regardless of channel/store/product filters.
+    # ===============================
+    aggregates = {
+        "consumption_all": safe_sum(
+            cube_slice("material_consumption", start=historical_start, end=FORECAST_CUTOFF_DATE),
+            "consumed_quantity"
+        ),
+        "demand_all": safe_sum(
+            cube_slice("material_demand", forecast_horizon=forecast_horizon),
+            "material_demand_units"
+        ),
+    }
 
-        # ===============================
-        # PRODUCT / CATEGORY FILTER
-        # ===============================
-        valid_raw_materials = None
-        
-        if product and product != "all":
-            valid_skus = df_sku_master[
-                df_sku_master["product_id"] == product
-            ]["sku_id"]
-            df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
-            
-            if not df_bom.empty and "product_id" in df_bom.columns:
-                valid_raw_materials = df_bom[df_bom["product_id"] == product]["raw_material"].unique()
+    # ===============================
+    # CHANNEL / STORE FILTER
+    # ===============================
+    channel_store_raw_materials = None
+    channel_weight = 1.0  # Default: no scaling
+
+    # Calculate channel contribution weight if channel filter is applied
+    if channel and not df_sales.empty:
+        # Calculate total sales by channel
+        total_all_channels = df_sales["actual_sales_units"].sum()
+        channel_sales = df_sales[df_sales["sales_channel"] == channel]["actual_sales_units"].sum()
+
+        if total_all_channels > 0:
+            channel_weight = channel_sales / total_all_channels
+
+        # Filter sales data by channel
+        df_sales = df_sales[df_sales["sales_channel"].astype(str) == str(channel)]
+
+    if store:
+        df_sales = df_sales[df_sales["store_id"].astype(str) == str(store)]
+        if not df_forecast.empty and "store_id" in df_forecast.columns:
+            df_forecast = df_forecast[df_forecast["store_id"].astype(str) == str(store)]
+
+    # Channel weight is applied when units are aggregated (weighted_units),
+    # not to the frames: forecast units, demand units and the inventory
+    # consumed / closing / safety stock columns scale row by row.
+    # Inflow stays unscaled.
+    demand_weight = channel_weight
+
+    if not df_sales.empty and "sku_id" in df_sales.columns:
+        valid_skus_from_sales = df_sales["sku_id"].unique()
+        df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus_from_sales)]
+
+        if channel or store:
+            products_from_channel_store = df_sku_master[
+                df_sku_master["sku_id"].isin(valid_skus_from_sales)
+            ]["product_id"].unique()
 
-        if category and category != "all":
-            valid_skus = df_sku_master[
-                df_sku_master["category"] == category
-            ]["sku_id"]
-            df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
-            
-            if not df_bom.empty and "product_id" in df_bom.columns:
-                products_in_category = df_sku_master[
-                    df_sku_master["category"] == category
-                ]["product_id"].unique()
-                category_raw_materials = df_bom[
-                    df_bom["product_id"].isin(products_in_category)
+            if len(products_from_channel_store) > 0 and not df_bom.empty:
+                channel_store_raw_materials = df_bom[
+                    df_bom["product_id"].isin(products_from_channel_store)
                 ]["raw_material"].unique()
-                if valid_raw_materials is not None:
-                    valid_raw_materials = set(valid_raw_materials) & set(category_raw_materials)
-                else:
-                    valid_raw_materials = category_raw_materials
 
-        # ===============================
-        # RAW MATERIAL FILTER
-        # ===============================
-        final_raw_materials = None
-        
-        if channel_store_raw_materials is not None and len(channel_store_raw_materials) > 0:
-            final_raw_materials = set(channel_store_raw_materials)
-        
-        if sku_raw_materials is not None and len(sku_raw_materials) > 0:
-            if final_raw_materials is not None:
-                final_raw_materials = final_raw_materials & set(sku_raw_materials)
-            else:
-                final_raw_materials = set(sku_raw_materials)
-        
-        if valid_raw_materials is not None and len(valid_raw_materials) > 0:
-            if final_raw_materials is not None:
-                final_raw_materials = final_raw_materials & set(valid_raw_materials)
-            else:
-                final_raw_materials = set(valid_raw_materials)
-        
-        # ===============================
-        # CALCULATE PRODUCT-SPECIFIC DEMAND (if product filter is selected)
-        # ===============================
-        # If a product is selected, calculate demand from product_bom_expanded instead of aggregated raw_material_demand
-        if product and product != "all" and not df_bom_expanded.empty:
-            # Filter BOM expanded by product
-            df_bom_product = df_bom_expanded[df_bom_expanded["product_id"] == product].copy()
-            
-            if not df_bom_product.empty:
-                # Calculate material_demand_units = product_units * consumption_per_unit
-                df_bom_product["material_demand_units"] = (
-                    df_bom_product["product_units"] * df_bom_product["consumption_per_unit"]
-                ).round().astype(int)
-                
-                # Aggregate by date and raw_material to match df_demand structure
-                df_demand_from_product = df_bom_product.groupby(
-                    ["date", "raw_material", "material_type", "forecast_horizon"],
-                    as_index=False
-                )["material_demand_units"].sum()
-                
-                # Ensure date column is datetime (matching df_demand format)
-                if "date" in df_demand_from_product.columns:
-                    df_demand_from_product["date"] = pd.to_datetime(df_demand_from_product["date"], errors="coerce")
-                
-                # Replace df_demand with product-specific demand
-                df_demand = df_demand_from_product
-        
-        # Apply raw material filter - combine explicit selection with product-derived materials
-        if raw_material and raw_material != "all":
-            # If explicit raw material is selected, check if it's compatible with product filter
-            if final_raw_materials is not None and len(final_raw_materials) > 0:
-                # Both product and raw material selected - intersect them
-                if raw_material in final_raw_materials:
-                    # Raw material is used by the selected product - apply filter
-                    filter_materials = [raw_material]
-                else:
-                    # Raw material is NOT used by selected product - show empty (no data)
-                    filter_materials = []
+    # ===============================
+    # SKU FILTER
+    # ===============================
+    sku_raw_materials = None
+    if sku:
+        df_forecast = df_forecast[df_forecast["sku_id"] == sku]
+
+        if not df_sku_master.empty and not df_bom.empty:
+            products_for_sku = df_sku_master[
+                df_sku_master["sku_id"] == sku
+            ]["product_id"].unique()
+            if len(products_for_sku) > 0:
+                sku_raw_materials = df_bom[
+                    df_bom["product_id"].isin(products_for_sku)
+                ]["raw_material"].unique()
+
+    # ===============================
+    # PRODUCT / CATEGORY FILTER
+    # ===============================
+    valid_raw_materials = None
+
+    if product:
+        valid_skus = df_sku_master[
+            df_sku_master["product_id"] == product
+        ]["sku_id"]
+        df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
+
+        if not df_bom.empty and "product_id" in df_bom.columns:
+            valid_raw_materials = df_bom[df_bom["product_id"] == product]["raw_material"].unique()
+
+    if category:
+        valid_skus = df_sku_master[
+            df_sku_master["category"] == category
+        ]["sku_id"]
+        df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
+
+        if not df_bom.empty and "product_id" in df_bom.columns:
+            products_in_category = df_sku_master[
+                df_sku_master["category"] == category
+            ]["product_id"].unique()
+            category_raw_materials = df_bom[
+                df_bom["product_id"].isin(products_in_category)
+            ]["raw_material"].unique()
+            if valid_raw_materials is not None:
+                valid_raw_materials = set(valid_raw_materials) & set(category_raw_materials)
             else:
-                # No product filter, just raw material filter
-                filter_materials = [raw_material]
-            
-            df_demand = df_demand[df_demand["raw_material"].isin(filter_materials)]
-            df_inventory = df_inventory[df_inventory["raw_material"].isin(filter_materials)]
-            df_inventory_full = df_inventory_full[df_inventory_full["raw_material"].isin(filter_materials)]
-            df_reconcile = df_reconcile[df_reconcile["raw_material"].isin(filter_materials)]
-        elif final_raw_materials is not None and len(final_raw_materials) > 0:
-            # Filter by product/category-derived raw materials (no explicit raw material filter)
-            # Note: If product filter was applied above, df_demand already contains only that product's materials
-            df_demand = df_demand[df_demand["raw_material"].isin(final_raw_materials)]
-            df_inventory = df_inventory[df_inventory["raw_material"].isin(final_raw_materials)]
-            df_inventory_full = df_inventory_full[df_inventory_full["raw_material"].isin(final_raw_materials)]
-            df_reconcile = df_reconcile[df_reconcile["raw_material"].isin(final_raw_materials)]
+                valid_raw_materials = category_raw_materials
 
-        # ===============================
-        # CREATE HISTORICAL DATA SUBSETS (After ALL filters applied)
-        # ===============================
-        df_inventory_historical = df_inventory[
-            (df_inventory["date"] >= historical_start) & 
-            (df_inventory["date"] <= FORECAST_CUTOFF_DATE)
-        ].copy() if not df_inventory.empty else pd.DataFrame()
-        
-        df_sales_historical = df_sales[
-            (df_sales["date"] >= historical_start) & 
-            (df_sales["date"] <= FORECAST_CUTOFF_DATE)
-        ].copy() if not df_sales.empty else pd.DataFrame()
+    # ===============================
+    # RAW MATERIAL FILTER
+    # ===============================
+    final_raw_materials = None
 
-        # ===============================
-        # KPIs - CORRECTED DEFINITIONS (Respect aggregation setting)
-        # ===============================
-        # Total Forecasted Raw Material Demand = Sum of material_demand_units (future forecast)
-        # If weekly aggregation, sum all forecast days (already daily, so sum is correct)
-        total_forecasted_demand = json_safe(safe_sum(df_demand, "material_demand_units"))
-        
-        # Trailing N-Day Consumption = Sum of consumed_quantity from historical period
-        # If a product is selected, allocate consumption proportionally based on product's demand share
-        if product and product != "all" and not df_inventory_historical.empty and not df_bom_expanded.empty:
-            # Calculate product-specific consumption by allocating raw material consumption
-            # based on the product's share of total demand for each raw material
-            trailing_consumption = 0
-            
-            # Get total consumption by raw material from historical inventory
-            consumption_by_rm = df_inventory_historical.groupby("raw_material")["consumed_quantity"].sum()
-            
-            # Calculate product's demand share for each raw material
-            df_bom_product_historical = df_bom_expanded[df_bom_expanded["product_id"] == product].copy()
-            if not df_bom_product_historical.empty:
-                # Calculate product's material demand
-                df_bom_product_historical["material_demand_units"] = (
-                    df_bom_product_historical["product_units"] * df_bom_product_historical["consumption_per_unit"]
-                )
-                
-                # Get product's total demand by raw material (across all dates in historical period)
-                product_demand_by_rm = df_bom_product_historical.groupby("raw_material")["material_demand_units"].sum()
-                
-                # Get total demand by raw material (all products) for allocation
-                total_demand_by_rm = df_bom_expanded.copy()
-                total_demand_by_rm["material_demand_units"] = (
-                    total_demand_by_rm["product_units"] * total_demand_by_rm["consumption_per_unit"]
-                )
-                total_demand_by_rm = total_demand_by_rm.groupby("raw_material")["material_demand_units"].sum()
-                
-                # Allocate consumption proportionally: product_consumption = total_consumption * (product_demand / total_demand)
-                for raw_mat in consumption_by_rm.index:
-                    total_consumption = consumption_by_rm[raw_mat]
-                    product_demand = product_demand_by_rm.get(raw_mat, 0)
-                    total_demand = total_demand_by_rm.get(raw_mat, 0)
-                    
-                    if total_demand > 0:
-                        # Allocate consumption based on demand share
-                        allocated_consumption = total_consumption * (product_demand / total_demand)
-                        trailing_consumption += allocated_consumption
-                    elif product_demand > 0:
-                        # Product uses this material but no total demand (edge case)
-                        trailing_consumption += 0
-            
-            trailing_consumption = json_safe(trailing_consumption)
+    if channel_store_raw_materials is not None and len(channel_store_raw_materials) > 0:
+        final_raw_materials = set(channel_store_raw_materials)
+
+    if sku_raw_materials is not None and len(sku_raw_materials) > 0:
+        if final_raw_materials is not None:
+            final_raw_materials = final_raw_materials & set(sku_raw_materials)
         else:
-            # No product filter - use total consumption
-            trailing_consumption = json_safe(safe_sum(df_inventory_historical, "consumed_quantity"))
+            final_raw_materials = set(sku_raw_materials)
 
-        # Inventory Excess / Shortfall - PROJECTED after forecast period
-        # Use FULL inventory for "latest" row so Days to Stockout works with 7-day filter too.
-        overstock = 0
-        days_to_stockout = 999  # Default so KPI always has a value
-        try:
-            if df_inventory.empty or "closing_inventory" not in df_inventory.columns or "raw_material" not in df_inventory.columns:
-                df_latest_inventory = pd.DataFrame()
-            else:
-                df_inv_sorted = df_inventory.sort_values("date")
-                latest_pos = df_inv_sorted[df_inv_sorted["closing_inventory"] > 0].groupby("raw_material", as_index=False).tail(1)
-                latest_any = df_inv_sorted.groupby("raw_material", as_index=False).tail(1)
-                missing = set(latest_any["raw_material"]) - set(latest_pos["raw_material"])
-                if latest_pos.empty and not latest_any.empty:
-                    df_latest_inventory = latest_any
-                elif not latest_pos.empty and len(missing) > 0:
-                    df_latest_inventory = pd.concat([latest_pos, latest_any[latest_any["raw_material"].isin(missing)]], ignore_index=True).drop_duplicates(subset=["raw_material"], keep="first")
-                elif not latest_pos.empty:
-                    df_latest_inventory = latest_pos
-                else:
-                    df_latest_inventory = pd.DataFrame()
+    if valid_raw_materials is not None and len(valid_raw_materials) > 0:
+        if final_raw_materials is not None:
+            final_raw_materials = final_raw_materials & set(valid_raw_materials)
+        else:
+            final_raw_materials = set(valid_raw_materials)
+
+    # ===============================
+    # CALCULATE PRODUCT-SPECIFIC DEMAND (if product filter is selected)
+    # ===============================
+    # If a product is selected, calculate demand from product_bom_expanded instead of aggregated raw_material_demand
+    product_demand = bool(product) and not df_bom_expanded.empty
+    if product_demand:
+        # Filter BOM expanded by product (products without a BOM carry empty material rows)
+        df_bom_product = df_bom_expanded[df_bom_expanded["product_id"] == product].dropna(
+            subset=["raw_material", "consumption_per_unit"]
+        )
+
+        if not df_bom_product.empty:
+            # Calculate material_demand_units = product_units * consumption_per_unit
+            df_bom_product = df_bom_product.assign(
+                material_demand_units=(
+                    df_bom_product["product_units"] * df_bom_product["consumption_per_unit"]
+                ).round().astype(int)
+            )
 
-            forecast_by_rm = df_demand.groupby("raw_material")["material_demand_units"].sum() if not df_demand.empty else pd.Series()
-            if not df_inventory_full.empty and "inflow_quantity" in df_inventory_full.columns:
-                avg_daily_inflow_by_rm = df_inventory_full.groupby("raw_material")["inflow_quantity"].mean()
-                expected_inflow_by_rm = avg_daily_inflow_by_rm * forecast_days
+            # Aggregate by date and raw_material to match df_demand structure
+            df_demand_from_product = df_bom_product.groupby(
+                ["date", "raw_material", "material_type", "forecast_horizon"],
+                as_index=False
+            )["material_demand_units"].sum()
+
+            # Ensure date column is datetime (matching df_demand format)
+            if "date" in df_demand_from_product.columns:
+                df_demand_from_product["date"] = pd.to_datetime(df_demand_from_product["date"], errors="coerce")
+
+            # Replace df_demand with product-specific demand (not channel-weighted)
+            df_demand = df_demand_from_product
+            demand_weight = 1.0
+
+    # Apply raw material filter - combine explicit selection with product-derived materials
+    if raw_material:
+        # If explicit raw material is selected, check if it's compatible with product filter
+        if final_raw_materials is not None and len(final_raw_materials) > 0:
+            # Both product and raw material selected - intersect them
+            if raw_material in final_raw_materials:
+                # Raw material is used by the selected product - apply filter
+                filter_materials = [raw_material]
             else:
-                expected_inflow_by_rm = pd.Series()
-
-            if not df_latest_inventory.empty:
-                df_latest_inventory = df_latest_inventory.copy()
-                df_latest_inventory["forecasted_demand"] = df_latest_inventory["raw_material"].map(forecast_by_rm).fillna(0)
-                df_latest_inventory["expected_inflow"] = df_latest_inventory["raw_material"].map(expected_inflow_by_rm).fillna(0)
-                
-                if product and product != "all" and not df_bom_expanded.empty:
-                    df_bom_product_all = df_bom_expanded[df_bom_expanded["product_id"] == product].copy()
-                    if not df_bom_product_all.empty:
-                        df_bom_product_all["material_demand_units"] = (
-                            df_bom_product_all["product_units"] * df_bom_product_all["consumption_per_unit"]
-                        )
-                        product_demand_by_rm = df_bom_product_all.groupby("raw_material")["material_demand_units"].sum()
-                        total_demand_by_rm_all = df_bom_expanded.copy()
-                        total_demand_by_rm_all["material_demand_units"] = (
-                            total_demand_by_rm_all["product_units"] * total_demand_by_rm_all["consumption_per_unit"]
-                        )
-                        total_demand_by_rm_all = total_demand_by_rm_all.groupby("raw_material")["material_demand_units"].sum()
-                        for idx, row in df_latest_inventory.iterrows():
-                            raw_mat = row["raw_material"]
-                            product_demand = product_demand_by_rm.get(raw_mat, 0)
-                            total_demand = total_demand_by_rm_all.get(raw_mat, 0)
-                            if total_demand > 0:
-                                allocation_factor = product_demand / total_demand
-                                df_latest_inventory.at[idx, "closing_inventory"] = row["closing_inventory"] * allocation_factor
-                                df_latest_inventory.at[idx, "safety_stock"] = row["safety_stock"] * allocation_factor
-                                df_latest_inventory.at[idx, "expected_inflow"] = row["expected_inflow"] * allocation_factor
-                            else:
-                                df_latest_inventory.at[idx, "closing_inventory"] = 0
-                                df_latest_inventory.at[idx, "safety_stock"] = 0
-                                df_latest_inventory.at[idx, "expected_inflow"] = 0
-                
-                df_latest_inventory["projected_inventory"] = (
-                    df_latest_inventory["closing_inventory"] 
-                    + df_latest_inventory["expected_inflow"]
-                    - df_latest_inventory["forecasted_demand"]
-                )
-                if forecast_days in [7, 30]:
-                    sample_rm = df_latest_inventory.iloc[0]["raw_material"] if not df_latest_inventory.empty else None
-                    if sample_rm:
-                        sample_row = df_latest_inventory[df_latest_inventory["raw_material"] == sample_rm].iloc[0]
-                        print(f"[DEBUG] Projected Overstock ({forecast_days}d) - {sample_rm}:")
-                        print(f"  Closing: {sample_row['closing_inventory']:,.0f}, Safety: {sample_row['safety_stock']:,.0f}")
-                        print(f"  Expected Inflow: {sample_row['expected_inflow']:,.0f}, Forecasted Demand: {sample_row['forecasted_demand']:,.0f}")
-                        print(f"  Projected Inventory: {sample_row['projected_inventory']:,.0f}")
-                        print(f"  Overstock: {max(0, sample_row['projected_inventory'] - sample_row['safety_stock']):,.0f}")
-                
-                df_latest_inventory["overstock"] = (
-                    df_latest_inventory["projected_inventory"] - df_latest_inventory["safety_stock"]
-                ).clip(lower=0)
-                overstock = json_safe(df_latest_inventory["overstock"].sum())
-                
-                denom = max(forecast_days, 1)
-                df_latest_inventory["daily_demand"] = df_latest_inventory["forecasted_demand"] / denom
-                df_latest_inventory["daily_inflow"] = df_latest_inventory["expected_inflow"] / denom
-                df_latest_inventory["net_daily_consumption"] = df_latest_inventory["daily_demand"] - df_latest_inventory["daily_inflow"]
-                df_latest_inventory["days_to_stockout"] = df_latest_inventory.apply(
-                    lambda row: (
-                        0 if row["closing_inventory"] <= 0  # Already out of stock
-                        else row["closing_inventory"] / row["net_daily_consumption"] 
-                        if row["net_daily_consumption"] > 0  # Net consumption is positive (demand > inflow)
-                        else 999  # Net consumption <= 0 means inflow >= demand, so no stockout risk
-                    ),
-                    axis=1
-                )
-                # Handle empty dataframe and NaN values
-                if not df_latest_inventory.empty and "days_to_stockout" in df_latest_inventory.columns:
-                    min_days_to_stockout = df_latest_inventory["days_to_stockout"].min()
-                    # Check for NaN or invalid values
-                    if pd.isna(min_days_to_stockout) or not np.isfinite(min_days_to_stockout):
-                        days_to_stockout = 999
-                        print(f"[consumption] Days to Stockout: NaN/invalid value, defaulting to 999")
-                    else:
-                        days_to_stockout = json_safe(round(min_days_to_stockout, 0))
-                        print(f"[consumption] Days to Stockout calculated: {days_to_stockout} (from {len(df_latest_inventory)} materials)")
-                else:
-                    days_to_stockout = 999
-                    print(f"[consumption] Days to Stockout: Empty dataframe or missing column, defaulting to 999")
-        except Exception as ex:
-            import traceback
-            traceback.print_exc()
-            print(f"[consumption] Days to Stockout fallback due to: {ex}")
-            overstock = 0
-            days_to_stockout = 999
+                # Raw material is NOT used by selected product - show empty (no data)
+                filter_materials = []
+        else:
+            # No product filter, just raw material filter
+            filter_materials = [raw_material]
+
+        df_demand = df_demand[df_demand["raw_material"].isin(filter_materials)]
+        df_inventory = df_inventory[df_inventory["raw_material"].isin(filter_materials)]
+    elif final_raw_materials is not None and len(final_raw_materials) > 0:
+        # Filter by product/category-derived raw materials (no explicit raw material filter)
+        # Note: If product filter was applied above, df_demand already contains only that product's materials
+        df_demand = df_demand[df_demand["raw_material"].isin(final_raw_materials)]
+        df_inventory = df_inventory[df_inventory["raw_material"].isin(final_raw_materials)]
+
+    # ===============================
+    # CUBE SLICES (same filters, pre-aggregated by date x raw material)
+    # ===============================
+    if raw_material:
+        material_scope = filter_materials
+    elif final_raw_materials is not None and len(final_raw_materials) > 0:
+        material_scope = final_raw_materials
+    else:
+        material_scope = None
+
+    cube_demand = pd.DataFrame()
+    if product:
+        cube_demand = cube_slice(
+            "product_material_demand", forecast_horizon=forecast_horizon, product_id=product
+        )
+
+    if not cube_demand.empty:
+        # Product-specific demand (channel weight does not apply, as above)
+        if material_scope is not None:
+            cube_demand = cube_demand[cube_demand["raw_material"].isin(material_scope)]
+    else:
+        cube_demand = apply_channel_weight(
+            cube_slice("material_demand", forecast_horizon=forecast_horizon, raw_material=material_scope),
+            "material_demand_units", channel_weight
+        )
+
+    cube_consumption = apply_channel_weight(
+        cube_slice(
+            "material_consumption",
+            start=historical_start, end=FORECAST_CUTOFF_DATE, raw_material=material_scope
+        ),
+        "consumed_quantity", channel_weight
+    )
 
-        # Forecast Accuracy - Compare daily averages
-        forecast_daily_avg = total_forecasted_demand / forecast_days if forecast_days > 0 else 0
-        historical_daily_avg = trailing_consumption / historical_days if trailing_consumption > 0 else 0
-        
-        if historical_daily_avg > 0:
-            mape = abs(forecast_daily_avg - historical_daily_avg) / historical_daily_avg * 100
-            accuracy = max(0, min(100, 100 - mape))
+    # ===============================
+    # CREATE HISTORICAL DATA SUBSETS (After ALL filters applied)
+    # ===============================
+    df_inventory_historical = df_inventory[
+        (df_inventory["date"] >= historical_start) &
+        (df_inventory["date"] <= FORECAST_CUTOFF_DATE)
+    ] if not df_inventory.empty else pd.DataFrame()
+
+    # Channel-weighted consumption per historical row, by date x raw material
+    if not df_inventory_historical.empty:
+        historical_consumption = (
+            df_inventory_historical[["date", "raw_material"]]
+            .assign(consumed_quantity=weighted_units(df_inventory_historical["consumed_quantity"], channel_weight))
+            .groupby(["date", "raw_material"], as_index=False)["consumed_quantity"].sum()
+        )
+    else:
+        historical_consumption = pd.DataFrame(columns=["date", "raw_material", "consumed_quantity"])
+
+    df_bom_all = load_csv("product_bom_expanded.csv")
+    aggregates.update(
+        demand=cube_demand[["date", "raw_material", "material_demand_units"]],
+        consumption=cube_consumption[["date", "raw_material", "consumed_quantity"]],
+        historical_consumption=historical_consumption,
+        has_material_demand=not df_demand.empty,
+        product_demand=product_demand,
+        shares=product_demand_share(
+            product, forecast_horizon if "forecast_horizon" in df_bom_expanded.columns else None
+        ) if product_demand else None,
+        product_bom=bool(product) and not df_bom_all.empty,
+    )
+    aggregates["shares_all"] = product_demand_share(product) if aggregates["product_bom"] else None
+
+    # ===============================
+    # LATEST INVENTORY (KPIs / risk table)
+    # Full ledger (all dates), so the latest row exists with a 7-day filter too
+    # ===============================
+    if "kpis" in compute or "riskTable" in compute:
+        forecast_by_rm = (
+            weighted_units(df_demand["material_demand_units"], demand_weight).groupby(df_demand["raw_material"]).sum()
+            if not df_demand.empty else pd.Series(dtype="int64")
+        )
+        if not df_inventory.empty and "inflow_quantity" in df_inventory.columns:
+            avg_daily_inflow_by_rm = df_inventory.groupby("raw_material")["inflow_quantity"].mean()
         else:
-            accuracy = 0
+            avg_daily_inflow_by_rm = pd.Series(dtype=float)
 
-        # Ensure days_to_stockout is always a valid number
-        if days_to_stockout is None or pd.isna(days_to_stockout) or not np.isfinite(days_to_stockout):
-            days_to_stockout = 999
-        
-        kpis = {
-            "totalForecastedRMDemand": format_kpi(total_forecasted_demand, total_forecasted_demand * 0.9),
-            "trailing30DConsumption": format_kpi(trailing_consumption, trailing_consumption * 0.95),
-            "consumptionForecastAccuracy": format_kpi(round(accuracy_consumption_kpi, 1), 85.0),
-            "projectedOverstock": format_kpi(overstock, overstock + 500),
-            "daysToStockout": format_kpi(float(days_to_stockout), float(days_to_stockout) + 5),
-        }
-        
-        # Cutoff date for UI
-        forecast_cutoff = FORECAST_CUTOFF_DATE.strftime('%Y-%m-%d')
+        inventory = latest_inventory_rows(df_inventory, channel_weight)
+        aggregates["inventory"] = inventory.assign(
+            forecasted_demand=forecast_by_rm.reindex(inventory["raw_material"], fill_value=0).to_numpy(),
+            avg_daily_inflow=avg_daily_inflow_by_rm.reindex(inventory["raw_material"], fill_value=0).to_numpy(),
+        )
 
-        # ===============================
-        # TREND DATA - INDUSTRY STANDARD FORMAT
-        # Last 30 days historical + Next 7/30 days forecast (Daily level)
-        # ===============================
-        
-        # Get daily forecast data
-        if not df_demand.empty:
-            daily_forecast_by_date = df_demand.groupby("date")["material_demand_units"].sum().reset_index()
-            daily_forecast_by_date.columns = ["date", "forecast"]
-            # Ensure dates are datetime and sorted
-            daily_forecast_by_date["date"] = pd.to_datetime(daily_forecast_by_date["date"])
-            daily_forecast_by_date = daily_forecast_by_date.sort_values("date").reset_index(drop=True)
-            # Remap forecast dates to start day-after cutoff (Demand Trend chart must show correct future dates)
-            forecast_start = FORECAST_CUTOFF_DATE + timedelta(days=1)
-            n_forecast = min(forecast_days, len(daily_forecast_by_date))
-            if n_forecast > 0:
-                new_dates = pd.date_range(start=forecast_start, periods=n_forecast, freq="D")
-                daily_forecast_by_date = daily_forecast_by_date.head(n_forecast).copy()
-                daily_forecast_by_date["date"] = new_dates
+    # ===============================
+    # DEMAND FLOW FUNNEL INPUTS
+    # ===============================
+    if "funnel" in compute:
+        sku_units = weighted_units(df_forecast["forecast_units"], channel_weight).sum() if not df_forecast.empty else 0
+
+        if not df_forecast.empty and not df_sku_master.empty:
+            forecasted_skus = df_forecast["sku_id"].unique()
+            products_from_skus = df_sku_master[
+                df_sku_master["sku_id"].isin(forecasted_skus)
+            ]["product_id"].unique()
         else:
-            daily_forecast_by_date = pd.DataFrame(columns=["date", "forecast"])
-        
-        # Get daily historical actuals (consumed_quantity from inventory)
-        # If a product is selected, allocate consumption proportionally based on demand share
-        if not df_inventory_historical.empty:
-            if product and product != "all" and not df_bom_expanded.empty:
-                # Calculate product-specific daily consumption by allocating proportionally
-                daily_historical_by_date = pd.DataFrame()
-                
-                # Get product's demand share for each raw material
-                df_bom_product_all = df_bom_expanded[df_bom_expanded["product_id"] == product].copy()
-                if not df_bom_product_all.empty:
-                    df_bom_product_all["material_demand_units"] = (
-                        df_bom_product_all["product_units"] * df_bom_product_all["consumption_per_unit"]
-                    )
-                    product_demand_by_rm = df_bom_product_all.groupby("raw_material")["material_demand_units"].sum()
-                    
-                    # Get total demand by raw material (all products) for allocation
-                    total_demand_by_rm_all = df_bom_expanded.copy()
-                    total_demand_by_rm_all["material_demand_units"] = (
-                        total_demand_by_rm_all["product_units"] * total_demand_by_rm_all["consumption_per_unit"]
-                    )
-                    total_demand_by_rm_all = total_demand_by_rm_all.groupby("raw_material")["material_demand_units"].sum()
-                    
-                    # Allocate consumption by date and raw material
-                    daily_allocated = []
-                    # Sort dates to ensure chronological order
-                    unique_dates = sorted(df_inventory_historical["date"].unique())
-                    for date in unique_dates:
-                        date_data = df_inventory_historical[df_inventory_historical["date"] == date]
-                        allocated_consumption = 0
-                        
-                        for _, row in date_data.iterrows():
-                            raw_mat = row["raw_material"]
-                            total_consumption = row["consumed_quantity"]
-                            product_demand = product_demand_by_rm.get(raw_mat, 0)
-                            total_demand = total_demand_by_rm_all.get(raw_mat, 0)
-                            
-                            if total_demand > 0:
-                                allocation_factor = product_demand / total_demand
-                                allocated_consumption += total_consumption * allocation_factor
-                        
-                        daily_allocated.append({
-                            "date": date,
-                            "actual": allocated_consumption
-                        })
-                    
-                    daily_historical_by_date = pd.DataFrame(daily_allocated)
-                    # Ensure dates are datetime and sorted
-                    if not daily_historical_by_date.empty:
-                        daily_historical_by_date["date"] = pd.to_datetime(daily_historical_by_date["date"])
-                        daily_historical_by_date = daily_historical_by_date.sort_values("date").reset_index(drop=True)
-                else:
-                    daily_historical_by_date = pd.DataFrame(columns=["date", "actual"])
-            else:
-                # No product filter - use total consumption
-                daily_historical_by_date = df_inventory_historical.groupby("date")["consumed_quantity"].sum().reset_index()
-                daily_historical_by_date.columns = ["date", "actual"]
+            products_from_skus = []
+
+        if not df_bom_all.empty and len(products_from_skus) > 0:
+            df_bom_filtered = df_bom_all[
+                df_bom_all["product_id"].isin(products_from_skus)
+            ]
+            product_units_df = df_bom_filtered.drop_duplicates(subset=["product_id", "date"])
+            product_forecast_units = product_units_df["product_units"].sum() if "product_units" in product_units_df.columns else 0
         else:
-            daily_historical_by_date = pd.DataFrame(columns=["date", "actual"])
-        
-        # Ensure dates are datetime and sort by date for proper chronological order
-        if not daily_historical_by_date.empty:
-            daily_historical_by_date["date"] = pd.to_datetime(daily_historical_by_date["date"])
-            daily_historical_by_date = daily_historical_by_date.sort_values("date").reset_index(drop=True)
-        
-        # Build combined trend data
-        trend_rows = []
-        
-        # Part 1: Historical actuals (no forecast)
-        for _, row in daily_historical_by_date.iterrows():
-            # Format date as string for JSON serialization
-            date_val = row["date"]
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime("%Y-%m-%d")
-            else:
-                date_str = str(date_val)
-            trend_rows.append({
-                "date": date_str,
-                "actual": json_safe(row["actual"]),
-                "forecast": None,
-                "period": "historical"
-            })
-        
-        # Part 2: Future forecast (no actual)
-        for _, row in daily_forecast_by_date.iterrows():
-            # Format date as string for JSON serialization
-            date_val = row["date"]
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime("%Y-%m-%d")
-            else:
-                date_str = str(date_val)
-            trend_rows.append({
-                "date": date_str,
-                "actual": None,
-                "forecast": json_safe(row["forecast"]),
-                "period": "forecast"
-            })
-        
-        combined_data = pd.DataFrame(trend_rows)
-        
-        # Ensure combined data is sorted by date for proper chart display
-        if not combined_data.empty:
-            combined_data["date"] = pd.to_datetime(combined_data["date"], errors="coerce")
-            combined_data = combined_data.sort_values("date").reset_index(drop=True)
-            # Convert back to string for JSON serialization
-            combined_data["date"] = combined_data["date"].dt.strftime("%Y-%m-%d")
-        
-        # Aggregate trend data based on aggregation setting
-        trend_data = []
-        if not combined_data.empty:
-            if aggregation == "weekly":
-                combined_data["bucket"] = pd.to_datetime(combined_data["date"]).dt.to_period("W").dt.start_time
-                trend_agg = combined_data.groupby("bucket").agg({
-                    "forecast": lambda x: x.dropna().sum() if x.dropna().any() else None,
-                    "actual": lambda x: x.dropna().sum() if x.dropna().any() else None,
-                    "period": "first"
-                }).reset_index()
-            elif aggregation == "monthly":
-                combined_data["bucket"] = pd.to_datetime(combined_data["date"]).dt.to_period("M").dt.start_time
-                trend_agg = combined_data.groupby("bucket").agg({
-                    "forecast": lambda x: x.dropna().sum() if x.dropna().any() else None,
-                    "actual": lambda x: x.dropna().sum() if x.dropna().any() else None,
-                    "period": "first"
-                }).reset_index()
-            else:
-                # Daily - no aggregation
-                trend_agg = combined_data.copy()
-                trend_agg["bucket"] = trend_agg["date"]
-            
-            for _, row in trend_agg.iterrows():
-                # Format date properly - convert to string if it's a datetime
-                bucket_date = row["bucket"]
-                if hasattr(bucket_date, 'strftime'):
-                    date_str = bucket_date.strftime("%Y-%m-%d")
-                elif isinstance(bucket_date, str):
-                    date_str = bucket_date
-                else:
-                    date_str = str(bucket_date)
-                
-                trend_data.append({
-                    "date": date_str,
-                    "forecast": json_safe(row["forecast"]) if pd.notna(row.get("forecast")) else None,
-                    "actual": json_safe(row["actual"]) if pd.notna(row.get("actual")) else None,
-                    "period": row.get("period", "historical")
-                })
-        
-        df_inventory_trend = df_inventory_historical
+            product_forecast_units = sku_units
 
-        # ===============================
-        # FORECAST COMPARISON - INDUSTRY STANDARD
-        # Historical actuals (weekly) + Future forecast with confidence bands
-        # ===============================
-        forecast_comparison_data = []
-        confidence_pct = 0.15
-        
-        # Build weekly data from daily historical and forecast
-        weekly_dict = {}  # Use dict to merge by week
-        
-        # Part 1: Historical actuals (weekly aggregation)
-        if not df_inventory_historical.empty:
-            df_hist_weekly = df_inventory_historical.copy()
-            df_hist_weekly["week"] = df_hist_weekly["date"].dt.to_period("W").dt.start_time
-            hist_weekly_agg = df_hist_weekly.groupby("week")["consumed_quantity"].sum().reset_index()
-            
-            for _, row in hist_weekly_agg.iterrows():
-                week_key = row["week"]
-                if week_key not in weekly_dict:
-                    weekly_dict[week_key] = {"week": week_key, "actual": 0, "forecast": 0}
-                weekly_dict[week_key]["actual"] += row["consumed_quantity"]
-        
-        # Part 2: Future forecast (weekly aggregation)
-        if not df_demand.empty:
-            df_fcst_weekly = df_demand.copy()
-            df_fcst_weekly["week"] = df_fcst_weekly["date"].dt.to_period("W").dt.start_time
-            fcst_weekly_agg = df_fcst_weekly.groupby("week")["material_demand_units"].sum().reset_index()
-            
-            for _, row in fcst_weekly_agg.iterrows():
-                week_key = row["week"]
-                if week_key not in weekly_dict:
-                    weekly_dict[week_key] = {"week": week_key, "actual": 0, "forecast": 0}
-                weekly_dict[week_key]["forecast"] += row["material_demand_units"]
-        
-        # Convert to sorted list and format
-        cutoff_week = FORECAST_CUTOFF_DATE.to_period("W").start_time
-        
-        for week_key in sorted(weekly_dict.keys()):
-            data = weekly_dict[week_key]
-            week_str = week_key.strftime("%b %d") if hasattr(week_key, "strftime") else str(week_key)
-            
-            actual_val = data["actual"] if data["actual"] > 0 else None
-            forecast_val = data["forecast"] if data["forecast"] > 0 else None
-            
-            # Determine period based on whether it's before or after cutoff
-            if week_key < cutoff_week:
-                period = "historical"
-            elif week_key > cutoff_week:
-                period = "forecast"
+        aggregates.update(
+            sku_units=sku_units,
+            product_count=len(products_from_skus),
+            product_forecast_units=product_forecast_units,
+        )
+
+    mark_section("filter")
+    return aggregates
+
+
+def projected_stockout(inventory, shares, forecast_days):
+    """
+    (projected overstock, days to stockout) over the latest inventory rows.
+
+    With a product's demand shares, closing inventory, safety stock and
+    expected inflow are allocated to the product first.
+    """
+    overstock = 0
+    days_to_stockout = 999  # Default so KPI always has a value
+    try:
+        if inventory.empty:
+            return overstock, days_to_stockout
+
+        df_latest_inventory = inventory.assign(expected_inflow=inventory["avg_daily_inflow"] * forecast_days)
+        if shares is not None:
+            by_rm = df_latest_inventory.set_index("raw_material")
+            for col in ("closing_inventory", "safety_stock", "expected_inflow"):
+                df_latest_inventory[col] = allocate_by_share(by_rm[col], shares).to_numpy()
+
+        df_latest_inventory["projected_inventory"] = (
+            df_latest_inventory["closing_inventory"]
+            + df_latest_inventory["expected_inflow"]
+            - df_latest_inventory["forecasted_demand"]
+        )
+        if forecast_days in [7, 30]:
+            sample_rm = df_latest_inventory.iloc[0]["raw_material"] if not df_latest_inventory.empty else None
+            if sample_rm:
+                sample_row = df_latest_inventory[df_latest_inventory["raw_material"] == sample_rm].iloc[0]
+                print(f"[DEBUG] Projected Overstock ({forecast_days}d) - {sample_rm}:")
+                print(f"  Closing: {sample_row['closing_inventory']:,.0f}, Safety: {sample_row['safety_stock']:,.0f}")
+                print(f"  Expected Inflow: {sample_row['expected_inflow']:,.0f}, Forecasted Demand: {sample_row['forecasted_demand']:,.0f}")
+                print(f"  Projected Inventory: {sample_row['projected_inventory']:,.0f}")
+                print(f"  Overstock: {max(0, sample_row['projected_inventory'] - sample_row['safety_stock']):,.0f}")
+
+        df_latest_inventory["overstock"] = (
+            df_latest_inventory["projected_inventory"] - df_latest_inventory["safety_stock"]
+        ).clip(lower=0)
+        overstock = json_safe(df_latest_inventory["overstock"].sum())
+
+        denom = max(forecast_days, 1)
+        df_latest_inventory["daily_demand"] = df_latest_inventory["forecasted_demand"] / denom
+        df_latest_inventory["daily_inflow"] = df_latest_inventory["expected_inflow"] / denom
+        df_latest_inventory["net_daily_consumption"] = df_latest_inventory["daily_demand"] - df_latest_inventory["daily_inflow"]
+        df_latest_inventory["days_to_stockout"] = df_latest_inventory.apply(
+            lambda row: (
+                0 if row["closing_inventory"] <= 0  # Already out of stock
+                else row["closing_inventory"] / row["net_daily_consumption"]
+                if row["net_daily_consumption"] > 0  # Net consumption is positive (demand > inflow)
+                else 999  # Net consumption <= 0 means inflow >= demand, so no stockout risk
+            ),
+            axis=1
+        )
+        min_days_to_stockout = df_latest_inventory["days_to_stockout"].min()
+        # Check for NaN or invalid values
+        if pd.isna(min_days_to_stockout) or not np.isfinite(min_days_to_stockout):
+            days_to_stockout = 999
+            print("[consumption] Days to Stockout: NaN/invalid value, defaulting to 999")
+        else:
+            days_to_stockout = json_safe(round(min_days_to_stockout, 0))
+            print(f"[consumption] Days to Stockout calculated: {days_to_stockout} (from {len(df_latest_inventory)} materials)")
+    except Exception as ex:
+        traceback.print_exc()
+        print(f"[consumption] Days to Stockout fallback due to: {ex}")
+        overstock = 0
+        days_to_stockout = 999
+
+    return overstock, days_to_stockout
+
+
+def consumption_kpis(aggregates, forecast_days):
+    historical_days = forecast_days  # Match historical period to forecast period
+
+    # Consumption Forecast Accuracy KPI: unfiltered daily averages
+    trailing_consumption_all = aggregates["consumption_all"]
+    forecast_daily_avg_consumption = aggregates["demand_all"] / forecast_days if forecast_days > 0 else 0
+    historical_daily_avg_consumption = trailing_consumption_all / historical_days if historical_days > 0 and trailing_consumption_all > 0 else 0
+    if historical_daily_avg_consumption > 0:
+        mape_consumption = abs(forecast_daily_avg_consumption - historical_daily_avg_consumption) / historical_daily_avg_consumption * 100
+        accuracy_consumption_kpi = max(0, min(100, 100 - mape_consumption))
+    else:
+        accuracy_consumption_kpi = 0
+
+    # Total Forecasted Raw Material Demand = Sum of material_demand_units (future forecast)
+    total_forecasted_demand = json_safe(safe_sum(aggregates["demand"], "material_demand_units"))
+
+    # Trailing N-Day Consumption = Sum of consumed_quantity from historical period
+    # If a product is selected, allocate consumption proportionally based on product's demand share
+    history = aggregates["historical_consumption"]
+    if aggregates["product_demand"] and not history.empty:
+        trailing_consumption = 0
+        shares = aggregates["shares"]
+        if shares is not None:
+            # Allocate consumption proportionally: product_consumption = total_consumption * (product_demand / total_demand)
+            # (summed in material order, only over materials with demand)
+            consumption_by_rm = history.groupby("raw_material")["consumed_quantity"].sum()
+            has_demand = shares[1].reindex(consumption_by_rm.index, fill_value=False)
+            allocated = allocate_by_share(consumption_by_rm, shares)
+            trailing_consumption = sum(allocated[has_demand].tolist())
+        trailing_consumption = json_safe(trailing_consumption)
+    else:
+        # No product filter - use total consumption
+        trailing_consumption = json_safe(safe_sum(aggregates["consumption"], "consumed_quantity"))
+
+    # Inventory Excess / Shortfall - PROJECTED after forecast period
+    mark_section("kpis")
+    overstock, days_to_stockout = projected_stockout(aggregates["inventory"], aggregates["shares"], forecast_days)
+    mark_section("stockout")
+
+    # Ensure days_to_stockout is always a valid number
+    if days_to_stockout is None or pd.isna(days_to_stockout) or not np.isfinite(days_to_stockout):
+        days_to_stockout = 999
+
+    return {"kpis": {
+        "totalForecastedRMDemand": format_kpi(total_forecasted_demand, total_forecasted_demand * 0.9),
+        "trailing30DConsumption": format_kpi(trailing_consumption, trailing_consumption * 0.95),
+        "consumptionForecastAccuracy": format_kpi(round(accuracy_consumption_kpi, 1), 85.0),
+        "projectedOverstock": format_kpi(overstock, overstock + 500),
+        "daysToStockout": format_kpi(float(days_to_stockout), float(days_to_stockout) + 5),
+    }}
+
+
+def consumption_trend(aggregates, forecast_days, aggregation):
+    """Last N days historical + next N days forecast (daily level), bucketed by aggregation."""
+    # Get daily forecast data
+    demand = aggregates["demand"]
+    if not demand.empty:
+        daily_forecast_by_date = demand.groupby("date")["material_demand_units"].sum().reset_index()
+        daily_forecast_by_date.columns = ["date", "forecast"]
+        # Ensure dates are datetime and sorted
+        daily_forecast_by_date["date"] = pd.to_datetime(daily_forecast_by_date["date"])
+        daily_forecast_by_date = daily_forecast_by_date.sort_values("date").reset_index(drop=True)
+        # Remap forecast dates to start day-after cutoff (Demand Trend chart must show correct future dates)
+        forecast_start = FORECAST_CUTOFF_DATE + timedelta(days=1)
+        n_forecast = min(forecast_days, len(daily_forecast_by_date))
+        if n_forecast > 0:
+            new_dates = pd.date_range(start=forecast_start, periods=n_forecast, freq="D")
+            daily_forecast_by_date = daily_forecast_by_date.head(n_forecast).copy()
+            daily_forecast_by_date["date"] = new_dates
+    else:
+        daily_forecast_by_date = pd.DataFrame(columns=["date", "forecast"])
+
+    # Get daily historical actuals (consumed_quantity from inventory)
+    # If a product is selected, allocate consumption proportionally based on demand share
+    history = aggregates["historical_consumption"]
+    if not history.empty:
+        if aggregates["product_demand"]:
+            # Product's demand share for each raw material
+            shares = aggregates["shares"]
+            if shares is not None:
+                # Allocate consumption by date and raw material
+                allocated = allocate_by_share(history["consumed_quantity"].set_axis(history["raw_material"]), shares)
+                daily_historical_by_date = (
+                    pd.DataFrame({"date": history["date"].to_numpy(), "actual": allocated.to_numpy()})
+                    .groupby("date", as_index=False)["actual"].sum()
+                )
             else:
-                period = "transition"  # Cutoff week has both
-            
-            # Calculate confidence bands only for forecast values
-            if forecast_val and forecast_val > 0:
-                conf_low = forecast_val * (1 - confidence_pct)
-                conf_high = forecast_val * (1 + confidence_pct)
+                daily_historical_by_date = pd.DataFrame(columns=["date", "actual"])
+        else:
+            # No product filter - use total consumption
+            daily_historical_by_date = aggregates["consumption"].groupby("date")["consumed_quantity"].sum().reset_index()
+            daily_historical_by_date.columns = ["date", "actual"]
+    else:
+        daily_historical_by_date = pd.DataFrame(columns=["date", "actual"])
+
+    # Ensure dates are datetime and sort by date for proper chronological order
+    if not daily_historical_by_date.empty:
+        daily_historical_by_date["date"] = pd.to_datetime(daily_historical_by_date["date"])
+        daily_historical_by_date = daily_historical_by_date.sort_values("date").reset_index(drop=True)
+
+    # Build combined trend data
+    trend_rows = []
+
+    # Part 1: Historical actuals (no forecast)
+    for _, row in daily_historical_by_date.iterrows():
+        # Format date as string for JSON serialization
+        date_val = row["date"]
+        if hasattr(date_val, 'strftime'):
+            date_str = date_val.strftime("%Y-%m-%d")
+        else:
+            date_str = str(date_val)
+        trend_rows.append({
+            "date": date_str,
+            "actual": json_safe(row["actual"]),
+            "forecast": None,
+            "period": "historical"
+        })
+
+    # Part 2: Future forecast (no actual)
+    for _, row in daily_forecast_by_date.iterrows():
+        # Format date as string for JSON serialization
+        date_val = row["date"]
+        if hasattr(date_val, 'strftime'):
+            date_str = date_val.strftime("%Y-%m-%d")
+        else:
+            date_str = str(date_val)
+        trend_rows.append({
+            "date": date_str,
+            "actual": None,
+            "forecast": json_safe(row["forecast"]),
+            "period": "forecast"
+        })
+
+    combined_data = pd.DataFrame(trend_rows)
+
+    # Ensure combined data is sorted by date for proper chart display
+    if not combined_data.empty:
+        combined_data["date"] = pd.to_datetime(combined_data["date"], errors="coerce")
+        combined_data = combined_data.sort_values("date").reset_index(drop=True)
+        # Convert back to string for JSON serialization
+        combined_data["date"] = combined_data["date"].dt.strftime("%Y-%m-%d")
+
+    # Aggregate trend data based on aggregation setting
+    trend_data = []
+    if not combined_data.empty:
+        if aggregation == "weekly":
+            combined_data["bucket"] = pd.to_datetime(combined_data["date"]).dt.to_period("W").dt.start_time
+            trend_agg = combined_data.groupby("bucket").agg({
+                "forecast": lambda x: x.dropna().sum() if x.dropna().any() else None,
+                "actual": lambda x: x.dropna().sum() if x.dropna().any() else None,
+                "period": "first"
+            }).reset_index()
+        elif aggregation == "monthly":
+            combined_data["bucket"] = pd.to_datetime(combined_data["date"]).dt.to_period("M").dt.start_time
+            trend_agg = combined_data.groupby("bucket").agg({
+                "forecast": lambda x: x.dropna().sum() if x.dropna().any() else None,
+                "actual": lambda x: x.dropna().sum() if x.dropna().any() else None,
+                "period": "first"
+            }).reset_index()
+        else:
+            # Daily - no aggregation
+            trend_agg = combined_data.copy()
+            trend_agg["bucket"] = trend_agg["date"]
+
+        for _, row in trend_agg.iterrows():
+            # Format date properly - convert to string if it's a datetime
+            bucket_date = row["bucket"]
+            if hasattr(bucket_date, 'strftime'):
+                date_str = bucket_date.strftime("%Y-%m-%d")
+            elif isinstance(bucket_date, str):
+                date_str = bucket_date
             else:
-                conf_low = None
-                conf_high = None
-            
-            forecast_comparison_data.append({
-                "date": week_str,
-                "actual": json_safe(actual_val) if actual_val else None,
-                "forecast": json_safe(forecast_val) if forecast_val else None,
-                "confidenceLow": json_safe(conf_low) if conf_low else None,
-                "confidenceHigh": json_safe(conf_high) if conf_high else None,
-                "period": period
+                date_str = str(bucket_date)
+
+            trend_data.append({
+                "date": date_str,
+                "forecast": json_safe(row["forecast"]) if pd.notna(row.get("forecast")) else None,
+                "actual": json_safe(row["actual"]) if pd.notna(row.get("actual")) else None,
+                "period": row.get("period", "historical")
             })
 
-        # ===============================
-        # DEMAND FLOW FUNNEL
-        # ===============================
-        sku_units = json_safe(safe_sum(df_forecast, "forecast_units"))
-        
-        if not df_forecast.empty and not df_sku_master.empty:
-            forecasted_skus = df_forecast["sku_id"].unique()
-            products_from_skus = df_sku_master[
-                df_sku_master["sku_id"].isin(forecasted_skus)
-            ]["product_id"].unique()
-            product_count = len(products_from_skus)
+    return {"rawMaterialDemandTrend": trend_data}
+
+
+def consumption_comparison(aggregates):
+    """Historical actuals (weekly) + future forecast with confidence bands."""
+    forecast_comparison_data = []
+    confidence_pct = 0.15
+
+    # Build weekly data from daily historical and forecast
+    weekly_dict = {}  # Use dict to merge by week
+
+    # Part 1: Historical actuals (weekly aggregation)
+    consumption = aggregates["consumption"]
+    if not consumption.empty:
+        df_hist_weekly = consumption.copy()
+        df_hist_weekly["week"] = pd.to_datetime(df_hist_weekly["date"]).dt.to_period("W").dt.start_time
+        hist_weekly_agg = df_hist_weekly.groupby("week")["consumed_quantity"].sum().reset_index()
+
+        for _, row in hist_weekly_agg.iterrows():
+            week_key = row["week"]
+            if week_key not in weekly_dict:
+                weekly_dict[week_key] = {"week": week_key, "actual": 0, "forecast": 0}
+            weekly_dict[week_key]["actual"] += row["consumed_quantity"]
+
+    # Part 2: Future forecast (weekly aggregation)
+    demand = aggregates["demand"]
+    if not demand.empty:
+        df_fcst_weekly = demand.copy()
+        df_fcst_weekly["week"] = pd.to_datetime(df_fcst_weekly["date"]).dt.to_period("W").dt.start_time
+        fcst_weekly_agg = df_fcst_weekly.groupby("week")["material_demand_units"].sum().reset_index()
+
+        for _, row in fcst_weekly_agg.iterrows():
+            week_key = row["week"]
+            if week_key not in weekly_dict:
+                weekly_dict[week_key] = {"week": week_key, "actual": 0, "forecast": 0}
+            weekly_dict[week_key]["forecast"] += row["material_demand_units"]
+
+    # Convert to sorted list and format
+    cutoff_week = FORECAST_CUTOFF_DATE.to_period("W").start_time
+
+    for week_key in sorted(weekly_dict.keys()):
+        data = weekly_dict[week_key]
+        week_str = week_key.strftime("%b %d") if hasattr(week_key, "strftime") else str(week_key)
+
+        actual_val = data["actual"] if data["actual"] > 0 else None
+        forecast_val = data["forecast"] if data["forecast"] > 0 else None
+
+        # Determine period based on whether it's before or after cutoff
+        if week_key < cutoff_week:
+            period = "historical"
+        elif week_key > cutoff_week:
+            period = "forecast"
         else:
-            products_from_skus = []
-            product_count = 0
-        
-        df_bom_expanded = load_csv("product_bom_expanded.csv")
-        if not df_bom_expanded.empty and len(products_from_skus) > 0:
-            df_bom_filtered = df_bom_expanded[
-                df_bom_expanded["product_id"].isin(products_from_skus)
-            ]
-            product_units_df = df_bom_filtered.drop_duplicates(subset=["product_id", "date"])
-            product_forecast_units = json_safe(product_units_df["product_units"].sum() if "product_units" in product_units_df.columns else 0)
+            period = "transition"  # Cutoff week has both
+
+        # Calculate confidence bands only for forecast values
+        if forecast_val and forecast_val > 0:
+            conf_low = forecast_val * (1 - confidence_pct)
+            conf_high = forecast_val * (1 + confidence_pct)
         else:
-            product_forecast_units = sku_units
-        
-        raw_material_demand_units = json_safe(total_forecasted_demand)
-
-        funnel = {
-            "steps": {
-                "skuForecast": {"label": "SKU Forecast", "value": sku_units, "unit": "Units"},
-                "productMix": {"label": "Product Mix", "value": product_count, "unit": "Products"},
-                "productForecast": {"label": "Product Forecast", "value": product_forecast_units, "unit": "Units"},
-                "rawMaterialDemand": {
-                    "label": "Material Demand",
-                    "value": raw_material_demand_units,
-                    "unit": "Units",
-                },
-            }
+            conf_low = None
+            conf_high = None
+
+        forecast_comparison_data.append({
+            "date": week_str,
+            "actual": json_safe(actual_val) if actual_val else None,
+            "forecast": json_safe(forecast_val) if forecast_val else None,
+            "confidenceLow": json_safe(conf_low) if conf_low else None,
+            "confidenceHigh": json_safe(conf_high) if conf_high else None,
+            "period": period
+        })
+    return {"forecastComparison": forecast_comparison_data}
+
+
+def consumption_funnel(aggregates):
+    sku_units = json_safe(aggregates["sku_units"])
+    return {"demandFlowFunnel": {
+        "steps": {
+            "skuForecast": {"label": "SKU Forecast", "value": sku_units, "unit": "Units"},
+            "productMix": {"label": "Product Mix", "value": aggregates["product_count"], "unit": "Products"},
+            "productForecast": {
+                "label": "Product Forecast",
+                "value": json_safe(aggregates["product_forecast_units"]),
+                "unit": "Units",
+            },
+            "rawMaterialDemand": {
+                "label": "Material Demand",
+                "value": json_safe(safe_sum(aggregates["demand"], "material_demand_units")),
+                "unit": "Units",
+            },
         }
+    }}
+
+
+def consumption_heatmap(aggregates, forecast_days):
+    """
+    Forecasted consumption vs 30-day historical average.
+
+    Forecast period: day after cutoff (e.g. 2026-02-06); historical: last 30 days
+    """
+    heatmap_data = []
+    consumption = aggregates["consumption"]
+    demand = aggregates["demand"]
+
+    if not consumption.empty and not demand.empty:
+        # Calculate 30-day historical average for each raw material
+        historical_30d = consumption[
+            (consumption["date"] >= FORECAST_CUTOFF_DATE - timedelta(days=29)) &
+            (consumption["date"] <= FORECAST_CUTOFF_DATE)
+        ]
+        avg_by_rm = historical_30d.groupby("raw_material")["consumed_quantity"].mean()
+
+        # Forecast period: remap demand dates to start day-after cutoff (so heatmap has data)
+        forecast_start_date = FORECAST_CUTOFF_DATE + timedelta(days=1)
+        df_demand_sorted = demand.sort_values("date").reset_index(drop=True)
+        unique_dates = df_demand_sorted["date"].unique()
+        n_use = min(forecast_days, len(unique_dates))
+        if n_use > 0:
+            old_dates = list(unique_dates[:n_use])
+            new_dates = pd.date_range(start=forecast_start_date, periods=n_use, freq="D")
+            date_map = {pd.Timestamp(d): new_dates[i] for i, d in enumerate(old_dates)}
+            df_forecast_period = df_demand_sorted[df_demand_sorted["date"].isin(old_dates)].copy()
+            df_forecast_period["date"] = df_forecast_period["date"].map(lambda d: date_map.get(pd.Timestamp(d), d))
+        else:
+            df_forecast_period = pd.DataFrame()
 
-        # ===============================
-        # CONSUMPTION VARIANCE HEATMAP
-        # Shows forecasted consumption vs 30-day historical average
-        # Forecast period: day after cutoff (e.g. 2026-02-06); historical: last 30 days
-        # ===============================
-        heatmap_data = []
-        
-        if not df_inventory_historical.empty and not df_demand.empty:
-            # Calculate 30-day historical average for each raw material
-            historical_30d = df_inventory_historical[
-                (df_inventory_historical["date"] >= FORECAST_CUTOFF_DATE - timedelta(days=29)) &
-                (df_inventory_historical["date"] <= FORECAST_CUTOFF_DATE)
-            ]
-            avg_by_rm = historical_30d.groupby("raw_material")["consumed_quantity"].mean()
-            
-            # Forecast period: remap demand dates to start day-after cutoff (so heatmap has data)
-            forecast_start_date = FORECAST_CUTOFF_DATE + timedelta(days=1)
-            df_demand_sorted = df_demand.sort_values("date").reset_index(drop=True)
-            unique_dates = df_demand_sorted["date"].unique()
-            n_use = min(forecast_days, len(unique_dates))
-            if n_use > 0:
-                old_dates = list(unique_dates[:n_use])
-                new_dates = pd.date_range(start=forecast_start_date, periods=n_use, freq="D")
-                date_map = {pd.Timestamp(d): new_dates[i] for i, d in enumerate(old_dates)}
-                df_forecast_period = df_demand_sorted[df_demand_sorted["date"].isin(old_dates)].copy()
-                df_forecast_period["date"] = df_forecast_period["date"].map(lambda d: date_map.get(pd.Timestamp(d), d))
-            else:
-                df_forecast_period = pd.DataFrame()
-            
-            if not df_forecast_period.empty:
-                # Get forecasted consumption by date and raw material
-                forecast_by_date_rm = df_forecast_period.groupby(["date", "raw_material"])["material_demand_units"].sum().reset_index()
-                
-                # Limit to forecast period dates (Dec 31, 2025 onwards) - show next 7 or 30 days based on filter
-                forecast_dates = sorted(forecast_by_date_rm["date"].unique())
-                if forecast_days == 7:
-                    forecast_dates = forecast_dates[:7]
-                else:
-                    forecast_dates = forecast_dates[:30]
-                forecast_by_date_rm = forecast_by_date_rm[forecast_by_date_rm["date"].isin(forecast_dates)]
-                
-                # Limit to top 6 raw materials by volume (based on historical average)
-                top_materials = avg_by_rm.nlargest(6).index.tolist()
-                forecast_by_date_rm = forecast_by_date_rm[forecast_by_date_rm["raw_material"].isin(top_materials)]
-                
-                for _, row in forecast_by_date_rm.iterrows():
-                    date_val = row["date"]
-                    rm = row["raw_material"]
-                    forecasted = row["material_demand_units"]
-                    
-                    historical_avg = avg_by_rm.get(rm, 0)
-                    
-                    if historical_avg > 0:
-                        variance_pct = ((forecasted - historical_avg) / historical_avg) * 100
-                    else:
-                        variance_pct = 0
-                    
-                    # Format date nicely
-                    date_str = date_val.strftime("%b %d") if hasattr(date_val, "strftime") else str(date_val)[:10]
-                    
-                    heatmap_data.append({
-                        "date": date_str,
-                        "rawMaterial": str(rm),
-                        "variancePct": json_safe(round(variance_pct, 2)),
-                        "forecast": json_safe(round(forecasted, 0)),  # Forecasted consumption
-                        "average": json_safe(round(historical_avg, 0))  # 30-day historical average
-                    })
+        if not df_forecast_period.empty:
+            # Get forecasted consumption by date and raw material
+            forecast_by_date_rm = df_forecast_period.groupby(["date", "raw_material"])["material_demand_units"].sum().reset_index()
 
-        # ===============================
-        # RAW MATERIAL RISK TABLE
-        # ===============================
-        risk_table_data = []
-        
-        if not df_inventory_historical.empty and not df_demand.empty:
-            # Use FULL inventory (all dates) for "latest" row so Stockout Date works with 7-day filter too.
-            # With 7-day filter, df_inventory_historical has only last 7 days; if all closing=0 there, no date showed.
-            df_inv_sorted = df_inventory.sort_values("date")
-            latest_positive = df_inv_sorted[df_inv_sorted["closing_inventory"] > 0].groupby("raw_material", as_index=False).tail(1)
-            latest_any = df_inv_sorted.groupby("raw_material", as_index=False).tail(1)
-            missing = set(latest_any["raw_material"]) - set(latest_positive["raw_material"])
-            if missing:
-                fallback = latest_any[latest_any["raw_material"].isin(missing)]
-                df_inv_latest = pd.concat([latest_positive, fallback], ignore_index=True).drop_duplicates(subset=["raw_material"], keep="first")
-            else:
-                df_inv_latest = latest_positive
-            
-            # Get consumption by raw material - allocate if product filter is selected
-            if product and product != "all" and not df_bom_expanded.empty:
-                # Calculate product-specific consumption allocation
-                df_bom_product_all = df_bom_expanded[df_bom_expanded["product_id"] == product].copy()
-                if not df_bom_product_all.empty:
-                    df_bom_product_all["material_demand_units"] = (
-                        df_bom_product_all["product_units"] * df_bom_product_all["consumption_per_unit"]
-                    )
-                    product_demand_by_rm = df_bom_product_all.groupby("raw_material")["material_demand_units"].sum()
-                    
-                    total_demand_by_rm_all = df_bom_expanded.copy()
-                    total_demand_by_rm_all["material_demand_units"] = (
-                        total_demand_by_rm_all["product_units"] * total_demand_by_rm_all["consumption_per_unit"]
-                    )
-                    total_demand_by_rm_all = total_demand_by_rm_all.groupby("raw_material")["material_demand_units"].sum()
-                    
-                    # Allocate consumption proportionally
-                    consumption_by_rm = {}
-                    total_consumption_by_rm = df_inventory_historical.groupby("raw_material")["consumed_quantity"].sum()
-                    for rm in total_consumption_by_rm.index:
-                        total_consumption = total_consumption_by_rm[rm]
-                        product_demand = product_demand_by_rm.get(rm, 0)
-                        total_demand = total_demand_by_rm_all.get(rm, 0)
-                        if total_demand > 0:
-                            consumption_by_rm[rm] = total_consumption * (product_demand / total_demand)
-                        else:
-                            consumption_by_rm[rm] = 0
-                    consumption_by_rm = pd.Series(consumption_by_rm)
-                else:
-                    consumption_by_rm = pd.Series()
-            else:
-                consumption_by_rm = df_inventory_historical.groupby("raw_material")["consumed_quantity"].sum()
-            
-            forecast_by_rm = df_demand.groupby("raw_material")["material_demand_units"].sum()
-            
-            # Get expected inflow for stockout date calculation
-            if not df_inventory_full.empty and "inflow_quantity" in df_inventory_full.columns:
-                avg_daily_inflow_by_rm = df_inventory_full.groupby("raw_material")["inflow_quantity"].mean()
+            # Limit to forecast period dates (Dec 31, 2025 onwards) - show next 7 or 30 days based on filter
+            forecast_dates = sorted(forecast_by_date_rm["date"].unique())
+            if forecast_days == 7:
+                forecast_dates = forecast_dates[:7]
             else:
-                avg_daily_inflow_by_rm = pd.Series()
-            
-            for idx, row in df_inv_latest.iterrows():
+                forecast_dates = forecast_dates[:30]
+            forecast_by_date_rm = forecast_by_date_rm[forecast_by_date_rm["date"].isin(forecast_dates)]
+
+            # Limit to top 6 raw materials by volume (based on historical average)
+            top_materials = avg_by_rm.nlargest(6).index.tolist()
+            forecast_by_date_rm = forecast_by_date_rm[forecast_by_date_rm["raw_material"].isin(top_materials)]
+
+            for _, row in forecast_by_date_rm.iterrows():
+                date_val = row["date"]
                 rm = row["raw_material"]
-                closing_inv = row.get("closing_inventory", 0)
-                safety_stock = row.get("safety_stock", 0)
-                # Get the date of this inventory record (latest inventory date for this material)
-                inventory_date = pd.to_datetime(row.get("date", FORECAST_CUTOFF_DATE))
-                
-                forecast_demand = forecast_by_rm.get(rm, 0)
-                actual_consumption = consumption_by_rm.get(rm, 0) if isinstance(consumption_by_rm, pd.Series) else consumption_by_rm.get(rm, 0)
-                
-                # Allocate inventory values if product filter is selected
-                allocation_factor = 1.0  # Default: no allocation
-                if product and product != "all" and not df_bom_expanded.empty:
-                    df_bom_product_all = df_bom_expanded[df_bom_expanded["product_id"] == product].copy()
-                    if not df_bom_product_all.empty:
-                        df_bom_product_all["material_demand_units"] = (
-                            df_bom_product_all["product_units"] * df_bom_product_all["consumption_per_unit"]
-                        )
-                        product_demand_by_rm = df_bom_product_all.groupby("raw_material")["material_demand_units"].sum()
-                        
-                        total_demand_by_rm_all = df_bom_expanded.copy()
-                        total_demand_by_rm_all["material_demand_units"] = (
-                            total_demand_by_rm_all["product_units"] * total_demand_by_rm_all["consumption_per_unit"]
-                        )
-                        total_demand_by_rm_all = total_demand_by_rm_all.groupby("raw_material")["material_demand_units"].sum()
-                        
-                        product_demand = product_demand_by_rm.get(rm, 0)
-                        total_demand = total_demand_by_rm_all.get(rm, 0)
-                        if total_demand > 0:
-                            allocation_factor = product_demand / total_demand
-                            closing_inv = closing_inv * allocation_factor
-                            safety_stock = safety_stock * allocation_factor
-                
-                # Calculate daily consumption rate for stockout date
-                daily_consumption = actual_consumption / historical_days if historical_days > 0 else 0
-                # Get average daily inflow (from full historical data, same as KPI calculation)
-                avg_daily_inflow = avg_daily_inflow_by_rm.get(rm, 0) if isinstance(avg_daily_inflow_by_rm, pd.Series) else avg_daily_inflow_by_rm.get(rm, 0)
-                # Calculate expected inflow for forecast period (before allocation)
-                expected_inflow_total = avg_daily_inflow * forecast_days
-                # Apply allocation factor if product filter is selected
-                expected_inflow = expected_inflow_total * allocation_factor
-                # Daily inflow for stockout calculation (allocated)
-                daily_inflow = avg_daily_inflow * allocation_factor
-                net_daily_consumption = daily_consumption - daily_inflow
-                
-                # Calculate projected inventory (same logic as KPI calculation)
-                # Projected = Current + Inflow - Total Forecasted Demand
-                projected_inventory = closing_inv + expected_inflow - forecast_demand
-                
-                # Calculate stockout risk date (show when inventory would run out)
-                # Use the actual inventory date as the base, not FORECAST_CUTOFF_DATE
-                stockout_risk_date = None
-                if closing_inv <= 0:
-                    # Already out of stock - stockout date is the inventory date itself
-                    stockout_risk_date = inventory_date.strftime("%Y-%m-%d")
-                elif closing_inv > 0:
-                    # Prefer net consumption (consumption - inflow); fallback to gross consumption so date still shows
-                    rate = net_daily_consumption if net_daily_consumption > 0 else daily_consumption
-                    if rate > 0:
-                        days_until_stockout = closing_inv / rate
-                        if days_until_stockout < 730:  # Within 2 years
-                            # Use inventory_date (latest inventory record date) as base, not FORECAST_CUTOFF_DATE
-                            stockout_risk_date = (inventory_date + pd.Timedelta(days=int(max(0, days_until_stockout)))).strftime("%Y-%m-%d")
-                    elif daily_consumption > 0:
-                        # If net consumption is 0 or negative but gross consumption > 0, use gross consumption
-                        days_until_stockout = closing_inv / daily_consumption
-                        if days_until_stockout < 730:
-                            stockout_risk_date = (inventory_date + pd.Timedelta(days=int(max(0, days_until_stockout)))).strftime("%Y-%m-%d")
-                
-                # Risk status determination - Use PROJECTED inventory to match overstock KPI logic
-                # This ensures consistency: materials showing overstock in KPI will show Overstock status
-                if projected_inventory < 0 or projected_inventory < safety_stock * 0.5:
-                    risk_status = "Stockout"
-                elif projected_inventory > safety_stock * 2:
-                    risk_status = "Overstock"
+                forecasted = row["material_demand_units"]
+
+                historical_avg = avg_by_rm.get(rm, 0)
+
+                if historical_avg > 0:
+                    variance_pct = ((forecasted - historical_avg) / historical_avg) * 100
                 else:
-                    risk_status = "Balanced"
-                
-                risk_table_data.append({
-                    "id": str(rm),
+                    variance_pct = 0
+
+                # Format date nicely
+                date_str = date_val.strftime("%b %d") if hasattr(date_val, "strftime") else str(date_val)[:10]
+
+                heatmap_data.append({
+                    "date": date_str,
                     "rawMaterial": str(rm),
-                    "forecastDemand": json_safe(round(forecast_demand, 2)),
-                    "actualConsumption": json_safe(round(actual_consumption, 2)),
-                    "closingInventory": json_safe(round(closing_inv, 2)),
-                    "safetyStock": json_safe(round(safety_stock, 2)),
-                    "riskStatus": risk_status,
-                    "stockoutRiskDate": stockout_risk_date
+                    "variancePct": json_safe(round(variance_pct, 2)),
+                    "forecast": json_safe(round(forecasted, 0)),  # Forecasted consumption
+                    "average": json_safe(round(historical_avg, 0))  # 30-day historical average
                 })
+    return {"consumptionErrorHeatmap": heatmap_data}
+
+
+def consumption_risk_table(aggregates, forecast_days):
+    historical_days = forecast_days  # Match historical period to forecast period
+    risk_table_data = []
+    history = aggregates["historical_consumption"]
+
+    if not history.empty and aggregates["has_material_demand"]:
+        # Latest ledger rows over all dates, so Stockout Date works with the 7-day filter too
+        df_inv_latest = aggregates["inventory"]
+
+        # Get consumption by raw material - allocate if product filter is selected
+        # (the product shares span every horizon)
+        shares = None
+        consumption_by_rm = history.groupby("raw_material")["consumed_quantity"].sum()
+        if aggregates["product_bom"]:
+            shares = aggregates["shares_all"]
+            # Allocate consumption proportionally
+            consumption_by_rm = allocate_by_share(consumption_by_rm, shares) if shares is not None else pd.Series()
+
+        for idx, row in df_inv_latest.iterrows():
+            rm = row["raw_material"]
+            closing_inv = row.get("closing_inventory", 0)
+            safety_stock = row.get("safety_stock", 0)
+            # Get the date of this inventory record (latest inventory date for this material)
+            inventory_date = pd.to_datetime(row.get("date", FORECAST_CUTOFF_DATE))
+
+            forecast_demand = row["forecasted_demand"]
+            actual_consumption = consumption_by_rm.get(rm, 0)
+
+            # Allocate inventory values if product filter is selected
+            allocation_factor = 1.0  # Default: no allocation
+            if shares is not None:
+                share, has_demand = shares
+                if has_demand.get(rm, False):
+                    allocation_factor = share[rm]
+                    closing_inv = closing_inv * allocation_factor
+                    safety_stock = safety_stock * allocation_factor
+
+            # Calculate daily consumption rate for stockout date
+            daily_consumption = actual_consumption / historical_days if historical_days > 0 else 0
+            # Get average daily inflow (from full historical data, same as KPI calculation)
+            avg_daily_inflow = row["avg_daily_inflow"]
+            # Calculate expected inflow for forecast period (before allocation)
+            expected_inflow_total = avg_daily_inflow * forecast_days
+            # Apply allocation factor if product filter is selected
+            expected_inflow = expected_inflow_total * allocation_factor
+            # Daily inflow for stockout calculation (allocated)
+            daily_inflow = avg_daily_inflow * allocation_factor
+            net_daily_consumption = daily_consumption - daily_inflow
+
+            # Calculate projected inventory (same logic as KPI calculation)
+            # Projected = Current + Inflow - Total Forecasted Demand
+            projected_inventory = closing_inv + expected_inflow - forecast_demand
+
+            # Calculate stockout risk date (show when inventory would run out)
+            # Use the actual inventory date as the base, not FORECAST_CUTOFF_DATE
+            stockout_risk_date = None
+            if closing_inv <= 0:
+                # Already out of stock - stockout date is the inventory date itself
+                stockout_risk_date = inventory_date.strftime("%Y-%m-%d")
+            elif closing_inv > 0:
+                # Prefer net consumption (consumption - inflow); fallback to gross consumption so date still shows
+                rate = net_daily_consumption if net_daily_consumption > 0 else daily_consumption
+                if rate > 0:
+                    days_until_stockout = closing_inv / rate
+                    if days_until_stockout < 730:  # Within 2 years
+                        # Use inventory_date (latest inventory record date) as base, not FORECAST_CUTOFF_DATE
+                        stockout_risk_date = (inventory_date + pd.Timedelta(days=int(max(0, days_until_stockout)))).strftime("%Y-%m-%d")
+                elif daily_consumption > 0:
+                    # If net consumption is 0 or negative but gross consumption > 0, use gross consumption
+                    days_until_stockout = closing_inv / daily_consumption
+                    if days_until_stockout < 730:
+                        stockout_risk_date = (inventory_date + pd.Timedelta(days=int(max(0, days_until_stockout)))).strftime("%Y-%m-%d")
+
+            # Risk status determination - Use PROJECTED inventory to match overstock KPI logic
+            # This ensures consistency: materials showing overstock in KPI will show Overstock status
+            if projected_inventory < 0 or projected_inventory < safety_stock * 0.5:
+                risk_status = "Stockout"
+            elif projected_inventory > safety_stock * 2:
+                risk_status = "Overstock"
+            else:
+                risk_status = "Balanced"
+
+            risk_table_data.append({
+                "id": str(rm),
+                "rawMaterial": str(rm),
+                "forecastDemand": json_safe(round(forecast_demand, 2)),
+                "actualConsumption": json_safe(round(actual_consumption, 2)),
+                "closingInventory": json_safe(round(closing_inv, 2)),
+                "safetyStock": json_safe(round(safety_stock, 2)),
+                "riskStatus": risk_status,
+                "stockoutRiskDate": stockout_risk_date
+            })
+    return {"rawMaterialRiskTable": risk_table_data}
 
-        return jsonify({
-            "kpis": kpis,
-            "rawMaterialDemandTrend": trend_data,
-            "rawMaterialRiskTable": risk_table_data,
-            "demandFlowFunnel": funnel,
-            "forecastComparison": forecast_comparison_data,
-            "consumptionErrorHeatmap": heatmap_data,
-            "forecastCutoffDate": forecast_cutoff,  # Cutoff date for UI visualization
-            "forecastHorizon": forecast_horizon,
-            "historicalDays": historical_days  # Number of historical days shown
-        })
 
+@app.route('/api/consumption/dashboard', methods=['GET'])
+@cached_dashboard(CONSUMPTION_DATASETS)
+def consumption_dashboard():
+    try:
+        # ===============================
+        # READ QUERY PARAMS
+        # ===============================
+        filters = dashboard_filters(DASHBOARD_FILTER_PARAMS)
+        date_range = request.args.get("dateRange", "next-30")
+        aggregation = request.args.get("aggregation", "daily")
+
+        # ===============================
+        # PANELS (memoized ones are not recomputed)
+        # ===============================
+        panels = requested_panels(CONSUMPTION_PANELS)
+        panel_keys = panel_cache_keys("consumption", CONSUMPTION_PANELS)
+        fragments, compute = cached_panels(panel_keys, CONSUMPTION_PANELS, panels)
+        if not compute:
+            return jsonify(panel_response(panels, fragments))
+        computed = {}
+
+        # Determine forecast horizon from new filter format
+        forecast_days = get_forecast_horizon_days(date_range)
+
+        aggregates = dashboard_aggregates(
+            "consumption", forecast_days, compute,
+            channel=filters["channel"],
+            store=filters["store"],
+            sku=filters["sku"],
+            product=filters["product"],
+            raw_material=filters["rawMaterial"],
+            category=filters["category"],
+        )
+
+        if "kpis" in compute:
+            computed["kpis"] = consumption_kpis(aggregates, forecast_days)
+        mark_section("kpis")
+
+        if "trend" in compute:
+            computed["trend"] = consumption_trend(aggregates, forecast_days, aggregation)
+        mark_section("trend")
+
+        if "comparison" in compute:
+            computed["comparison"] = consumption_comparison(aggregates)
+        mark_section("comparison")
+
+        if "funnel" in compute:
+            computed["funnel"] = consumption_funnel(aggregates)
+        mark_section("funnel")
+
+        if "heatmap" in compute:
+            computed["heatmap"] = consumption_heatmap(aggregates, forecast_days)
+        mark_section("heatmap")
+
+        if "riskTable" in compute:
+            computed["riskTable"] = consumption_risk_table(aggregates, forecast_days)
+        mark_section("riskTable")
+
+        fragments.update(store_panels(panel_keys, computed))
+        return jsonify(panel_response(panels, fragments))
+
+    except PanelRequestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -1182,522 +2029,583 @@ def consumption_dashboard():
 # =========================================================
 # ENDPOINT 2: SALES DASHBOARD (Updated for daily format)
 # =========================================================
+def sales_aggregates(forecast_days, compute, channel=None, store=None, sku=None,
+                     product=None, category=None):
+    """
+    Sales dashboard aggregates for the filtered view, in pandas.
+
+    Filters are None when not set. Returns a dict:
+    - forecast_all / sales_all: unfiltered horizon forecast and baseline
+      sales (accuracy KPI)
+    - forecast_units, forecast_volatility (std of the forecast rows),
+      has_forecast; sales_units, has_sales
+    - channels: sales channels in order of first appearance, with
+      sales_by_date_channel and forecast_by_date (trend / rollingError)
+    - sku_forecast: total_forecast, volatility and avg_forecast_daily per
+      SKU (performance / heatmap / topDrivers / deviation)
+    - forecast_by_sku_date (heatmap)
+    - sku_metrics (performance): sku_forecast outer-joined with each SKU's
+      total_actual / avg_daily / actual_volatility and category
+    - deviations (deviation): forecast vs actual % per SKU with sales
+    """
+    compute = set(compute)
+    forecast_horizon = f"{forecast_days}day"
+
+    df_forecast = load_csv("sku_daily_forecast.csv")
+    df_sales = load_csv("sku_daily_sales.csv")
+    df_sku_master = load_csv("sku_master.csv")
+    mark_section("load")
+
+    # Parse dates
+    if not df_forecast.empty:
+        df_forecast['date'] = pd.to_datetime(df_forecast['date'], errors='coerce')
+    if not df_sales.empty:
+        df_sales['date'] = pd.to_datetime(df_sales['date'], errors='coerce')
+
+    # Filter forecast by horizon (7day or 30day)
+    if not df_forecast.empty and "forecast_horizon" in df_forecast.columns:
+        df_forecast = df_forecast[df_forecast["forecast_horizon"] == forecast_horizon]
+
+    # Get last N days of historical sales (based on filter)
+    historical_start = FORECAST_CUTOFF_DATE - timedelta(days=forecast_days - 1)
+    df_sales_historical = df_sales[
+        (df_sales["date"] >= historical_start) &
+        (df_sales["date"] <= FORECAST_CUTOFF_DATE)
+    ].copy() if not df_sales.empty else pd.DataFrame()
+
+    # ===============================
+    # Forecast Accuracy KPI: always use UNFILTERED data so dashboard shows
+    # consistent overall accuracy (~90%) regardless of channel/store/SKU filters.
+    # ===============================
+    accuracy_historical_start = FORECAST_CUTOFF_DATE - timedelta(days=SALES_ACCURACY_BASELINE_DAYS - 1)
+    aggregates = {
+        "forecast_all": safe_sum(
+            cube_slice("forecast_by_sku", forecast_horizon=forecast_horizon), 'forecast_units'
+        ),
+        "sales_all": safe_sum(
+            cube_slice("sales_by_channel", start=accuracy_historical_start, end=FORECAST_CUTOFF_DATE),
+            'actual_sales_units'
+        ),
+    }
+
+    # Apply product filter FIRST - filter by SKUs belonging to this product
+    if product and not df_sku_master.empty:
+        valid_skus = df_sku_master[df_sku_master["product_id"] == product]["sku_id"].unique()
+        df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
+        df_sales_historical = df_sales_historical[df_sales_historical["sku_id"].isin(valid_skus)] if not df_sales_historical.empty else df_sales_historical
+
+    # Apply channel weight
+    channel_weight = 1.0
+    if channel and not df_sales_historical.empty:
+        total_all = df_sales_historical["actual_sales_units"].sum()
+        channel_sales = df_sales_historical[df_sales_historical["sales_channel"] == channel]["actual_sales_units"].sum()
+        if total_all > 0:
+            channel_weight = channel_sales / total_all
+        df_sales_historical = df_sales_historical[df_sales_historical["sales_channel"] == channel]
+
+    # Apply store filter
+    if store:
+        if not df_forecast.empty and "store_id" in df_forecast.columns:
+            df_forecast = df_forecast[df_forecast["store_id"] == store]
+        df_sales_historical = df_sales_historical[df_sales_historical["store_id"] == store] if not df_sales_historical.empty else df_sales_historical
+
+    # Apply SKU filter
+    if sku:
+        df_forecast = df_forecast[df_forecast["sku_id"] == sku]
+        df_sales_historical = df_sales_historical[df_sales_historical["sku_id"] == sku] if not df_sales_historical.empty else df_sales_historical
+
+    # Apply category filter
+    if category and not df_sku_master.empty:
+        valid_skus = df_sku_master[df_sku_master["category"] == category]["sku_id"].unique()
+        df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
+        df_sales_historical = df_sales_historical[df_sales_historical["sku_id"].isin(valid_skus)] if not df_sales_historical.empty else df_sales_historical
+
+    # Apply channel weight to forecast
+    if channel_weight < 1.0 and not df_forecast.empty:
+        df_forecast = df_forecast.copy()
+        df_forecast["forecast_units"] = (df_forecast["forecast_units"] * channel_weight).round().astype(int)
+
+    # ===============================
+    # CUBE SLICES
+    # Store-collapsed grains are exact only without a store filter and
+    # without per-row channel weighting; otherwise keep the raw rows.
+    # ===============================
+    has_sku_scope = any((product, sku, category))
+
+    df_forecast_by_sku = df_forecast
+    if channel_weight >= 1.0 and not store and not (has_sku_scope and df_forecast.empty):
+        sku_scope = df_forecast["sku_id"].unique() if has_sku_scope else None
+        df_forecast_by_sku = cube_slice(
+            "forecast_by_sku", forecast_horizon=forecast_horizon, sku_id=sku_scope
+        )
+
+    historical_by_date_channel = None
+    if not store and not has_sku_scope:
+        historical_by_date_channel = cube_slice(
+            "sales_by_channel",
+            start=historical_start,
+            end=FORECAST_CUTOFF_DATE,
+            sales_channel=channel,
+        ).reset_index(drop=True)
+
+    # ===============================
+    # AGGREGATES
+    # ===============================
+    has_forecast = not df_forecast.empty
+    has_sales = not df_sales_historical.empty
+    aggregates.update(
+        forecast_units=safe_sum(df_forecast, 'forecast_units'),
+        forecast_volatility=df_forecast['forecast_units'].std() if 'forecast_units' in df_forecast.columns and len(df_forecast) > 0 else 0,
+        has_forecast=has_forecast,
+        sales_units=safe_sum(df_sales_historical, 'actual_sales_units'),
+        has_sales=has_sales,
+    )
+
+    if {"trend", "rollingError"} & compute:
+        # Channels from historical data, by date
+        aggregates["channels"] = df_sales_historical['sales_channel'].unique().tolist() if has_sales else []
+        if historical_by_date_channel is None:
+            historical_by_date_channel = (
+                df_sales_historical.groupby(['date', 'sales_channel'])['actual_sales_units'].sum().reset_index()
+                if has_sales else pd.DataFrame(columns=['date', 'sales_channel', 'actual_sales_units'])
+            )
+        aggregates["sales_by_date_channel"] = historical_by_date_channel
+        aggregates["forecast_by_date"] = (
+            df_forecast_by_sku.groupby('date')['forecast_units'].sum().reset_index()
+            if has_forecast else pd.DataFrame(columns=['date', 'forecast_units'])
+        )
+
+    if {"performance", "heatmap", "topDrivers", "deviation"} & compute and has_forecast:
+        # Calculate metrics per SKU from forecast
+        sku_forecast_agg = df_forecast.groupby('sku_id').agg({
+            'forecast_units': ['sum', 'std', 'mean']
+        }).reset_index()
+        sku_forecast_agg.columns = ['sku_id', 'total_forecast', 'volatility', 'avg_forecast_daily']
+        aggregates["sku_forecast"] = sku_forecast_agg
+
+    if "heatmap" in compute and not df_forecast_by_sku.empty:
+        aggregates["forecast_by_sku_date"] = df_forecast_by_sku.groupby(['sku_id', 'date'])['forecast_units'].sum().reset_index()
+
+    if {"performance", "deviation"} & compute and has_forecast and has_sales:
+        # Calculate actual metrics from historical sales
+        sku_actual_agg = df_sales_historical.groupby('sku_id').agg({
+            'actual_sales_units': ['sum', 'mean', 'std']
+        }).reset_index()
+        sku_actual_agg.columns = ['sku_id', 'total_actual', 'avg_daily', 'actual_volatility']
+
+        if "performance" in compute:
+            # Merge
+            sku_metrics = pd.merge(aggregates["sku_forecast"], sku_actual_agg, on='sku_id', how='outer').fillna(0)
+
+            # Add category from master
+            if not df_sku_master.empty and 'category' in df_sku_master.columns:
+                sku_metrics = pd.merge(sku_metrics, df_sku_master[['sku_id', 'category']].drop_duplicates(),
+                                       on='sku_id', how='left')
+            else:
+                sku_metrics['category'] = 'Unknown'
+            aggregates["sku_metrics"] = sku_metrics
+
+        if "deviation" in compute:
+            # Calculate deviation per SKU
+            sku_forecast_sum = aggregates["sku_forecast"].set_index('sku_id')['total_forecast']
+            sku_actual_sum = sku_actual_agg.set_index('sku_id')['total_actual']
+
+            deviations = []
+            for sku_id in sku_forecast_sum.index:
+                forecast = sku_forecast_sum.get(sku_id, 0)
+                actual = sku_actual_sum.get(sku_id, 0)
+                if actual > 0:
+                    deviation = ((forecast - actual) / actual) * 100
+                    deviations.append(deviation)
+            aggregates["deviations"] = deviations
+
+    mark_section("filter")
+    return aggregates
+
+
+def sales_kpis(aggregates, forecast_days):
+    # Forecast Accuracy KPI (unfiltered)
+    forecast_daily_avg_all = aggregates["forecast_all"] / forecast_days if forecast_days > 0 else 0
+    total_historical_all = aggregates["sales_all"]
+    historical_daily_avg_all = total_historical_all / SALES_ACCURACY_BASELINE_DAYS if total_historical_all > 0 else 0
+
+    # Account for sales data scaling: historical sales were scaled by 0.90 to achieve ~90% accuracy
+    # To get true accuracy, we need to compare forecast to unscaled historical baseline
+    # The last 30 days were scaled by 0.90, so original = scaled / 0.90
+    SALES_SCALE_FACTOR = 0.90  # From amend_sales_and_run_forecast_pipeline.py
+    # Only apply unscaling to the last 30 days (which were scaled)
+    # For accuracy calculation, use unscaled baseline to show true forecast error
+    unscaled_historical_daily_avg = historical_daily_avg_all / SALES_SCALE_FACTOR if historical_daily_avg_all > 0 else 0
+
+    if unscaled_historical_daily_avg > 0:
+        # Compare forecast to unscaled historical baseline to get realistic accuracy
+        mape_all = abs(forecast_daily_avg_all - unscaled_historical_daily_avg) / unscaled_historical_daily_avg * 100
+        accuracy_kpi = max(0, min(100, 100 - mape_all))
+    else:
+        accuracy_kpi = 0
+
+    total_forecast_units = aggregates["forecast_units"]
+    total_historical_units = aggregates["sales_units"]
+    volatility = aggregates["forecast_volatility"]
+
+    return {"kpis": {
+        "skuForecastAccuracy": format_kpi(round(accuracy_kpi, 1), 85.0),
+        "totalForecastedUnits": format_kpi(total_forecast_units, total_forecast_units * 0.95),
+        "baselineSales": format_kpi(total_historical_units, total_historical_units * 0.95),
+        "demandVolatilityIndex": format_kpi(round(volatility, 1), volatility * 1.1 if volatility else 0),
+        "highRiskSKUsCount": format_kpi(0, 0)  # Updated from the SKU performance table
+    }}
+
+
+def sales_trend(aggregates, forecast_days):
+    """Last N days historical actuals + next N days forecast, per channel."""
+    sales_trend = []
+
+    if aggregates["has_sales"] or aggregates["has_forecast"]:
+        channels = aggregates["channels"]
+        historical_by_date_channel = aggregates["sales_by_date_channel"]
+
+        # --- PART 1: Historical Actuals (last 30 days) ---
+        if aggregates["has_sales"]:
+            # Create date range for historical period (ensure all dates are included)
+            historical_start = FORECAST_CUTOFF_DATE - timedelta(days=forecast_days - 1)
+            date_range = pd.date_range(start=historical_start, end=FORECAST_CUTOFF_DATE, freq='D')
+
+            # Date × channel matrix over the whole window (0 where a channel had no sales)
+            actual_matrix = (
+                historical_by_date_channel
+                .assign(date=pd.to_datetime(historical_by_date_channel['date']).dt.normalize())
+                .pivot_table(index='date', columns='sales_channel', values='actual_sales_units', aggfunc='first')
+                .reindex(index=date_range, columns=channels)
+                .fillna(0)
+                .astype(int)
+            )
+
+            for date_str, actual_row in zip(date_range.strftime('%Y-%m-%d'), actual_matrix.to_numpy().tolist()):
+                for ch, actual_value in zip(channels, actual_row):
+                    sales_trend.append({
+                        "date": date_str,
+                        "channel": ch,
+                        "actual": actual_value,
+                        "forecast": None,  # No forecast for historical period
+                        "period": "historical"
+                    })
+
+        # --- PART 2: Future Forecast (next 7/30 days) ---
+        if aggregates["has_forecast"] and channels:
+            # Get channel proportions from historical data (overall)
+            channel_totals = historical_by_date_channel.groupby('sales_channel')['actual_sales_units'].sum() if aggregates["has_sales"] else pd.Series()
+            total_sales = channel_totals.sum() if len(channel_totals) > 0 else 1
+            channel_proportions = (channel_totals / total_sales).to_dict() if total_sales > 0 else {}
+            fallback_props = np.array([channel_proportions.get(ch, 1.0 / len(channels)) for ch in channels])
+
+            # Day-of-week × channel share table (preserves weekly patterns):
+            # average channel sales on that weekday / average daily total on that weekday.
+            # Weekdays or channels without history fall back to the overall proportions.
+            daily_channel_sales = historical_by_date_channel
+            daily_totals = historical_by_date_channel.groupby('date')['actual_sales_units'].sum()
+            avg_channel_by_dow = (
+                daily_channel_sales
+                .groupby([pd.to_datetime(daily_channel_sales['date']).dt.dayofweek, 'sales_channel'])['actual_sales_units']
+                .mean()
+                .unstack('sales_channel')
+                .reindex(index=range(7), columns=channels)
+                .to_numpy(dtype=float)
+            )
+            avg_total_by_dow = (
+                daily_totals.groupby(pd.to_datetime(daily_totals.index).dayofweek).mean()
+                .reindex(range(7))
+                .to_numpy(dtype=float)[:, None]
+            )
+            with np.errstate(divide='ignore', invalid='ignore'):
+                dow_shares = avg_channel_by_dow / avg_total_by_dow
+            dow_shares = np.where(
+                np.isnan(avg_channel_by_dow) | ~(avg_total_by_dow > 0),
+                fallback_props[None, :],
+                dow_shares
+            )
+
+            # Daily forecast totals (preserve daily variation), split across channels in one broadcast
+            daily_forecast = aggregates["forecast_by_date"].set_index('date')['forecast_units']
+            forecast_dates = pd.to_datetime(daily_forecast.index)
+            channel_forecast = (
+                daily_forecast.to_numpy()[:, None] * dow_shares[forecast_dates.dayofweek]
+            ).astype(int)
+
+            for date_str, forecast_row in zip(forecast_dates.strftime('%Y-%m-%d'), channel_forecast.tolist()):
+                for ch, ch_forecast in zip(channels, forecast_row):
+                    sales_trend.append({
+                        "date": date_str,
+                        "channel": ch,
+                        "actual": None,  # No actual for future dates
+                        "forecast": ch_forecast,
+                        "period": "forecast"
+                    })
+    return {"skuSalesTrend": sales_trend}
+
+
+def sku_performance(aggregates):
+    """(SKU performance rows, number of high-risk SKUs)."""
+    sku_metrics = aggregates.get("sku_metrics")
+    if sku_metrics is None:
+        return [], None
+    sku_metrics = sku_metrics.copy()
+
+    # Calculate accuracy: Compare forecast avg daily with historical avg daily
+    # This gives a realistic accuracy measure
+    sku_metrics['accuracy'] = sku_metrics.apply(
+        lambda row: max(0, 100 - abs(row['avg_forecast_daily'] - row['avg_daily']) / row['avg_daily'] * 100)
+        if row['avg_daily'] > 0 else 0, axis=1
+    )
+
+    # Cap accuracy at 100
+    sku_metrics['accuracy'] = sku_metrics['accuracy'].clip(upper=100)
+
+    # Determine risk using RELATIVE thresholds (bottom performers)
+    # This ensures actionable insights even when overall accuracy is high
+    accuracy_mean = sku_metrics['accuracy'].mean()
+    accuracy_std = sku_metrics['accuracy'].std() if len(sku_metrics) > 1 else 1
+    volatility_mean = sku_metrics['volatility'].mean()
+
+    # Dynamic thresholds based on distribution
+    high_risk_threshold = accuracy_mean - accuracy_std  # Bottom ~16%
+    med_risk_threshold = accuracy_mean - (accuracy_std * 0.3)  # Bottom ~35%
+
+    def calc_risk(row):
+        # High risk: bottom performers OR very high volatility
+        if row['accuracy'] < high_risk_threshold:
+            return 'High'
+        elif row['volatility'] > volatility_mean * 1.5 and volatility_mean > 0:
+            return 'High'  # High volatility relative to peers
+        elif row['accuracy'] < med_risk_threshold:
+            return 'Medium'
+        else:
+            return 'Low'
+
+    sku_metrics['risk'] = sku_metrics.apply(calc_risk, axis=1)
+
+    rows = [
+        {
+            "id": idx + 1,
+            "sku": str(row['sku_id']),
+            "name": str(row['sku_id']),  # Use SKU as name for now
+            "category": str(row.get('category', 'Unknown')),
+            "avgDailySales": json_safe(round(row['avg_daily'], 1)),
+            "accuracy": json_safe(round(row['accuracy'], 1)),
+            "demandVolatility": json_safe(round(row['volatility'], 1) if pd.notna(row['volatility']) else 0),
+            "riskFlag": str(row['risk']).lower()  # lowercase for frontend
+        }
+        for idx, (_, row) in enumerate(sku_metrics.iterrows())
+    ]
+    return rows, len(sku_metrics[sku_metrics['risk'] == 'High'])
+
+
+def sku_contribution_heatmap(aggregates):
+    """Top 10 SKUs by forecast volume x the 10 latest forecast dates."""
+    heatmap = []
+    sku_date_grp = aggregates.get("forecast_by_sku_date")
+    if sku_date_grp is not None and not sku_date_grp.empty:
+        # Calculate total per date for contribution %
+        date_totals = sku_date_grp.groupby('date')['forecast_units'].sum().reset_index()
+        date_totals.columns = ['date', 'date_total']
+
+        sku_date_grp = pd.merge(sku_date_grp, date_totals, on='date')
+        sku_date_grp['contribution_pct'] = (sku_date_grp['forecast_units'] / sku_date_grp['date_total'] * 100).round(2)
+
+        # Select top 10 SKUs by total forecast volume (most impactful)
+        top_skus = aggregates["sku_forecast"].set_index('sku_id')['total_forecast'].nlargest(10).index.tolist()
+
+        # Limit to 10 dates for readability (most recent forecast dates)
+        recent_dates = sorted(sku_date_grp['date'].unique())[-10:]
+
+        # Filter data
+        sku_date_filtered = sku_date_grp[
+            (sku_date_grp['sku_id'].isin(top_skus)) &
+            (sku_date_grp['date'].isin(recent_dates))
+        ]
+
+        heatmap = [
+            {
+                "sku": str(row['sku_id']),
+                "date": json_safe(row['date']),
+                "contributionPct": json_safe(row['contribution_pct']),
+                "forecastUnits": json_safe(row['forecast_units'])
+            }
+            for _, row in sku_date_filtered.iterrows()
+        ]
+    return {"skuContributionHeatmap": heatmap}
+
+
+def top_demand_drivers(aggregates):
+    """Top 10 SKUs by forecast units."""
+    top_demand_drivers = []
+    if aggregates["has_forecast"]:
+        sku_totals = aggregates["sku_forecast"][['sku_id', 'total_forecast']].rename(columns={'total_forecast': 'forecast_units'})
+        total_demand = sku_totals['forecast_units'].sum()
+        sku_totals['contribution_pct'] = (sku_totals['forecast_units'] / total_demand * 100).round(2) if total_demand > 0 else 0
+        sku_totals = sku_totals.nlargest(10, 'forecast_units')
+
+        top_demand_drivers = [
+            {
+                "sku": str(row['sku_id']),
+                "name": str(row['sku_id']),  # Use SKU as name
+                "forecastUnits": json_safe(int(row['forecast_units'])),
+                "contributionPct": json_safe(row['contribution_pct']),
+                "trendDirection": "up" if row['contribution_pct'] > 3 else ("down" if row['contribution_pct'] < 2 else "flat")
+            }
+            for _, row in sku_totals.iterrows()
+        ]
+    return {"topDemandDrivers": top_demand_drivers}
+
+
+def high_risk_skus(sku_performance_rows):
+    """Items requiring attention: the high-risk rows of the SKU performance table."""
+    high_risk = []
+    if sku_performance_rows:
+        risk_items = [item for item in sku_performance_rows if item['riskFlag'] == 'high']
+        high_risk = [
+            {
+                "id": idx + 1,
+                "sku": item['sku'],
+                "name": item['name'],
+                "category": item['category'],
+                "severity": "high" if item['accuracy'] < 70 else "medium",
+                "issue": "Low Accuracy" if item['accuracy'] < 80 else "High Volatility",
+                "recommendation": "Review forecast",
+                "daysUntilStockout": max(3, int(30 * (100 - item['accuracy']) / 100)) if item['accuracy'] < 90 else None
+            }
+            for idx, item in enumerate(risk_items)
+        ][:10]  # Limit to top 10
+    return {"riskAlerts": high_risk, "highRiskSkus": high_risk}
+
+
+def sales_rolling_error(aggregates, rolling_window):
+    """
+    Rolling MAPE with the given window (7 or 30 days).
+
+    MAPE = mean(|actual - forecast| / actual) * 100
+    Only show forecast period data (Dec 31, 2025 onwards)
+    Rolling window controls both: historical average calculation AND number of forecast days shown
+    """
+    rolling_error = []
+    if aggregates["has_forecast"] and aggregates["has_sales"]:
+        window_days = int(rolling_window)
+        forecast_start_date = FORECAST_CUTOFF_DATE + timedelta(days=1)  # 2026-02-06
+        forecast_end_date = forecast_start_date + timedelta(days=window_days - 1)  # Limit to window_days
+
+        # Get daily aggregated data
+        df_historical_daily = aggregates["sales_by_date_channel"].groupby('date')['actual_sales_units'].sum().reset_index()
+        df_historical_daily = df_historical_daily.sort_values('date').reset_index(drop=True)
+        df_forecast_daily = aggregates["forecast_by_date"].sort_values('date').reset_index(drop=True)
+
+        # Filter forecast data to only include dates from Dec 31, 2025 onwards, limited to window_days
+        df_forecast_daily_filtered = df_forecast_daily[
+            (df_forecast_daily['date'] >= forecast_start_date) &
+            (df_forecast_daily['date'] <= forecast_end_date)
+        ].copy()
+
+        # Calculate rolling average from historical data (last N days before cutoff)
+        if len(df_historical_daily) >= window_days:
+            historical_rolling_avg = df_historical_daily.tail(window_days)['actual_sales_units'].mean()
+        else:
+            historical_rolling_avg = df_historical_daily['actual_sales_units'].mean() if len(df_historical_daily) > 0 else 0
+
+        # Calculate error for forecast period only (Dec 31, 2025 onwards, limited to window_days)
+        for _, row in df_forecast_daily_filtered.iterrows():
+            forecast_val = row['forecast_units']
+            if historical_rolling_avg > 0:
+                error_pct = abs(forecast_val - historical_rolling_avg) / historical_rolling_avg * 100
+                # Cap at reasonable maximum (1000% to prevent extreme outliers)
+                error_pct = min(error_pct, 1000)
+            else:
+                error_pct = 0
+            rolling_error.append({
+                "date": json_safe(row['date']),
+                "mape": json_safe(round(error_pct, 2))
+            })
+    return {"rollingError": rolling_error}
+
+
+def forecast_deviation_histogram(aggregates):
+    deviation_histogram = []
+    deviations = aggregates.get("deviations")
+
+    # Create histogram buckets (under/accurate/over format for frontend)
+    if deviations:
+        under_count = len([d for d in deviations if d < -10])  # Under-forecast
+        accurate_count = len([d for d in deviations if -10 <= d <= 10])  # Accurate band
+        over_count = len([d for d in deviations if d > 10])  # Over-forecast
+
+        deviation_histogram = [
+            {"bucket": "under", "count": under_count},
+            {"bucket": "accurate", "count": accurate_count},
+            {"bucket": "over", "count": over_count}
+        ]
+    return {"forecastDeviationHistogram": deviation_histogram}
+
+
 @app.route('/api/sales/dashboard', methods=['GET'])
+@cached_dashboard(SALES_DATASETS)
 def sales_dashboard():
     try:
+        filters = dashboard_filters(SALES_FILTER_PARAMS)
         date_range = request.args.get("dateRange", "next-30")
-        channel = request.args.get("channel")
-        store = request.args.get("store")
-        sku_filter = request.args.get("sku")
-        category = request.args.get("category")
-        product = request.args.get("product")  # NEW: Product filter
         rolling_window = request.args.get("rollingWindow", "7")  # 7 or 30
-        
-        
+
+        # Panels (memoized ones are not recomputed)
+        panels = requested_panels(SALES_PANELS)
+        panel_keys = panel_cache_keys("sales", SALES_PANELS)
+        fragments, compute = cached_panels(panel_keys, SALES_PANELS, panels)
+        if not compute:
+            return jsonify(panel_response(panels, fragments))
+        computed = {}
+
         # Determine forecast horizon from new filter format
         forecast_days = get_forecast_horizon_days(date_range)
-        forecast_horizon = f"{forecast_days}day"
-        
-        df_forecast = load_csv("sku_daily_forecast.csv")
-        df_sales = load_csv("sku_daily_sales.csv")
-        df_sku_master = load_csv("sku_master.csv")
-        
-        # Parse dates
-        if not df_forecast.empty:
-            df_forecast['date'] = pd.to_datetime(df_forecast['date'], errors='coerce')
-        if not df_sales.empty:
-            df_sales['date'] = pd.to_datetime(df_sales['date'], errors='coerce')
-        
-        # Filter forecast by horizon (7day or 30day)
-        if not df_forecast.empty and "forecast_horizon" in df_forecast.columns:
-            df_forecast = df_forecast[df_forecast["forecast_horizon"] == forecast_horizon]
-        
-        # Get last N days of historical sales (based on filter)
-        historical_days = forecast_days  # Match historical period to forecast period
-        historical_start = FORECAST_CUTOFF_DATE - timedelta(days=historical_days - 1)
-        df_sales_historical = df_sales[
-            (df_sales["date"] >= historical_start) & 
-            (df_sales["date"] <= FORECAST_CUTOFF_DATE)
-        ].copy() if not df_sales.empty else pd.DataFrame()
-        
-        # ===============================
-        # Forecast Accuracy KPI: always use UNFILTERED data so dashboard shows
-        # consistent overall accuracy (~90%) regardless of channel/store/SKU filters.
-        # Use 30-day historical baseline for more stable comparison (not matching forecast period)
-        # ===============================
-        # Use 30-day historical baseline for accuracy calculation (more stable than matching forecast period)
-        accuracy_baseline_days = 30
-        accuracy_historical_start = FORECAST_CUTOFF_DATE - timedelta(days=accuracy_baseline_days - 1)
-        df_sales_for_accuracy = df_sales[
-            (df_sales["date"] >= accuracy_historical_start) & 
-            (df_sales["date"] <= FORECAST_CUTOFF_DATE)
-        ].copy() if not df_sales.empty else pd.DataFrame()
-        
-        total_forecast_all = safe_sum(df_forecast, 'forecast_units')
-        total_historical_all = safe_sum(df_sales_for_accuracy, 'actual_sales_units')
-        forecast_daily_avg_all = total_forecast_all / forecast_days if forecast_days > 0 else 0
-        historical_daily_avg_all = total_historical_all / accuracy_baseline_days if accuracy_baseline_days > 0 and total_historical_all > 0 else 0
-        
-        # Account for sales data scaling: historical sales were scaled by 0.90 to achieve ~90% accuracy
-        # To get true accuracy, we need to compare forecast to unscaled historical baseline
-        # The last 30 days were scaled by 0.90, so original = scaled / 0.90
-        SALES_SCALE_FACTOR = 0.90  # From amend_sales_and_run_forecast_pipeline.py
-        # Only apply unscaling to the last 30 days (which were scaled)
-        # For accuracy calculation, use unscaled baseline to show true forecast error
-        unscaled_historical_daily_avg = historical_daily_avg_all / SALES_SCALE_FACTOR if historical_daily_avg_all > 0 else 0
-        
-        if unscaled_historical_daily_avg > 0:
-            # Compare forecast to unscaled historical baseline to get realistic accuracy
-            mape_all = abs(forecast_daily_avg_all - unscaled_historical_daily_avg) / unscaled_historical_daily_avg * 100
-            accuracy_kpi = max(0, min(100, 100 - mape_all))
-        else:
-            accuracy_kpi = 0
-        
-        # Apply product filter FIRST - filter by SKUs belonging to this product
-        if product and product != "all" and not df_sku_master.empty:
-            valid_skus = df_sku_master[df_sku_master["product_id"] == product]["sku_id"].unique()
-            df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
-            df_sales_historical = df_sales_historical[df_sales_historical["sku_id"].isin(valid_skus)] if not df_sales_historical.empty else df_sales_historical
-        
-        # Apply channel weight
-        channel_weight = 1.0
-        if channel and channel != "all" and not df_sales_historical.empty:
-            total_all = df_sales_historical["actual_sales_units"].sum()
-            channel_sales = df_sales_historical[df_sales_historical["sales_channel"] == channel]["actual_sales_units"].sum()
-            if total_all > 0:
-                channel_weight = channel_sales / total_all
-            df_sales_historical = df_sales_historical[df_sales_historical["sales_channel"] == channel]
-        
-        # Apply store filter
-        if store and store != "all":
-            if not df_forecast.empty and "store_id" in df_forecast.columns:
-                df_forecast = df_forecast[df_forecast["store_id"] == store]
-            df_sales_historical = df_sales_historical[df_sales_historical["store_id"] == store] if not df_sales_historical.empty else df_sales_historical
-        
-        # Apply SKU filter
-        if sku_filter and sku_filter != "all":
-            df_forecast = df_forecast[df_forecast["sku_id"] == sku_filter]
-            df_sales_historical = df_sales_historical[df_sales_historical["sku_id"] == sku_filter] if not df_sales_historical.empty else df_sales_historical
-        
-        # Apply category filter
-        if category and category != "all" and not df_sku_master.empty:
-            valid_skus = df_sku_master[df_sku_master["category"] == category]["sku_id"].unique()
-            df_forecast = df_forecast[df_forecast["sku_id"].isin(valid_skus)]
-            df_sales_historical = df_sales_historical[df_sales_historical["sku_id"].isin(valid_skus)] if not df_sales_historical.empty else df_sales_historical
-        
-        # Apply channel weight to forecast
-        if channel_weight < 1.0 and not df_forecast.empty:
-            df_forecast = df_forecast.copy()
-            df_forecast["forecast_units"] = (df_forecast["forecast_units"] * channel_weight).round().astype(int)
 
-        # ===============================
-        # KPIs - Using historical data for accuracy calculation
-        # ===============================
-        total_forecast_units = safe_sum(df_forecast, 'forecast_units')
-        total_historical_units = safe_sum(df_sales_historical, 'actual_sales_units')
-        volatility = df_forecast['forecast_units'].std() if 'forecast_units' in df_forecast.columns and len(df_forecast) > 0 else 0
-        
-        # Calculate average daily rates for comparison
-        forecast_daily_avg = total_forecast_units / forecast_days if forecast_days > 0 else 0
-        # Use historical_days (which matches forecast_days) instead of hardcoded 30
-        historical_daily_avg = total_historical_units / historical_days if historical_days > 0 and not df_sales_historical.empty else 0
-        
-        # Calculate accuracy for filtered view (used for bias/trend); KPI uses accuracy_kpi (unfiltered)
-        if historical_daily_avg > 0:
-            mape = abs(forecast_daily_avg - historical_daily_avg) / historical_daily_avg * 100
-            accuracy = max(0, min(100, 100 - mape))
-        else:
-            accuracy = 0
-        
-        # Calculate bias
-        if historical_daily_avg > 0:
-            bias = ((forecast_daily_avg - historical_daily_avg) / historical_daily_avg) * 100
-        else:
-            bias = 0
-
-        kpis = {
-            "skuForecastAccuracy": format_kpi(round(accuracy_kpi, 1), 85.0),
-            "totalForecastedUnits": format_kpi(total_forecast_units, total_forecast_units * 0.95),
-            "baselineSales": format_kpi(total_historical_units, total_historical_units * 0.95),
-            "demandVolatilityIndex": format_kpi(round(volatility, 1), volatility * 1.1 if volatility else 0),
-            "highRiskSKUsCount": format_kpi(0, 0)  # Will be updated below
-        }
+        aggregates = dashboard_aggregates("sales", forecast_days, compute, **filters)
 
-        # ===============================
-        # SKU Sales Trend - INDUSTRY STANDARD FORMAT
-        # Last 30 days historical actuals + Next 7/30 days forecast
-        # ===============================
-        sales_trend = []
-        forecast_cutoff = FORECAST_CUTOFF_DATE.strftime('%Y-%m-%d')
-        
-        if not df_sales_historical.empty or not df_forecast.empty:
-            # Get list of channels from historical data
-            channels = df_sales_historical['sales_channel'].unique().tolist() if not df_sales_historical.empty else []
-            
-            # --- PART 1: Historical Actuals (last 30 days) ---
-            if not df_sales_historical.empty:
-                # Create date range for historical period (ensure all dates are included)
-                historical_start = FORECAST_CUTOFF_DATE - timedelta(days=historical_days - 1)
-                date_range = pd.date_range(start=historical_start, end=FORECAST_CUTOFF_DATE, freq='D')
-                
-                # Ensure dates in historical data are datetime
-                df_sales_historical['date'] = pd.to_datetime(df_sales_historical['date'])
-                
-                # Group historical data by date and channel
-                historical_by_date_channel = df_sales_historical.groupby(['date', 'sales_channel'])['actual_sales_units'].sum().reset_index()
-                
-                # Create a complete date-channel matrix to ensure all dates have entries (even if 0)
-                for date in date_range:
-                    date_str = date.strftime('%Y-%m-%d')
-                    for ch in channels:
-                        # Find matching row for this date and channel (normalize dates for comparison)
-                        date_normalized = pd.Timestamp(date).normalize()
-                        matching = historical_by_date_channel[
-                            (pd.to_datetime(historical_by_date_channel['date']).dt.normalize() == date_normalized) & 
-                            (historical_by_date_channel['sales_channel'] == ch)
-                        ]
-                        
-                        if not matching.empty:
-                            actual_value = int(matching.iloc[0]['actual_sales_units'])
-                        else:
-                            actual_value = 0  # No sales on this date for this channel
-                        
-                        sales_trend.append({
-                            "date": json_safe(date_str),
-                            "channel": ch,
-                            "actual": json_safe(actual_value),
-                            "forecast": None,  # No forecast for historical period
-                            "period": "historical"
-                        })
-            
-            # --- PART 2: Future Forecast (next 7/30 days) ---
-            if not df_forecast.empty and channels:
-                # Get channel proportions from historical data (overall and daily)
-                channel_totals = df_sales_historical.groupby('sales_channel')['actual_sales_units'].sum() if not df_sales_historical.empty else pd.Series()
-                total_sales = channel_totals.sum() if len(channel_totals) > 0 else 1
-                channel_proportions = (channel_totals / total_sales).to_dict() if total_sales > 0 else {}
-                
-                # Calculate daily channel proportions from historical data (to preserve daily variation patterns)
-                df_sales_historical['date'] = pd.to_datetime(df_sales_historical['date'])
-                daily_channel_sales = df_sales_historical.groupby(['date', 'sales_channel'])['actual_sales_units'].sum().reset_index()
-                daily_totals = df_sales_historical.groupby('date')['actual_sales_units'].sum()
-                
-                # Create daily channel proportion lookup
-                daily_channel_props = {}
-                for _, row in daily_channel_sales.iterrows():
-                    date_key = row['date'].strftime('%Y-%m-%d')
-                    ch = row['sales_channel']
-                    daily_total = daily_totals.get(row['date'], 1)
-                    if date_key not in daily_channel_props:
-                        daily_channel_props[date_key] = {}
-                    daily_channel_props[date_key][ch] = row['actual_sales_units'] / daily_total if daily_total > 0 else channel_proportions.get(ch, 1.0 / len(channels))
-                
-                # Daily forecast totals (preserve daily variation)
-                daily_forecast = df_forecast.groupby('date')['forecast_units'].sum().reset_index()
-                daily_forecast.columns = ['date', 'forecast']
-                daily_forecast = daily_forecast.sort_values('date')
-                daily_forecast['date'] = pd.to_datetime(daily_forecast['date'])
-                
-                # Get day of week pattern from historical data (to match weekly patterns)
-                df_sales_historical['day_of_week'] = pd.to_datetime(df_sales_historical['date']).dt.dayofweek
-                weekly_channel_patterns = {}
-                for ch in channels:
-                    ch_data = df_sales_historical[df_sales_historical['sales_channel'] == ch]
-                    if not ch_data.empty:
-                        weekly_channel_patterns[ch] = ch_data.groupby('day_of_week')['actual_sales_units'].mean().to_dict()
-                
-                for _, row in daily_forecast.iterrows():
-                    forecast_date = row['date']
-                    forecast_date_str = forecast_date.strftime('%Y-%m-%d')
-                    total_forecast = row['forecast']
-                    day_of_week = forecast_date.dayofweek
-                    
-                    # Try to use daily proportions from similar historical days, fallback to overall proportions
-                    # Look for historical dates with same day of week (to preserve weekly patterns)
-                    similar_dates = df_sales_historical[df_sales_historical['day_of_week'] == day_of_week]
-                    
-                    if not similar_dates.empty:
-                        # Use average proportions for this day of week
-                        similar_daily_totals = similar_dates.groupby('date')['actual_sales_units'].sum()
-                        similar_channel_sales = similar_dates.groupby(['date', 'sales_channel'])['actual_sales_units'].sum().reset_index()
-                        
-                        day_of_week_props = {}
-                        for ch in channels:
-                            ch_sales = similar_channel_sales[similar_channel_sales['sales_channel'] == ch]['actual_sales_units']
-                            if not ch_sales.empty:
-                                avg_ch_sales = ch_sales.mean()
-                                avg_total = similar_daily_totals.mean()
-                                day_of_week_props[ch] = avg_ch_sales / avg_total if avg_total > 0 else channel_proportions.get(ch, 1.0 / len(channels))
-                            else:
-                                day_of_week_props[ch] = channel_proportions.get(ch, 1.0 / len(channels))
-                    else:
-                        # Fallback to overall proportions
-                        day_of_week_props = channel_proportions.copy()
-                        if not day_of_week_props:
-                            day_of_week_props = {ch: 1.0 / len(channels) for ch in channels}
-                    
-                    for ch in channels:
-                        # Allocate forecast to channels based on day-of-week patterns (preserves variation)
-                        ch_proportion = day_of_week_props.get(ch, channel_proportions.get(ch, 1.0 / len(channels)))
-                        ch_forecast = int(total_forecast * ch_proportion)
-                        
-                        sales_trend.append({
-                            "date": json_safe(forecast_date_str),
-                            "channel": ch,
-                            "actual": None,  # No actual for future dates
-                            "forecast": json_safe(ch_forecast),
-                            "period": "forecast"
-                        })
+        if "kpis" in compute:
+            computed["kpis"] = sales_kpis(aggregates, forecast_days)
+        mark_section("kpis")
 
-        # ===============================
-        # SKU Performance Table
-        # ===============================
-        sku_performance = []
-        if not df_forecast.empty and not df_sales_historical.empty:
-            # Get number of forecast days
-            forecast_days = df_forecast['date'].nunique()
-            
-            # Calculate metrics per SKU from forecast
-            sku_forecast_agg = df_forecast.groupby('sku_id').agg({
-                'forecast_units': ['sum', 'std', 'mean']
-            }).reset_index()
-            sku_forecast_agg.columns = ['sku_id', 'total_forecast', 'volatility', 'avg_forecast_daily']
-            
-            # Calculate actual metrics from historical sales
-            sku_actual_agg = df_sales_historical.groupby('sku_id').agg({
-                'actual_sales_units': ['sum', 'mean', 'std']
-            }).reset_index()
-            sku_actual_agg.columns = ['sku_id', 'total_actual', 'avg_daily', 'actual_volatility']
-            
-            # Merge
-            sku_metrics = pd.merge(sku_forecast_agg, sku_actual_agg, on='sku_id', how='outer').fillna(0)
-            
-            # Add category from master
-            if not df_sku_master.empty and 'category' in df_sku_master.columns:
-                sku_metrics = pd.merge(sku_metrics, df_sku_master[['sku_id', 'category']].drop_duplicates(), 
-                                       on='sku_id', how='left')
-            else:
-                sku_metrics['category'] = 'Unknown'
-            
-            # Calculate accuracy: Compare forecast avg daily with historical avg daily
-            # This gives a realistic accuracy measure
-            sku_metrics['accuracy'] = sku_metrics.apply(
-                lambda row: max(0, 100 - abs(row['avg_forecast_daily'] - row['avg_daily']) / row['avg_daily'] * 100) 
-                if row['avg_daily'] > 0 else 0, axis=1
-            )
-            
-            # Cap accuracy at 100
-            sku_metrics['accuracy'] = sku_metrics['accuracy'].clip(upper=100)
-            
-            # Determine risk using RELATIVE thresholds (bottom performers)
-            # This ensures actionable insights even when overall accuracy is high
-            accuracy_mean = sku_metrics['accuracy'].mean()
-            accuracy_std = sku_metrics['accuracy'].std() if len(sku_metrics) > 1 else 1
-            volatility_mean = sku_metrics['volatility'].mean()
-            
-            # Dynamic thresholds based on distribution
-            high_risk_threshold = accuracy_mean - accuracy_std  # Bottom ~16%
-            med_risk_threshold = accuracy_mean - (accuracy_std * 0.3)  # Bottom ~35%
-            
-            def calc_risk(row):
-                # High risk: bottom performers OR very high volatility
-                if row['accuracy'] < high_risk_threshold:
-                    return 'High'
-                elif row['volatility'] > volatility_mean * 1.5 and volatility_mean > 0:
-                    return 'High'  # High volatility relative to peers
-                elif row['accuracy'] < med_risk_threshold:
-                    return 'Medium'
-                else:
-                    return 'Low'
-            
-            sku_metrics['risk'] = sku_metrics.apply(calc_risk, axis=1)
-            
-            sku_performance = [
-                {
-                    "id": idx + 1,
-                    "sku": str(row['sku_id']),
-                    "name": str(row['sku_id']),  # Use SKU as name for now
-                    "category": str(row.get('category', 'Unknown')),
-                    "avgDailySales": json_safe(round(row['avg_daily'], 1)),
-                    "accuracy": json_safe(round(row['accuracy'], 1)),
-                    "demandVolatility": json_safe(round(row['volatility'], 1) if pd.notna(row['volatility']) else 0),
-                    "riskFlag": str(row['risk']).lower()  # lowercase for frontend
-                }
-                for idx, (_, row) in enumerate(sku_metrics.iterrows())
-            ]
-            
+        if "trend" in compute:
+            computed["trend"] = sales_trend(aggregates, forecast_days)
+        mark_section("trend")
+
+        if "performance" in compute:
+            performance_rows, high_risk_count = sku_performance(aggregates)
+            computed["performance"] = {"skuPerformance": performance_rows}
             # Update high risk count in KPIs
-            high_risk_count = len(sku_metrics[sku_metrics['risk'] == 'High'])
-            kpis["highRiskSKUsCount"] = format_kpi(high_risk_count, high_risk_count)
+            if high_risk_count is not None and "kpis" in compute:
+                computed["kpis"]["kpis"]["highRiskSKUsCount"] = format_kpi(high_risk_count, high_risk_count)
+        mark_section("performance")
 
-        # ===============================
-        # SKU Contribution Heatmap (SKU x Date)
-        # Business insight: Show top 10 SKUs with highest variance in contribution
-        # ===============================
-        heatmap = []
-        if not df_forecast.empty and {'sku_id', 'date', 'forecast_units'}.issubset(df_forecast.columns):
-            # Group by SKU and date
-            sku_date_grp = df_forecast.groupby(['sku_id', 'date'])['forecast_units'].sum().reset_index()
-            
-            # Calculate total per date for contribution %
-            date_totals = sku_date_grp.groupby('date')['forecast_units'].sum().reset_index()
-            date_totals.columns = ['date', 'date_total']
-            
-            sku_date_grp = pd.merge(sku_date_grp, date_totals, on='date')
-            sku_date_grp['contribution_pct'] = (sku_date_grp['forecast_units'] / sku_date_grp['date_total'] * 100).round(2)
-            
-            # Select top 10 SKUs by total forecast volume (most impactful)
-            top_skus = df_forecast.groupby('sku_id')['forecast_units'].sum().nlargest(10).index.tolist()
-            
-            # Limit to 10 dates for readability (most recent forecast dates)
-            recent_dates = sorted(sku_date_grp['date'].unique())[-10:]
-            
-            # Filter data
-            sku_date_filtered = sku_date_grp[
-                (sku_date_grp['sku_id'].isin(top_skus)) & 
-                (sku_date_grp['date'].isin(recent_dates))
-            ]
-            
-            heatmap = [
-                {
-                    "sku": str(row['sku_id']),
-                    "date": json_safe(row['date']),
-                    "contributionPct": json_safe(row['contribution_pct']),
-                    "forecastUnits": json_safe(row['forecast_units'])
-                }
-                for _, row in sku_date_filtered.iterrows()
-            ]
+        if "heatmap" in compute:
+            computed["heatmap"] = sku_contribution_heatmap(aggregates)
+        mark_section("heatmap")
 
-        # ===============================
-        # Top Demand Drivers (Top 10 SKUs)
-        # ===============================
-        top_demand_drivers = []
-        if not df_forecast.empty:
-            sku_totals = df_forecast.groupby('sku_id')['forecast_units'].sum().reset_index()
-            total_demand = sku_totals['forecast_units'].sum()
-            sku_totals['contribution_pct'] = (sku_totals['forecast_units'] / total_demand * 100).round(2) if total_demand > 0 else 0
-            sku_totals = sku_totals.nlargest(10, 'forecast_units')
-            
-            top_demand_drivers = [
-                {
-                    "sku": str(row['sku_id']),
-                    "name": str(row['sku_id']),  # Use SKU as name
-                    "forecastUnits": json_safe(int(row['forecast_units'])),
-                    "contributionPct": json_safe(row['contribution_pct']),
-                    "trendDirection": "up" if row['contribution_pct'] > 3 else ("down" if row['contribution_pct'] < 2 else "flat")
-                }
-                for _, row in sku_totals.iterrows()
-            ]
+        if "topDrivers" in compute:
+            computed["topDrivers"] = top_demand_drivers(aggregates)
+        mark_section("topDrivers")
 
-        # ===============================
-        # High Risk SKUs (Items requiring attention)
-        # ===============================
-        high_risk_skus = []
-        if sku_performance:
-            risk_items = [item for item in sku_performance if item['riskFlag'] == 'high']
-            high_risk_skus = [
-                {
-                    "id": idx + 1,
-                    "sku": item['sku'],
-                    "name": item['name'],
-                    "category": item['category'],
-                    "severity": "high" if item['accuracy'] < 70 else "medium",
-                    "issue": "Low Accuracy" if item['accuracy'] < 80 else "High Volatility",
-                    "recommendation": "Review forecast",
-                    "daysUntilStockout": max(3, int(30 * (100 - item['accuracy']) / 100)) if item['accuracy'] < 90 else None
-                }
-                for idx, item in enumerate(risk_items)
-            ][:10]  # Limit to top 10
+        if "riskAlerts" in compute:
+            computed["riskAlerts"] = high_risk_skus(computed["performance"]["skuPerformance"])
+        mark_section("riskAlerts")
 
-        # ===============================
-        # Rolling Error (for trend analysis)
-        # Calculate rolling MAPE with specified window (7 or 30 days)
-        # MAPE = mean(|actual - forecast| / actual) * 100
-        # Only show forecast period data (Dec 31, 2025 onwards)
-        # Rolling window controls both: historical average calculation AND number of forecast days shown
-        # ===============================
-        rolling_error = []
-        if not df_forecast.empty and not df_sales_historical.empty:
-            window_days = int(rolling_window)
-            forecast_start_date = FORECAST_CUTOFF_DATE + timedelta(days=1)  # 2026-02-06
-            forecast_end_date = forecast_start_date + timedelta(days=window_days - 1)  # Limit to window_days
-            
-            # Get daily aggregated data
-            df_historical_daily = df_sales_historical.groupby('date')['actual_sales_units'].sum().reset_index()
-            df_historical_daily = df_historical_daily.sort_values('date').reset_index(drop=True)
-            df_forecast_daily = df_forecast.groupby('date')['forecast_units'].sum().reset_index()
-            df_forecast_daily = df_forecast_daily.sort_values('date').reset_index(drop=True)
-            
-            # Filter forecast data to only include dates from Dec 31, 2025 onwards, limited to window_days
-            df_forecast_daily_filtered = df_forecast_daily[
-                (df_forecast_daily['date'] >= forecast_start_date) & 
-                (df_forecast_daily['date'] <= forecast_end_date)
-            ].copy()
-            
-            # Calculate rolling average from historical data (last N days before cutoff)
-            if len(df_historical_daily) >= window_days:
-                historical_rolling_avg = df_historical_daily.tail(window_days)['actual_sales_units'].mean()
-            else:
-                historical_rolling_avg = df_historical_daily['actual_sales_units'].mean() if len(df_historical_daily) > 0 else 0
-            
-            # Calculate error for forecast period only (Dec 31, 2025 onwards, limited to window_days)
-            for _, row in df_forecast_daily_filtered.iterrows():
-                forecast_val = row['forecast_units']
-                if historical_rolling_avg > 0:
-                    error_pct = abs(forecast_val - historical_rolling_avg) / historical_rolling_avg * 100
-                    # Cap at reasonable maximum (1000% to prevent extreme outliers)
-                    error_pct = min(error_pct, 1000)
-                else:
-                    error_pct = 0
-                rolling_error.append({
-                    "date": json_safe(row['date']),
-                    "mape": json_safe(round(error_pct, 2))
-                })
+        if "rollingError" in compute:
+            computed["rollingError"] = sales_rolling_error(aggregates, rolling_window)
+        mark_section("rollingError")
 
-        # ===============================
-        # Forecast Deviation Histogram
-        # ===============================
-        deviation_histogram = []
-        if not df_forecast.empty and not df_sales_historical.empty:
-            # Calculate deviation per SKU
-            sku_forecast_sum = df_forecast.groupby('sku_id')['forecast_units'].sum()
-            sku_actual_sum = df_sales_historical.groupby('sku_id')['actual_sales_units'].sum()
-            
-            deviations = []
-            for sku in sku_forecast_sum.index:
-                forecast = sku_forecast_sum.get(sku, 0)
-                actual = sku_actual_sum.get(sku, 0)
-                if actual > 0:
-                    deviation = ((forecast - actual) / actual) * 100
-                    deviations.append(deviation)
-            
-            # Create histogram buckets (under/accurate/over format for frontend)
-            if deviations:
-                under_count = len([d for d in deviations if d < -10])  # Under-forecast
-                accurate_count = len([d for d in deviations if -10 <= d <= 10])  # Accurate band
-                over_count = len([d for d in deviations if d > 10])  # Over-forecast
-                
-                deviation_histogram = [
-                    {"bucket": "under", "count": under_count},
-                    {"bucket": "accurate", "count": accurate_count},
-                    {"bucket": "over", "count": over_count}
-                ]
+        if "deviation" in compute:
+            computed["deviation"] = forecast_deviation_histogram(aggregates)
+        mark_section("deviation")
 
-        return jsonify({
-            "kpis": kpis,
-            "skuSalesTrend": sales_trend,
-            "skuPerformance": sku_performance,
-            "riskAlerts": high_risk_skus,
-            "skuContributionHeatmap": heatmap,
-            "topDemandDrivers": top_demand_drivers,
-            "rollingError": rolling_error,
-            "forecastDeviationHistogram": deviation_histogram,
-            "highRiskSkus": high_risk_skus,
-            "forecastCutoffDate": forecast_cutoff,  # Cutoff date for UI visualization
-            "forecastHorizon": forecast_horizon,
-            "historicalDays": historical_days  # Number of historical days shown
-        })
+        fragments.update(store_panels(panel_keys, computed))
+        return jsonify(panel_response(panels, fragments))
 
+    except PanelRequestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print("CRITICAL SERVER ERROR:")
         traceback.print_exc()
@@ -1710,32 +2618,7 @@ def sales_dashboard():
 @app.route("/api/filters", methods=["GET"])
 def get_filter_metadata():
     try:
-        df_sales = load_csv("sku_daily_sales.csv")
-        df_forecast = load_csv("sku_daily_forecast.csv")
-        df_sku_master = load_csv("sku_master.csv")
-        df_demand = load_csv("raw_material_demand.csv")
-
-        def get_unique_values(df, column):
-            if df.empty or column not in df.columns:
-                return []
-            values = df[column].dropna().unique()
-            return sorted([str(v) for v in values])
-
-        filters = {
-            "channels": get_unique_values(df_sales, "sales_channel"),
-            "stores": get_unique_values(df_sales, "store_id"),
-            "skus": get_unique_values(df_forecast, "sku_id"),
-            "products": get_unique_values(df_sku_master, "product_id"),
-            "categories": get_unique_values(df_sku_master, "category"),
-            "rawMaterials": get_unique_values(df_demand, "raw_material"),
-            "forecastHorizons": get_unique_values(df_forecast, "forecast_horizon"),
-        }
-
-        print("Filter metadata loaded:")
-        for key, values in filters.items():
-            print(f"   {key}: {len(values)} items")
-
-        return jsonify(filters)
+        return jsonify(load_filter_index()["metadata"])
 
     except Exception as e:
         traceback.print_exc()
@@ -1750,19 +2633,17 @@ def get_products_by_raw_material():
     """Get products that use a specific raw material"""
     try:
         raw_material = request.args.get("rawMaterial")
-        df_bom = load_csv("product_bom.csv")
-        df_sku_master = load_csv("sku_master.csv")
+        index = load_filter_index()
         
-        if df_bom.empty or "raw_material" not in df_bom.columns:
+        if index["products_by_raw_material"] is None:
             return jsonify({"products": []})
         
         if raw_material and raw_material != "all":
             # Get products that use this raw material
-            products_using_rm = df_bom[df_bom["raw_material"] == raw_material]["product_id"].unique()
-            products = sorted([str(p) for p in products_using_rm])
+            products = index["products_by_raw_material"].get(raw_material, [])
         else:
             # Return all products
-            products = sorted(df_sku_master["product_id"].dropna().unique().astype(str))
+            products = index["metadata"]["products"]
         
         return jsonify({"products": products})
     
@@ -1779,19 +2660,17 @@ def get_raw_materials_by_product():
     """Get raw materials used by a specific product"""
     try:
         product = request.args.get("product")
-        df_bom = load_csv("product_bom.csv")
-        df_demand = load_csv("raw_material_demand.csv")
+        index = load_filter_index()
         
-        if df_bom.empty or "raw_material" not in df_bom.columns:
+        if index["raw_materials_by_product"] is None:
             return jsonify({"rawMaterials": []})
         
         if product and product != "all":
             # Get raw materials used by this product
-            raw_materials_used = df_bom[df_bom["product_id"] == product]["raw_material"].unique()
-            raw_materials = sorted([str(rm) for rm in raw_materials_used])
+            raw_materials = index["raw_materials_by_product"].get(product, [])
         else:
             # Return all raw materials
-            raw_materials = sorted(df_demand["raw_material"].dropna().unique().astype(str))
+            raw_materials = index["metadata"]["rawMaterials"]
         
         return jsonify({"rawMaterials": raw_materials})
     
@@ -1808,21 +2687,17 @@ def get_skus_by_category():
     """Get SKUs for a specific category"""
     try:
         category = request.args.get("category")
-        df_sku_master = load_csv("sku_master.csv")
-        df_forecast = load_csv("sku_daily_forecast.csv")
+        index = load_filter_index()
         
-        if df_sku_master.empty or "category" not in df_sku_master.columns:
+        if index["skus_by_category"] is None:
             return jsonify({"skus": []})
         
         if category and category != "all":
-            # Get SKUs in this category
-            skus_in_category = df_sku_master[df_sku_master["category"] == category]["sku_id"].unique()
-            # Only return SKUs that have forecast data
-            valid_skus = df_forecast["sku_id"].unique() if not df_forecast.empty else []
-            skus = sorted([str(sku) for sku in skus_in_category if sku in valid_skus])
+            # SKUs in this category that have forecast data
+            skus = index["skus_by_category"].get(category, [])
         else:
             # Return all SKUs that have forecast data
-            skus = sorted(df_forecast["sku_id"].dropna().unique().astype(str)) if not df_forecast.empty else []
+            skus = index["metadata"]["skus"]
         
         return jsonify({"skus": skus})
     
@@ -1839,22 +2714,14 @@ def get_stores_by_sku():
     """Get stores that have a specific SKU"""
     try:
         sku = request.args.get("sku")
-        df_sales = load_csv("sku_daily_sales.csv")
-        df_forecast = load_csv("sku_daily_forecast.csv")
+        index = load_filter_index()
         
         if sku and sku != "all":
-            # Get stores that have this SKU (from both sales and forecast data)
-            stores_from_sales = df_sales[df_sales["sku_id"] == sku]["store_id"].unique() if not df_sales.empty and "store_id" in df_sales.columns else []
-            stores_from_forecast = df_forecast[df_forecast["sku_id"] == sku]["store_id"].unique() if not df_forecast.empty and "store_id" in df_forecast.columns else []
-            # Combine and deduplicate
-            all_stores = set(stores_from_sales) | set(stores_from_forecast)
-            stores = sorted([str(s) for s in all_stores])
+            # Stores that have this SKU (from both sales and forecast data)
+            stores = index["stores_by_sku"].get(sku, [])
         else:
             # Return all stores
-            stores_from_sales = df_sales["store_id"].dropna().unique() if not df_sales.empty and "store_id" in df_sales.columns else []
-            stores_from_forecast = df_forecast["store_id"].dropna().unique() if not df_forecast.empty and "store_id" in df_forecast.columns else []
-            all_stores = set(stores_from_sales) | set(stores_from_forecast)
-            stores = sorted([str(s) for s in all_stores])
+            stores = index["all_stores"]
         
         return jsonify({"stores": stores})
     
@@ -1866,16 +2733,10 @@ def get_stores_by_sku():
 @app.route("/api/consumption/risk-table", methods=["GET"])
 def raw_material_risk_table():
     try:
-        df = load_csv("raw_material_risk.csv")
-
-        if df.empty:
-            return jsonify([])
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        records = df.sort_values("date", ascending=False).to_dict(orient="records")
-
-        return jsonify(records)
+        return table_response("risk")
 
+    except TableRequestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -1884,14 +2745,10 @@ def raw_material_risk_table():
 @app.route("/api/consumption/material-table", methods=["GET"])
 def raw_material_material_table():
     try:
-        df = load_csv("raw_material_reconciliation.csv")
-
-        if df.empty:
-            return jsonify([])
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        return jsonify(df.to_dict(orient="records"))
+        return table_response("material")
 
+    except TableRequestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -1900,20 +2757,11 @@ def raw_material_material_table():
 @app.route("/api/sales/forecast-table", methods=["GET"])
 def sku_forecast_table():
     try:
-        forecast_horizon = request.args.get("forecastHorizon", "30day")
-        
-        df = load_csv("sku_daily_forecast.csv")
-
-        if df.empty:
-            return jsonify([])
-
-        # Filter by horizon
-        if "forecast_horizon" in df.columns:
-            df = df[df["forecast_horizon"] == forecast_horizon]
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        return jsonify(df.to_dict(orient="records"))
+        # Always scoped to one horizon (30day unless requested)
+        return table_response("forecast", defaults={"forecastHorizon": "30day"})
 
+    except TableRequestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -1947,14 +2795,119 @@ def demand_flow_funnel():
         return jsonify({"error": str(e)}), 500
 
 
+# =========================================================
+# BATCH ENDPOINT
+# =========================================================
+# Sub-requests that may not be batched, and the (pandas-heavy) ones
+# worth running in parallel; cheap lookups run inline.
+BATCH_EXCLUDED_PREFIXES = ("/api/batch", "/api/chat", "/api/debug/")
+BATCH_PARALLEL_PREFIXES = ("/api/consumption/", "/api/sales/", "/api/flow/")
+
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="woodland-batch")
+
+
+class BatchRequestError(ValueError):
+    """Invalid /api/batch body (answered with 400)."""
+
+
+def parse_batch_requests(payload):
+    """[(id, path)] from {"requests": [path | {"id", "path"}, ...]}."""
+    items = payload.get("requests") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BatchRequestError('Body must be {"requests": [...]} with at least one request')
+    if len(items) > BATCH_MAX_REQUESTS:
+        raise BatchRequestError(f"At most {BATCH_MAX_REQUESTS} requests per batch")
+
+    parsed = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"path": item}
+        path = item.get("path") if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith("/api/"):
+            raise BatchRequestError(f"Request {i}: path must be an /api/ endpoint")
+        if path.startswith(BATCH_EXCLUDED_PREFIXES):
+            raise BatchRequestError(f"Request {i}: {path.split('?')[0]} cannot be batched")
+        parsed.append((item.get("id", i), path))
+    return parsed
+
+
+def subrequest(path, **kwargs):
+    """
+    Response of a GET request made from inside another request.
+
+    Runs in its own app context: a nested request would otherwise share
+    the caller's g, overwriting its metrics start time and timing sections.
+    """
+    with app.app_context():
+        return app.test_client().get(path, **kwargs)
+
+
+def run_batch_request(snapshot, path):
+    """Response of one GET sub-request, served from snapshot."""
+    with DATASET_CACHE.pinned(snapshot):
+        return subrequest(path)
+
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """
+    Run several GET API requests in one round trip.
+
+    Body: {"requests": ["/api/filters", {"id": "dashboard", "path": "/api/sales/dashboard?..."}]}
+
+    Every sub-request reads the same pinned dataset snapshot, so results
+    are consistent even if the pipeline rewrites files meanwhile.
+    Dashboard/table requests run concurrently; responses come back in
+    request order as {"id", "path", "status", "body"}.
+    """
+    try:
+        requests_to_run = parse_batch_requests(request.get_json(silent=True))
+
+        with DATASET_CACHE.pinned() as snapshot:
+            pending = {}
+            for i, (_, path) in enumerate(requests_to_run):
+                if path.startswith(BATCH_PARALLEL_PREFIXES):
+                    pending[i] = BATCH_EXECUTOR.submit(run_batch_request, snapshot, path)
+
+            responses = []
+            for i, (request_id, path) in enumerate(requests_to_run):
+                response = pending[i].result() if i in pending else run_batch_request(snapshot, path)
+                body = response.get_data()
+                responses.append({
+                    "id": request_id,
+                    "path": path,
+                    "status": response.status_code,
+                    # JSON bodies are embedded as encoded, not parsed again
+                    "body": raw_json(body) if response.is_json and body.strip() else body.decode("utf-8", "replace"),
+                })
+
+        return jsonify({"dataVersion": snapshot.version, "responses": responses})
+
+    except BatchRequestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
 # =========================================================
 # FRONTEND SERVING ROUTES
 # =========================================================
 
+@lru_cache(maxsize=1)
+def static_manifest():
+    """Manifest of Woodland/dist, or None when the frontend is not built (rebuilt on restart)."""
+    manifest = StaticManifest(WOODLAND_DIST_DIR) if os.path.isdir(WOODLAND_DIST_DIR) else None
+    if manifest is None or manifest.index_html is None:
+        return None
+    return manifest
+
+
 @app.route("/")
 def serve_frontend():
-    if os.path.exists(WOODLAND_DIST_DIR):
-        return send_from_directory(WOODLAND_DIST_DIR, "index.html")
+    manifest = static_manifest()
+    if manifest is not None:
+        return serve_index(manifest, request)
     return jsonify({
         "message": "Woodland API Server",
         "status": "running",
@@ -1973,14 +2926,16 @@ def serve_frontend():
 
 @app.route("/<path:path>")
 def serve_static_or_spa(path):
-    if not os.path.exists(WOODLAND_DIST_DIR):
+    manifest = static_manifest()
+    if manifest is None:
         return jsonify({"error": "Frontend not built"}), 404
-    
-    file_path = os.path.join(WOODLAND_DIST_DIR, path)
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        return send_from_directory(WOODLAND_DIST_DIR, path)
-    
-    return send_from_directory(WOODLAND_DIST_DIR, "index.html")
+
+    asset = manifest.assets.get(path)
+    if asset is not None and path != "index.html":
+        return serve_asset(asset, request)
+
+    # SPA route (or index.html itself)
+    return serve_index(manifest, request)
 
 
 # =========================================================
@@ -1992,14 +2947,112 @@ def health_check():
         "status": "healthy",
         "server": "Woodland API",
         "port": 5051,
-        "frontend_built": os.path.exists(WOODLAND_DIST_DIR)
+        "frontend_built": os.path.exists(WOODLAND_DIST_DIR),
+        "chatbot": CHATBOT.stats(),
     })
 
 
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({**_cache_stats(), "prewarm": CACHE_PREWARMER.stats()})
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    return app.response_class(METRICS.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+# =========================================================
+# DEBUG PROFILING (ENABLE_PROFILING_ENDPOINT=1)
+# =========================================================
+@app.route("/api/debug/profile", methods=["GET"])
+def profile_api_request():
+    """
+    Run one GET API request under a profiler and return the report as text.
+
+    The response and panel caches are bypassed so the full computation is
+    profiled. Params: path (endpoint with its query string, URL-encoded),
+    engine (cprofile, or pyinstrument when installed), sort, limit.
+    """
+    if not PROFILING_ENDPOINT_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+
+    try:
+        path = request.args.get("path", "")
+        if not path.startswith("/api/") or path.startswith("/api/debug/"):
+            return jsonify({"error": "path must be an /api/ endpoint"}), 400
+        engine = request.args.get("engine", "cprofile")
+        if engine not in PROFILE_ENGINES:
+            return jsonify({"error": f"engine must be one of: {', '.join(PROFILE_ENGINES)}"}), 400
+        sort = request.args.get("sort", "cumulative")
+        if sort not in PROFILE_SORT_KEYS:
+            return jsonify({"error": f"sort must be one of: {', '.join(PROFILE_SORT_KEYS)}"}), 400
+        limit = _int_arg(request.args, "limit", 40, 1, 1000)
+
+        response, report = profile_call(
+            lambda: subrequest(
+                path,
+                headers={TIMING_REQUEST_HEADER: "1"},
+                environ_overrides={CACHE_BYPASS_ENVIRON_KEY: True},
+            ),
+            engine=engine,
+            sort=sort,
+            limit=limit,
+        )
+        summary = (
+            f"GET {path} -> {response.status_code}\n"
+            f"Server-Timing: {response.headers.get('Server-Timing', '')}\n\n"
+        )
+        return app.response_class(summary + report, mimetype="text/plain")
+
+    except TableRequestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# =========================================================
+# STARTUP
+# =========================================================
+def warm_caches():
+    """Load every dataset and build the derived artifacts (cube, indexes) up front."""
+    started = time.perf_counter()
+    for filename in sorted(os.listdir(DATA_DIR)):
+        if filename.endswith(".csv"):
+            DATASET_CACHE.get(filename)
+    load_cube()
+    load_filter_index()
+    load_product_share_matrix()
+    for name in TABLE_SPECS:
+        load_table_index(name)
+    static_manifest()
+    stats = DATASET_CACHE.stats()
+    print(
+        f"Warmed {stats['entries']} datasets ({stats['memoryBytes'] / 1e6:.1f} MB) "
+        f"and {len(stats['derived'])} derived artifacts in {time.perf_counter() - started:.2f}s"
+    )
+
+
+def create_app(warm=True):
+    """
+    The API app, with every dataset loaded and indexed when warm=True.
+
+    Launchers call this once in the parent process (see gunicorn.conf.py)
+    so forked workers share the loaded frames copy-on-write.
+    """
+    if warm:
+        warm_caches()
+    return app
+
+
 # =========================================================
-if __name__ == "_main_":
+if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5051))
 
+    create_app()
+    # The dev server serves from this process: warm the chatbot while it binds
+    CHATBOT.ensure_started()
     app.run(
         host="0.0.0.0",
         port=port,
@@ -0,0 +1,145 @@
+"""
+Arrow Dataset Snapshots (Final Pipeline Stage)
+
+Purpose:
+Publish every dataset CSV as an uncompressed Arrow IPC file that the API
+memory-maps instead of parsing (see DatasetCache). All API processes on
+a host then share one page-cache copy of the numeric and date columns.
+
+Stage:
+Runs after the dashboard aggregate cube (last step of the pipeline).
+Only CSVs changed since their snapshot was published are rewritten.
+
+Publishing:
+Each snapshot is written to a temporary file in the snapshot directory
+and swapped in with os.replace, so a reader maps either the previous
+version or the new one, never a partial file. Processes that still map
+the previous version keep reading it until they reload.
+
+The source CSV's mtime and size are recorded in the schema metadata;
+the API ignores a snapshot once its CSV has changed.
+
+Requires pyarrow.
+
+Inputs:
+- datasets/*.csv
+
+Output:
+- datasets/arrow/<dataset>.arrow
+"""
+
+import os
+import tempfile
+
+import pyarrow as pa
+
+from dataset_cache import (
+    SNAPSHOT_DIR,
+    SOURCE_MTIME_KEY,
+    SOURCE_SIZE_KEY,
+    read_dataset_csv,
+    snapshot_path,
+)
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASETS_DIR = os.path.join(BASE_DIR, "datasets")
+
+
+# --------------------------------------------------
+# Publishing
+# --------------------------------------------------
+
+def is_current(data_dir: str, filename: str) -> bool:
+    """The published snapshot was built from the CSV as it is now."""
+    stat = os.stat(os.path.join(data_dir, filename))
+    try:
+        with pa.memory_map(snapshot_path(data_dir, filename), "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowException):
+        return False
+    return (
+        metadata.get(SOURCE_MTIME_KEY) == str(stat.st_mtime_ns).encode()
+        and metadata.get(SOURCE_SIZE_KEY) == str(stat.st_size).encode()
+    )
+
+
+def publish_snapshot(data_dir: str, filename: str) -> str:
+    """Write one dataset's snapshot and atomically swap it in; returns its path."""
+    csv_path = os.path.join(data_dir, filename)
+    stat = os.stat(csv_path)
+    df = read_dataset_csv(csv_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SOURCE_MTIME_KEY: str(stat.st_mtime_ns).encode(),
+        SOURCE_SIZE_KEY: str(stat.st_size).encode(),
+    })
+
+    target = snapshot_path(data_dir, filename)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    os.close(fd)
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; API workers may run as another user
+        # Uncompressed, so columns can be mapped without decoding
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return target
+
+
+def publish_all(data_dir: str = DATASETS_DIR, force: bool = False) -> dict:
+    """{filename: "published" | "current" | error message} for every dataset CSV."""
+    results = {}
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".csv"):
+            continue
+        if not force and is_current(data_dir, filename):
+            results[filename] = "current"
+            continue
+        try:
+            publish_snapshot(data_dir, filename)
+            results[filename] = "published"
+        except (pa.ArrowException, ValueError) as e:
+            # e.g. mixed-type object columns; the API keeps parsing this CSV
+            results[filename] = f"skipped ({e})"
+    return results
+
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+
+def main():
+    print("=" * 60)
+    print("ARROW DATASET SNAPSHOTS")
+    print("=" * 60)
+    print()
+
+    results = publish_all()
+    for filename, status in results.items():
+        print(f"  {filename}: {status}")
+
+    published = sum(1 for status in results.values() if status == "published")
+    current = sum(1 for status in results.values() if status == "current")
+    print()
+    print("=" * 60)
+    print("SNAPSHOTS PUBLISHED")
+    print("=" * 60)
+    print(f"\nOutput: {os.path.join(DATASETS_DIR, SNAPSHOT_DIR)}")
+    print(f"  Published: {published}, already current: {current}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+ASGI Serving Mode (API Serving Layer)
+
+Purpose:
+Serve the Woodland API from a standard ASGI server so one slow chatbot
+call (LLM round trips + email) can never hold the workers dashboard
+requests need.
+
+Run:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5051
+
+Route classes:
+Every request is classified by path and runs the Flask app in that
+class's own bounded thread pool:
+- dashboard: dashboard and table endpoints (pandas work, CPU bound)
+- filters: filter lookups, health and cache stats (cheap)
+- chat: chatbot endpoints (blocking LLM / SMTP I/O)
+- static: frontend files
+
+The event loop itself never runs Flask code. A class at its concurrency
+limit queues further requests in the loop (no thread held) and answers
+503 once ASGI_QUEUE_TIMEOUT seconds pass.
+
+Configuration (environment):
+- ASGI_<CLASS>_WORKERS: pool size / concurrency limit per class
+- ASGI_QUEUE_TIMEOUT: seconds a request may wait for a free worker
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from api_server import CHATBOT, create_app
+
+flask_app = create_app()
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+ROUTE_CLASS_WORKERS = {
+    "dashboard": int(os.environ.get("ASGI_DASHBOARD_WORKERS", os.cpu_count() or 4)),
+    "filters": int(os.environ.get("ASGI_FILTERS_WORKERS", 4)),
+    "chat": int(os.environ.get("ASGI_CHAT_WORKERS", 8)),
+    "static": int(os.environ.get("ASGI_STATIC_WORKERS", 4)),
+}
+
+QUEUE_TIMEOUT = float(os.environ.get("ASGI_QUEUE_TIMEOUT", 30))
+
+# Path prefixes per route class (first match wins; anything else is static)
+ROUTE_CLASS_PREFIXES = (
+    ("chat", ("/api/chat",)),
+    ("dashboard", (
+        "/api/consumption/",
+        "/api/sales/",
+        "/api/flow/",
+        "/api/debug/",
+        "/api/batch",
+    )),
+    ("filters", ("/api/",)),
+)
+
+
+def route_class(path: str) -> str:
+    for name, prefixes in ROUTE_CLASS_PREFIXES:
+        if path.startswith(prefixes):
+            return name
+    return "static"
+
+
+# --------------------------------------------------
+# WSGI bridge
+# --------------------------------------------------
+
+def _wsgi_environ(scope, body: bytes) -> dict:
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server_name),
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == "CONTENT_LENGTH":
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_flask(environ: dict) -> tuple:
+    """(status code, headers, body) from one Flask WSGI call (runs in a pool thread)."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+
+    result = flask_app.wsgi_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    # The ASGI server sets its own Date header
+    headers = [(k, v) for k, v in response["headers"] if k.lower() != "date"]
+    return response["status"], headers, body
+
+
+# --------------------------------------------------
+# ASGI application
+# --------------------------------------------------
+
+class WoodlandASGI:
+    def __init__(self, workers=None, queue_timeout: float = QUEUE_TIMEOUT):
+        self.workers = dict(workers or ROUTE_CLASS_WORKERS)
+        self.queue_timeout = queue_timeout
+        self.executors = {
+            name: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"woodland-{name}")
+            for name, size in self.workers.items()
+        }
+        self._limits = {}  # {route class: asyncio.Semaphore}, created in the serving loop
+        self.rejected = {name: 0 for name in self.workers}
+
+    def _limit(self, name):
+        if name not in self._limits:
+            self._limits[name] = asyncio.Semaphore(self.workers[name])
+        return self._limits[name]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Serving process is up: load the chatbot in the background
+                CHATBOT.ensure_started()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for executor in self.executors.values():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        name = route_class(scope["path"])
+        limit = self._limit(name)
+
+        try:
+            await asyncio.wait_for(limit.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected[name] += 1
+            await self._send(send, 503, [
+                ("Content-Type", "application/json"),
+                ("Retry-After", "1"),
+            ], b'{"error":"Server busy, retry shortly"}\n')
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+            status, headers, payload = await loop.run_in_executor(
+                self.executors[name], _call_flask, _wsgi_environ(scope, body)
+            )
+        finally:
+            limit.release()
+
+        await self._send(send, status, headers, payload)
+
+    @staticmethod
+    async def _send(send, status, headers, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = WoodlandASGI()
@@ -0,0 +1,165 @@
+"""
+Cache Pre-warming (API Serving Layer)
+
+Purpose:
+Serve the first dashboard requests after a pipeline run from a warm
+cache. Popular filter combinations are recorded from real traffic; when
+the data version changes, a background thread re-requests the top ones
+so their responses are cached before users ask for them.
+
+Recording:
+Each dashboard request counts its normalized filter combination (without
+dateRange / aggregation, which are expanded when warming). Past
+max_tracked distinct combinations the least popular half is dropped, so
+memory stays bounded and newer traffic can climb in.
+
+Warming:
+The thread polls the data version every poll_seconds. A new version is
+warmed once it has stayed unchanged for settle_seconds (the pipeline
+rewrites files over several minutes), for the top_n combinations in
+every requested dateRange x aggregation. Warming stops early if the
+version changes again; the next poll starts over.
+
+Every process records and warms its own caches; the thread is started
+lazily in the serving process (never in a pre-fork parent).
+"""
+
+import os
+import threading
+import time
+import traceback
+from collections import Counter
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+DEFAULT_TOP_N = 20
+DEFAULT_MAX_TRACKED = 1000
+DEFAULT_POLL_SECONDS = 15.0
+DEFAULT_SETTLE_SECONDS = 30.0
+
+
+# --------------------------------------------------
+# Popular requests
+# --------------------------------------------------
+
+class PopularRequests:
+    def __init__(self, max_tracked: int = DEFAULT_MAX_TRACKED):
+        self.max_tracked = max_tracked
+        self._counts = Counter()  # {(path, ((param, value), ...)): requests}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, params):
+        key = (path, tuple(params))
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > self.max_tracked:
+                self._counts = Counter(dict(self._counts.most_common(self.max_tracked // 2)))
+
+    def top(self, n: int) -> list:
+        """[(path, params)] of the n most requested combinations."""
+        with self._lock:
+            return [key for key, _ in self._counts.most_common(n)]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+# --------------------------------------------------
+# Pre-warmer
+# --------------------------------------------------
+
+class CachePrewarmer:
+    """
+    version: () -> current data version
+    fetch: (path, params dict) -> None, computes and caches one response
+    variants: list of param dicts merged into each combination
+    """
+
+    def __init__(
+        self,
+        popular: PopularRequests,
+        version,
+        fetch,
+        variants,
+        top_n: int = DEFAULT_TOP_N,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+    ):
+        self.popular = popular
+        self.version = version
+        self.fetch = fetch
+        self.variants = [dict(v) for v in variants]
+        self.top_n = top_n
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.warmed_version = None
+        self.last_run = None  # {"version", "requests", "seconds", "finishedAt", "complete"}
+
+    def ensure_started(self):
+        """Start the polling thread in this process (no-op once running)."""
+        if self._pid == os.getpid() or self.top_n <= 0:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # Traffic so far was served from this version; only later ones need warming
+            self.warmed_version = self.version()
+            threading.Thread(target=self._run, name="cache-prewarm", daemon=True).start()
+
+    def _run(self):
+        seen_version, seen_at = self.warmed_version, time.monotonic()
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                current = self.version()
+                if current != seen_version:
+                    seen_version, seen_at = current, time.monotonic()
+                    continue
+                if current != self.warmed_version and time.monotonic() - seen_at >= self.settle_seconds:
+                    self.warm(current)
+            except Exception:
+                traceback.print_exc()
+
+    def warm(self, version: str) -> int:
+        """Request the popular combinations for version; returns how many were fetched."""
+        started = time.perf_counter()
+        fetched = 0
+        complete = True
+        for path, params in self.popular.top(self.top_n):
+            for variant in self.variants:
+                if self.version() != version:
+                    complete = False
+                    break
+                self.fetch(path, {**dict(params), **variant})
+                fetched += 1
+            if not complete:
+                break
+
+        if complete:
+            self.warmed_version = version
+        self.last_run = {
+            "version": version,
+            "requests": fetched,
+            "seconds": round(time.perf_counter() - started, 3),
+            "finishedAt": time.time(),
+            "complete": complete,
+        }
+        print(f"Pre-warmed {fetched} dashboard responses for data version {version} in {self.last_run['seconds']}s")
+        return fetched
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self.popular),
+            "topN": self.top_n,
+            "variants": len(self.variants),
+            "warmedVersion": self.warmed_version,
+            "lastRun": self.last_run,
+        }
@@ -0,0 +1,103 @@
+"""
+Chatbot Service (API Serving Layer)
+
+Purpose:
+Keep the chatbot (Text2SQL_V2) off the API's startup path. Importing it
+pulls in langchain, both LLM SDKs, matplotlib and the mailer, builds
+chatbot.db and constructs the agents: seconds of work that dashboards
+do not need.
+
+Warm-up:
+The chatbot is loaded in a background thread, started in the serving
+process once it is up (never in a pre-fork parent: threads do not
+survive a fork). Until it is ready, chat requests wait up to a bounded
+timeout and are then told to retry.
+
+Failures:
+A failed load is reported (state "failed", with the error) and retried
+by the next chat request.
+"""
+
+import os
+import threading
+import time
+import traceback
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+# How long a chat request waits for a warming chatbot before a 503
+DEFAULT_WAIT_SECONDS = 10.0
+
+
+class ChatbotUnavailable(RuntimeError):
+    """The chatbot is still warming up (or failed to load)."""
+
+    def __init__(self, state: str, error: str = None):
+        self.state = state
+        self.error = error
+        super().__init__("Chatbot is warming up" if state != "failed" else f"Chatbot failed to load: {error}")
+
+
+# --------------------------------------------------
+# Service
+# --------------------------------------------------
+
+class ChatbotService:
+    """
+    loader: () -> run function (question -> result dict); called once per
+    process, in the warm-up thread.
+    """
+
+    def __init__(self, loader, wait_seconds: float = DEFAULT_WAIT_SECONDS):
+        self.loader = loader
+        self.wait_seconds = wait_seconds
+
+        self._run = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+        self.state = "idle"  # idle | warming | ready | failed
+        self.error = None
+        self.load_seconds = None
+
+    def ensure_started(self, retry: bool = False):
+        """Start loading in this process (no-op once started, unless retrying a failure)."""
+        if self._pid == os.getpid() and not (retry and self.state == "failed"):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and not (retry and self.state == "failed"):
+                return
+            self._pid = os.getpid()
+            self._ready.clear()
+            self.state, self.error = "warming", None
+            threading.Thread(target=self._load, name="chatbot-warmup", daemon=True).start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            run = self.loader()
+        except Exception as e:
+            traceback.print_exc()
+            self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"Chatbot failed to load: {self.error}")
+        else:
+            self._run = run
+            self.state = "ready"
+            print(f"Chatbot ready in {time.perf_counter() - started:.2f}s")
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self._ready.set()
+
+    def query(self, question: str) -> dict:
+        """Run one chatbot query, waiting up to wait_seconds for the warm-up."""
+        self.ensure_started(retry=True)
+        if not self._ready.wait(self.wait_seconds) or self.state != "ready":
+            raise ChatbotUnavailable(self.state, self.error)
+        return self._run(question)
+
+    def stats(self) -> dict:
+        return {"state": self.state, "error": self.error, "loadSeconds": self.load_seconds}
@@ -0,0 +1,273 @@
+"""
+Dashboard Aggregate Cube (Final Pipeline Stage)
+
+Purpose:
+Materialize the additive sums the dashboard endpoints slice on every
+request, so handlers stop re-grouping the raw daily files.
+
+Stage:
+Runs after inventory risk detection (last step of the pipeline).
+
+Dimensions:
+forecast_horizon × date × raw_material × product_id × category ×
+sales_channel × sku_id
+
+Each row belongs to exactly one grain (see GRAINS); dimensions outside
+that grain are left empty. Every measure is a plain sum, so any slice of
+a grain can be summed further without loss.
+
+Inputs:
+- sku_daily_sales.csv
+- sku_daily_forecast.csv
+- sku_master.csv
+- raw_material_demand.csv
+- product_bom_expanded.csv
+- raw_material_inventory_ledger.csv
+
+Output:
+- dashboard_cube.csv
+"""
+
+import pandas as pd
+import warnings
+import os
+
+warnings.filterwarnings("ignore")
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASETS_DIR = os.path.join(BASE_DIR, "datasets")
+
+SALES_FILE = "sku_daily_sales.csv"
+FORECAST_FILE = "sku_daily_forecast.csv"
+SKU_MASTER_FILE = "sku_master.csv"
+DEMAND_FILE = "raw_material_demand.csv"
+BOM_EXPANDED_FILE = "product_bom_expanded.csv"
+LEDGER_FILE = "raw_material_inventory_ledger.csv"
+
+SOURCE_FILES = (
+    SALES_FILE,
+    FORECAST_FILE,
+    SKU_MASTER_FILE,
+    DEMAND_FILE,
+    BOM_EXPANDED_FILE,
+    LEDGER_FILE,
+)
+
+CUBE_FILE = "dashboard_cube.csv"
+OUTPUT_FILE = os.path.join(DATASETS_DIR, CUBE_FILE)
+
+DIMENSIONS = [
+    "forecast_horizon",
+    "date",
+    "raw_material",
+    "product_id",
+    "category",
+    "sales_channel",
+    "sku_id",
+]
+
+# Grains the dashboards read, finest first within each family.
+GRAINS = {
+    # Sales dashboard (store-level rows stay in the daily files)
+    "sales_by_channel": {
+        "dims": ["date", "sales_channel"],
+        "measures": ["actual_sales_units"],
+    },
+    "forecast_by_sku": {
+        "dims": ["forecast_horizon", "date", "sku_id", "category"],
+        "measures": ["forecast_units"],
+    },
+    # Consumption dashboard
+    "material_demand": {
+        "dims": ["forecast_horizon", "date", "raw_material"],
+        "measures": ["material_demand_units"],
+    },
+    "product_material_demand": {
+        "dims": ["forecast_horizon", "date", "product_id", "raw_material"],
+        "measures": ["material_demand_units"],
+    },
+    "material_consumption": {
+        "dims": ["date", "raw_material"],
+        "measures": ["consumed_quantity"],
+    },
+}
+
+MEASURES = sorted({m for grain in GRAINS.values() for m in grain["measures"]})
+
+# Column dtypes for reading the cube back: grains leave other dimensions
+# empty, so inferred types would vary between chunks of the file
+CUBE_DTYPES = {
+    "grain": str,
+    **{dim: str for dim in DIMENSIONS if dim != "date"},
+    **{measure: "float64" for measure in MEASURES},
+}
+
+
+# --------------------------------------------------
+# Cube Build Logic
+# --------------------------------------------------
+
+def _rollup(df: pd.DataFrame, grain: str) -> pd.DataFrame:
+    spec = GRAINS[grain]
+    if df.empty or not set(spec["dims"] + spec["measures"]).issubset(df.columns):
+        return pd.DataFrame(columns=["grain"] + spec["dims"] + spec["measures"])
+
+    out = (
+        df.groupby(spec["dims"], as_index=False, sort=False, dropna=False)[spec["measures"]]
+        .sum()
+    )
+    out.insert(0, "grain", grain)
+    return out
+
+
+def build_cube(
+    sales: pd.DataFrame,
+    forecast: pd.DataFrame,
+    sku_master: pd.DataFrame,
+    demand: pd.DataFrame,
+    bom_expanded: pd.DataFrame,
+    ledger: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Aggregates the daily datasets into one additive cube.
+
+    Product-level material demand keeps the per-row rounding the
+    consumption dashboard applies (round(product_units × consumption_per_unit)).
+
+    Output columns:
+    - grain, <DIMENSIONS>, <MEASURES>
+    """
+
+    # ----------------------------------
+    # Step 1: Attach SKU category
+    # ----------------------------------
+    if not sku_master.empty and {"sku_id", "category"}.issubset(sku_master.columns):
+        sku_category = sku_master[["sku_id", "category"]].drop_duplicates("sku_id")
+    else:
+        sku_category = pd.DataFrame(columns=["sku_id", "category"])
+
+    if not sales.empty and "sku_id" in sales.columns:
+        sales = sales.merge(sku_category, on="sku_id", how="left")
+    if not forecast.empty and "sku_id" in forecast.columns:
+        forecast = forecast.merge(sku_category, on="sku_id", how="left")
+
+    # ----------------------------------
+    # Step 2: Product-level material demand
+    # ----------------------------------
+    if not bom_expanded.empty:
+        # Products without a BOM carry empty material rows
+        bom_expanded = bom_expanded.dropna(subset=["raw_material", "consumption_per_unit"])
+        bom_expanded = bom_expanded.assign(
+            material_demand_units=(
+                bom_expanded["product_units"] * bom_expanded["consumption_per_unit"]
+            ).round().astype(int)
+        )
+
+    # ----------------------------------
+    # Step 3: Roll up every grain
+    # ----------------------------------
+    parts = [
+        _rollup(sales, "sales_by_channel"),
+        _rollup(forecast, "forecast_by_sku"),
+        _rollup(demand, "material_demand"),
+        _rollup(bom_expanded, "product_material_demand"),
+        _rollup(ledger, "material_consumption"),
+    ]
+    cube = pd.concat([p for p in parts if not p.empty], ignore_index=True)
+
+    return cube.reindex(columns=["grain"] + DIMENSIONS + MEASURES)
+
+
+def split_cube(cube: pd.DataFrame) -> dict:
+    """
+    Splits the cube back into one frame per grain.
+
+    Each frame keeps only its grain's dimensions and measures, with dates
+    parsed, integral measures restored to int and rows sorted by date.
+
+    Returns:
+        dict: {grain: DataFrame}
+    """
+    grains = {}
+    by_grain = dict(tuple(cube.groupby("grain", sort=False))) if not cube.empty else {}
+
+    for grain, spec in GRAINS.items():
+        cols = spec["dims"] + spec["measures"]
+        part = by_grain.get(grain)
+        if part is None:
+            grains[grain] = pd.DataFrame(columns=cols)
+            continue
+
+        part = part[cols].copy()
+        part["date"] = pd.to_datetime(part["date"], errors="coerce")
+        for measure in spec["measures"]:
+            values = part[measure].fillna(0)
+            if (values % 1 == 0).all():
+                values = values.astype("int64")
+            part[measure] = values
+
+        grains[grain] = part.sort_values("date", kind="stable").reset_index(drop=True)
+
+    return grains
+
+
+def load_sources(data_dir: str = DATASETS_DIR) -> dict:
+    """Read the cube input CSVs (missing files become empty frames)."""
+    frames = {}
+    for filename in SOURCE_FILES:
+        path = os.path.join(data_dir, filename)
+        frames[filename] = pd.read_csv(path) if os.path.exists(path) else pd.DataFrame()
+    return frames
+
+
+def build_cube_from_sources(frames: dict) -> pd.DataFrame:
+    return build_cube(
+        sales=frames[SALES_FILE],
+        forecast=frames[FORECAST_FILE],
+        sku_master=frames[SKU_MASTER_FILE],
+        demand=frames[DEMAND_FILE],
+        bom_expanded=frames[BOM_EXPANDED_FILE],
+        ledger=frames[LEDGER_FILE],
+    )
+
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+
+def main():
+    print("=" * 60)
+    print("DASHBOARD AGGREGATE CUBE")
+    print("=" * 60)
+    print()
+
+    print("Loading pipeline outputs...")
+    frames = load_sources()
+    for filename, df in frames.items():
+        print(f"  {filename}: {len(df)} rows")
+
+    print("\nBuilding aggregate cube...")
+    cube = build_cube_from_sources(frames)
+
+    print("\nSaving cube output...")
+    cube.to_csv(OUTPUT_FILE, index=False)
+
+    print()
+    print("=" * 60)
+    print("CUBE BUILD COMPLETED")
+    print("=" * 60)
+    print(f"\nOutput: {OUTPUT_FILE}")
+    print(f"  Total rows: {len(cube)}")
+
+    print("\n--- Rows by Grain ---")
+    for grain, count in cube["grain"].value_counts(sort=False).items():
+        print(f"  {grain}: {count}")
+
+
+if __name__ == "__main__":
+    main()
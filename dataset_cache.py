@@ -0,0 +1,391 @@
+"""
+Dataset Cache (API Serving Layer)
+
+Purpose:
+Keep one parsed copy of every dataset CSV per API process so dashboard
+requests stop re-reading and re-parsing files from disk.
+
+Cache key:
+- file path
+- file mtime (ns)
+- file size
+
+A pipeline run that rewrites a CSV changes its mtime/size, so the next
+request transparently reloads that file only.
+
+Read-only frames:
+Callers receive a shallow copy of the cached frame. With pandas
+copy-on-write enabled (see api_server), any column assignment or
+in-place edit made by a handler copies the touched data first, so the
+shared cached frame can never be mutated by a request.
+
+Derived artifacts:
+derive() caches anything computed from one or more datasets (aggregate
+cube, indexes, ...) under the same file keys, so it is rebuilt exactly
+when one of its inputs changes on disk.
+
+Arrow snapshots:
+When the pipeline has published datasets/arrow/<name>.arrow for a CSV
+(see arrow_snapshots.py) and pyarrow is installed, the file is
+memory-mapped instead of parsing the CSV. Numeric and date columns are
+then views over the mapped pages, shared by every process on the host.
+A snapshot is used only while its recorded source mtime/size match the
+CSV; publishing a new one (atomic rename) changes the file key, so the
+next request maps the new version.
+
+Pinned snapshots:
+Inside pinned(), every lookup made by the thread is served from one
+DatasetSnapshot: each file is read once, on first use, and reused, and
+data_version() / files_version() stay fixed, even if the pipeline
+rewrites files meanwhile. Worker threads share a snapshot by entering
+pinned() with the same object (see the batch endpoint).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard_cube import CUBE_DTYPES, CUBE_FILE
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: without pyarrow every dataset is parsed from CSV
+    pa = None
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+# Columns parsed to datetime once at load time
+DATE_COLUMNS = ("date",)
+
+# Explicit column dtypes for files pandas cannot infer reliably
+COLUMN_DTYPES = {
+    CUBE_FILE: CUBE_DTYPES,
+}
+
+# Arrow IPC snapshots, relative to the data dir
+SNAPSHOT_DIR = "arrow"
+SNAPSHOT_SUFFIX = ".arrow"
+
+# Schema metadata recording which CSV version a snapshot was built from
+SOURCE_MTIME_KEY = b"woodland.source_mtime_ns"
+SOURCE_SIZE_KEY = b"woodland.source_size"
+
+
+@dataclass
+class CacheEntry:
+    key: tuple
+    frame: pd.DataFrame
+    memory_bytes: int
+    load_seconds: float
+    loaded_at: float
+    mapped: bool = False
+
+
+class DatasetSnapshot:
+    """Dataset frames and versions pinned for a group of requests."""
+
+    def __init__(self, version: str):
+        self.version = version
+        self._files = {}  # {filename: (file key, frame)}
+        self._files_versions = {}  # {filenames: version}
+        self._lock = threading.Lock()
+
+    def file(self, filename: str, load) -> tuple:
+        """Pinned (file key, frame), from load() on first use."""
+        with self._lock:
+            if filename in self._files:
+                return self._files[filename]
+        result = load()
+        with self._lock:
+            # Another thread may have pinned it meanwhile; first one wins
+            return self._files.setdefault(filename, result)
+
+    def files_version(self, filenames, compute) -> str:
+        filenames = tuple(filenames)
+        with self._lock:
+            if filenames not in self._files_versions:
+                self._files_versions[filenames] = compute(filenames)
+            return self._files_versions[filenames]
+
+
+# --------------------------------------------------
+# Loading
+# --------------------------------------------------
+
+def read_dataset_csv(path: str, date_columns=DATE_COLUMNS) -> pd.DataFrame:
+    """Parse one dataset CSV (date columns as datetime64)."""
+    df = pd.read_csv(path, dtype=COLUMN_DTYPES.get(os.path.basename(path)))
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def snapshot_path(data_dir: str, filename: str) -> str:
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(data_dir, SNAPSHOT_DIR, stem + SNAPSHOT_SUFFIX)
+
+
+def read_snapshot(path: str, source_stat) -> pd.DataFrame:
+    """
+    Memory-mapped DataFrame from an Arrow snapshot, or None when the
+    snapshot is missing, unreadable or built from another CSV version.
+    """
+    if pa is None:
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (OSError, pa.ArrowException):
+        return None
+
+    metadata = table.schema.metadata or {}
+    if (
+        metadata.get(SOURCE_MTIME_KEY) != str(source_stat.st_mtime_ns).encode()
+        or metadata.get(SOURCE_SIZE_KEY) != str(source_stat.st_size).encode()
+    ):
+        return None
+
+    # split_blocks keeps one block per column, so null-free numeric and
+    # date columns stay zero-copy views over the mapped file
+    df = table.to_pandas(split_blocks=True)
+    for col in df.columns:
+        # Arrow nulls come back as None; pandas' CSV reader yields NaN
+        if df[col].dtype == object and df[col].isna().any():
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+
+class DatasetCache:
+    def __init__(self, data_dir: str, date_columns=DATE_COLUMNS, use_snapshots: bool = True, on_load=None):
+        self.data_dir = data_dir
+        self.date_columns = tuple(date_columns)
+        self.use_snapshots = use_snapshots and pa is not None
+        self.on_load = on_load  # optional callback(filename, seconds, mapped) after each (re)load
+
+        self._entries = {}  # {path: CacheEntry}
+        self._derived = {}  # {name: (source keys, value)}
+        self._lock = threading.Lock()
+        self._file_locks = defaultdict(threading.Lock)
+        self._local = threading.local()  # .snapshot while pinned()
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _read(self, path: str, stat) -> tuple:
+        """(frame, mapped): the Arrow snapshot when valid, else the parsed CSV."""
+        if self.use_snapshots:
+            df = read_snapshot(snapshot_path(self.data_dir, os.path.basename(path)), stat)
+            if df is not None:
+                return df, True
+        return read_dataset_csv(path, self.date_columns), False
+
+    def _snapshot_key(self, filename: str):
+        if not self.use_snapshots:
+            return None
+        try:
+            stat = os.stat(snapshot_path(self.data_dir, filename))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _lookup(self, filename: str, warn: bool = True) -> tuple:
+        """(file key, cached frame) — (None, empty frame) when unavailable."""
+        snapshot = getattr(self._local, "snapshot", None)
+        if snapshot is not None:
+            return snapshot.file(filename, lambda: self._lookup_current(filename, warn))
+        return self._lookup_current(filename, warn)
+
+    def _lookup_current(self, filename: str, warn: bool = True) -> tuple:
+        """_lookup against the files as they are on disk now."""
+        path = os.path.join(self.data_dir, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if warn:
+                print(f"Warning: {filename} not found.")
+            return None, pd.DataFrame()
+
+        # A newly published snapshot changes the key too (CSV unchanged)
+        key = (stat.st_mtime_ns, stat.st_size, self._snapshot_key(filename))
+        entry = self._entries.get(path)
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return key, entry.frame
+
+        with self._lock:
+            file_lock = self._file_locks[path]
+
+        # One loader per file; concurrent requests for the same file wait
+        # for it instead of parsing the CSV in parallel.
+        with file_lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return key, entry.frame
+
+            started = time.perf_counter()
+            try:
+                df, mapped = self._read(path, stat)
+            except Exception as e:
+                print(f"Error reading {filename}: {e}")
+                return None, pd.DataFrame()
+
+            load_seconds = time.perf_counter() - started
+            with self._lock:
+                self.misses += 1
+                if entry is not None:
+                    self.reloads += 1
+                self._entries[path] = CacheEntry(
+                    key=key,
+                    frame=df,
+                    memory_bytes=int(df.memory_usage(deep=True).sum()),
+                    load_seconds=load_seconds,
+                    loaded_at=time.time(),
+                    mapped=mapped,
+                )
+
+            if self.on_load is not None:
+                self.on_load(filename, load_seconds, mapped)
+            return key, df
+
+    def get(self, filename: str) -> pd.DataFrame:
+        """
+        Return the parsed dataset, reloading it only if the file changed.
+
+        Missing or unreadable files yield an empty DataFrame (not cached).
+        """
+        _, df = self._lookup(filename)
+        return df.copy(deep=False)
+
+    def derive(self, name: str, filenames, builder):
+        """
+        Cached builder(*frames) over the given dataset files.
+
+        Rebuilt only when one of the files changes. The result is shared
+        between requests and must be treated as read-only by callers.
+        """
+        lookups = [self._lookup(filename, warn=False) for filename in filenames]
+        key = tuple((filename, file_key) for filename, (file_key, _) in zip(filenames, lookups))
+
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with self._lock:
+            build_lock = self._file_locks[("derived", name)]
+
+        with build_lock:
+            cached = self._derived.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            value = builder(*[df.copy(deep=False) for _, df in lookups])
+            with self._lock:
+                self._derived[name] = (key, value)
+            return value
+
+    def snapshot(self) -> DatasetSnapshot:
+        return DatasetSnapshot(self.data_version())
+
+    @contextmanager
+    def pinned(self, snapshot: DatasetSnapshot = None):
+        """Serve this thread's lookups from snapshot (a new one by default)."""
+        snapshot = snapshot or self.snapshot()
+        previous = getattr(self._local, "snapshot", None)
+        self._local.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._local.snapshot = previous
+
+    def data_version(self) -> str:
+        """
+        Short digest of every dataset file's name, mtime and size.
+
+        Changes whenever the pipeline rewrites any file in the data dir.
+        Fixed while pinned.
+        """
+        snapshot = getattr(self._local, "snapshot", None)
+        if snapshot is not None:
+            return snapshot.version
+        digest = hashlib.sha1()
+        try:
+            with os.scandir(self.data_dir) as it:
+                files = sorted((e for e in it if e.is_file()), key=lambda e: e.name)
+                for e in files:
+                    stat = e.stat()
+                    digest.update(f"{e.name}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+        except OSError:
+            pass
+        return digest.hexdigest()[:16]
+
+    def files_version(self, filenames) -> str:
+        """
+        Short digest of the given files' mtime and size (missing files
+        included), for artifacts that depend on a subset of the data dir.
+        Fixed while pinned.
+        """
+        snapshot = getattr(self._local, "snapshot", None)
+        if snapshot is not None:
+            return snapshot.files_version(filenames, self._files_version)
+        return self._files_version(filenames)
+
+    def _files_version(self, filenames) -> str:
+        digest = hashlib.sha1()
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(self.data_dir, filename))
+                digest.update(f"{filename}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+            except OSError:
+                digest.update(f"{filename}:-;".encode())
+        return digest.hexdigest()[:16]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._derived.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and per-file memory usage."""
+        with self._lock:
+            entries = dict(self._entries)
+            hits, misses, reloads = self.hits, self.misses, self.reloads
+
+        lookups = hits + misses
+        files = [
+            {
+                "file": os.path.basename(path),
+                "rows": len(entry.frame),
+                "memoryBytes": entry.memory_bytes,
+                "loadSeconds": round(entry.load_seconds, 4),
+                "loadedAt": entry.loaded_at,
+                "mapped": entry.mapped,
+            }
+            for path, entry in sorted(entries.items())
+        ]
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "reloads": reloads,
+            "hitRatio": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(files),
+            "memoryBytes": sum(f["memoryBytes"] for f in files),
+            "derived": sorted(self._derived),
+            "files": files,
+        }
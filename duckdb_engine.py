@@ -0,0 +1,543 @@
+"""
+DuckDB Execution Path (API Serving Layer)
+
+Purpose:
+Alternative engine for the dashboard aggregates, selected with
+DASHBOARD_ENGINE=duckdb. The filters, joins and group-bys that
+consumption_aggregates() / sales_aggregates() in api_server.py run in
+pandas run here as SQL with bound parameters, in an embedded columnar
+engine. Both engines return the same aggregates (see DASHBOARD ENGINES
+in api_server.py), so the panels built from them are identical;
+test_duckdb_engine.py checks that on a grid of filtered requests.
+
+Tables:
+The daily datasets are copied into DuckDB once per dataset version
+(DashboardSQL is built through DatasetCache.derive), each with a __row
+column holding its file order, so "first row" and "first appearance"
+orderings match pandas.
+
+Numerics follow the pandas path: channel weighting rounds half-to-even
+per row (round_even), integral sums stay BIGINT and float sums use
+fsum.
+
+Requires duckdb (optional; without it the pandas path is used).
+Connections are never shared across a fork: the engine is built lazily
+in each serving process, and each thread queries through its own cursor.
+"""
+
+import re
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from request_timing import mark_section
+
+try:
+    import duckdb
+except ImportError:  # optional: DASHBOARD_ENGINE=duckdb falls back to pandas
+    duckdb = None
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+ROW_COLUMN = "__row"
+
+# DuckDB table -> dataset file
+TABLES = {
+    "sales": "sku_daily_sales.csv",
+    "forecast": "sku_daily_forecast.csv",
+    "sku_master": "sku_master.csv",
+    "bom": "product_bom.csv",
+    "bom_expanded": "product_bom_expanded.csv",
+    "demand": "raw_material_demand.csv",
+    "ledger": "raw_material_inventory_ledger.csv",
+}
+
+SOURCE_FILES = tuple(TABLES.values())
+
+PARAM_PATTERN = re.compile(r"\$(\w+)")
+
+# Per-row channel weighting (see weighted_units in api_server.py)
+WEIGHTED = "CAST(round_even({col} * $weight, 0) AS BIGINT)"
+
+
+def available() -> bool:
+    return duckdb is not None
+
+
+def _weighted(col: str) -> str:
+    return WEIGHTED.format(col=col)
+
+
+def _timestamp(value):
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def _shares(df: pd.DataFrame):
+    """(share, has_demand) by raw_material, as product_demand_share() returns; None without product rows."""
+    if df.empty or not df["has_product"].any():
+        return None
+    by_rm = df.set_index("raw_material")
+    return by_rm["product_demand"] / by_rm["total_demand"], by_rm["total_demand"] > 0
+
+
+# --------------------------------------------------
+# Engine
+# --------------------------------------------------
+
+class DashboardSQL:
+    """
+    Dashboard aggregates as SQL over one version of the datasets.
+
+    frames are the TABLES datasets in order; cutoff is the last historical
+    date and accuracy_baseline_days the sales accuracy KPI's window.
+    """
+
+    def __init__(self, *frames, cutoff, accuracy_baseline_days):
+        self.cutoff = pd.Timestamp(cutoff)
+        self.accuracy_baseline_days = accuracy_baseline_days
+        self._con = duckdb.connect()
+        self._local = threading.local()
+        self.columns = {}
+        for table, df in zip(TABLES, frames):
+            self.columns[table] = set(df.columns)
+            if df.empty:
+                continue
+            self._con.register(f"{table}_frame", df.assign(**{ROW_COLUMN: np.arange(len(df), dtype="int64")}))
+            # Materialized in DuckDB's columnar storage, shared by all cursors
+            self._con.execute(f"CREATE TABLE {table} AS SELECT * FROM {table}_frame")
+            self._con.unregister(f"{table}_frame")
+
+    def _cursor(self):
+        # DuckDB connections are not safe to share between threads
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self._con.cursor()
+        return cursor
+
+    def _execute(self, sql: str, params: dict):
+        # Bind only the parameters the statement uses (DuckDB rejects extras)
+        used = {name: params[name] for name in PARAM_PATTERN.findall(sql)}
+        return self._cursor().execute(sql, used)
+
+    def query(self, sql: str, params: dict) -> pd.DataFrame:
+        return self._execute(sql, params).df()
+
+    def row(self, sql: str, params: dict) -> tuple:
+        return self._execute(sql, params).fetchone()
+
+    def has(self, *tables) -> bool:
+        """Every table was loaded (its dataset exists and has rows)."""
+        return all(self.columns.get(table) for table in tables)
+
+    # --------------------------------------------------
+    # Consumption dashboard
+    # --------------------------------------------------
+
+    def consumption_aggregates(self, forecast_days, compute, channel=None, store=None, sku=None,
+                               product=None, raw_material=None, category=None) -> dict:
+        """Same aggregates as api_server.consumption_aggregates(), from SQL."""
+        if not self.has("sales", "forecast", "sku_master", "bom", "bom_expanded", "demand", "ledger"):
+            raise ValueError("DuckDB engine needs every consumption dashboard dataset")
+
+        historical_start = self.cutoff - timedelta(days=forecast_days - 1)
+        params = {
+            "horizon": f"{forecast_days}day",
+            "start": _timestamp(historical_start),
+            "cutoff": _timestamp(self.cutoff),
+            "channel": channel,
+            "store": store,
+            "sku": sku,
+            "product": product,
+            "category": category,
+            "weight": 1.0,
+        }
+        aggregates = {}
+
+        # Accuracy KPI inputs: unfiltered
+        aggregates["consumption_all"], aggregates["demand_all"] = self.row("""
+            SELECT
+                (SELECT coalesce(sum(consumed_quantity), 0) FROM ledger WHERE date BETWEEN $start AND $cutoff),
+                (SELECT coalesce(sum(material_demand_units), 0) FROM demand WHERE forecast_horizon = $horizon)
+        """, params)
+
+        # Channel share of all sales (every date)
+        if channel:
+            total, channel_sales = self.row("""
+                SELECT sum(actual_sales_units), sum(actual_sales_units) FILTER (WHERE sales_channel = $channel)
+                FROM sales
+            """, params)
+            if total and total > 0:
+                params["weight"] = (channel_sales or 0) / total
+
+        # Sales rows left by the channel / store filters
+        sales_filters = []
+        if channel:
+            sales_filters.append("sales_channel = $channel")
+        if store:
+            sales_filters.append("store_id = $store")
+        sales_where = " AND ".join(sales_filters) or "TRUE"
+
+        # Raw materials reachable from each filter (products' BOM)
+        scope_sql = {}
+        if channel or store:
+            scope_sql["channel_store"] = f"""
+                product_id IN (SELECT product_id FROM sku_master
+                               WHERE sku_id IN (SELECT sku_id FROM sales WHERE {sales_where}))"""
+        if sku:
+            scope_sql["sku"] = "product_id IN (SELECT product_id FROM sku_master WHERE sku_id = $sku)"
+        if product:
+            scope_sql["product"] = "product_id = $product"
+        if category:
+            scope_sql["category"] = "product_id IN (SELECT product_id FROM sku_master WHERE category = $category)"
+        scopes = {}
+        if scope_sql:
+            selects = ", ".join(
+                f"(SELECT list(DISTINCT raw_material) FROM bom WHERE {where}) AS {name}"
+                for name, where in scope_sql.items()
+            )
+            scopes = dict(zip(scope_sql, self.row(f"SELECT {selects}", params)))
+
+        valid_raw_materials = None
+        if product:
+            valid_raw_materials = set(scopes["product"] or ())
+        if category:
+            category_raw_materials = set(scopes["category"] or ())
+            if valid_raw_materials is not None:
+                valid_raw_materials &= category_raw_materials
+            else:
+                valid_raw_materials = category_raw_materials
+
+        final_raw_materials = None
+        for materials in (scopes.get("channel_store"), scopes.get("sku"), valid_raw_materials):
+            if materials:
+                final_raw_materials = set(materials) if final_raw_materials is None else final_raw_materials & set(materials)
+
+        if raw_material:
+            if final_raw_materials and raw_material not in final_raw_materials:
+                material_scope = []
+            else:
+                material_scope = [raw_material]
+        elif final_raw_materials:
+            material_scope = sorted(final_raw_materials)
+        else:
+            material_scope = None
+        params["materials"] = material_scope
+        in_scope = "" if material_scope is None else "AND list_contains(CAST($materials AS VARCHAR[]), raw_material)"
+
+        # Product-specific demand from the BOM (not channel-weighted)
+        product_bom_rows = """
+            FROM bom_expanded
+            WHERE forecast_horizon = $horizon AND product_id = $product
+              AND raw_material IS NOT NULL AND consumption_per_unit IS NOT NULL"""
+        aggregates["product_demand"] = bool(product) and self.row(
+            "SELECT count(*) > 0 FROM bom_expanded WHERE forecast_horizon = $horizon", params
+        )[0]
+        product_rows = aggregates["product_demand"] and self.row(f"SELECT count(*) > 0 {product_bom_rows}", params)[0]
+        product_units = "CAST(round_even(product_units * consumption_per_unit, 0) AS BIGINT)"
+
+        if product_rows:
+            demand_rows = f"SELECT date, raw_material, {product_units} AS units, {ROW_COLUMN} {product_bom_rows} {in_scope}"
+            demand_by_date_rm = f"""
+                SELECT date, raw_material, CAST(sum(units) AS BIGINT) AS material_demand_units
+                FROM demand_rows GROUP BY date, raw_material
+                ORDER BY date, min({ROW_COLUMN})"""
+        else:
+            demand_rows = f"""
+                SELECT date, raw_material, {_weighted('material_demand_units')} AS units, material_demand_units, {ROW_COLUMN}
+                FROM demand WHERE forecast_horizon = $horizon {in_scope}"""
+            demand_by_date_rm = f"""
+                SELECT date, raw_material, {_weighted('sum(material_demand_units)')} AS material_demand_units
+                FROM demand_rows GROUP BY date, raw_material
+                ORDER BY date, min({ROW_COLUMN})"""
+
+        aggregates["demand"] = self.query(f"WITH demand_rows AS ({demand_rows}) {demand_by_date_rm}", params)
+        aggregates["has_material_demand"] = self.row(
+            f"WITH demand_rows AS ({demand_rows}) SELECT count(*) > 0 FROM demand_rows", params
+        )[0]
+
+        # Historical consumption: weighted per grain row (as the cube) and per ledger row
+        consumption = self.query(f"""
+            SELECT date, raw_material,
+                   {_weighted('sum(consumed_quantity)')} AS consumed_quantity,
+                   CAST(sum({_weighted('consumed_quantity')}) AS BIGINT) AS row_consumed_quantity
+            FROM ledger
+            WHERE date BETWEEN $start AND $cutoff {in_scope}
+            GROUP BY date, raw_material
+            ORDER BY date, min({ROW_COLUMN})
+        """, params)
+        aggregates["consumption"] = consumption[["date", "raw_material", "consumed_quantity"]]
+        aggregates["historical_consumption"] = (
+            consumption[["date", "raw_material", "row_consumed_quantity"]]
+            .rename(columns={"row_consumed_quantity": "consumed_quantity"})
+            .sort_values(["date", "raw_material"], ignore_index=True)
+        )
+
+        # Latest stocked ledger row per material, with its demand and inflow
+        if {"kpis", "riskTable"} & set(compute):
+            aggregates["inventory"] = self.query(f"""
+                WITH demand_rows AS ({demand_rows}),
+                inventory AS (
+                    SELECT raw_material, date, {ROW_COLUMN}, inflow_quantity,
+                           {_weighted('closing_inventory')} AS closing_inventory,
+                           {_weighted('safety_stock')} AS safety_stock
+                    FROM ledger WHERE TRUE {in_scope}
+                ),
+                latest AS (
+                    SELECT *, closing_inventory > 0 AS has_stock
+                    FROM inventory
+                    QUALIFY row_number() OVER (
+                        PARTITION BY raw_material
+                        ORDER BY closing_inventory > 0 DESC, date DESC, {ROW_COLUMN} DESC
+                    ) = 1
+                ),
+                demand_by_rm AS (
+                    SELECT raw_material, CAST(sum(units) AS BIGINT) AS forecasted_demand
+                    FROM demand_rows GROUP BY raw_material
+                ),
+                inflow_by_rm AS (
+                    SELECT raw_material, avg(inflow_quantity) AS avg_daily_inflow
+                    FROM inventory GROUP BY raw_material
+                )
+                SELECT l.raw_material, l.date, l.closing_inventory, l.safety_stock,
+                       coalesce(d.forecasted_demand, 0) AS forecasted_demand,
+                       coalesce(i.avg_daily_inflow, 0) AS avg_daily_inflow
+                FROM latest l
+                LEFT JOIN demand_by_rm d USING (raw_material)
+                LEFT JOIN inflow_by_rm i USING (raw_material)
+                ORDER BY l.has_stock DESC, l.date, l.{ROW_COLUMN}
+            """, params)
+
+        # Product's share of each material's BOM demand (this horizon / every horizon)
+        aggregates["shares"] = self._product_shares(params, horizon=True) if aggregates["product_demand"] else None
+        aggregates["product_bom"] = bool(product)
+        aggregates["shares_all"] = self._product_shares(params, horizon=False) if product else None
+
+        if "funnel" in compute:
+            aggregates.update(self._consumption_funnel(params, sales_where))
+
+        mark_section("sql")
+        return aggregates
+
+    def _product_shares(self, params: dict, horizon: bool):
+        in_horizon = "AND forecast_horizon = $horizon" if horizon else ""
+        return _shares(self.query(f"""
+            SELECT raw_material,
+                   coalesce(fsum(product_units * consumption_per_unit) FILTER (WHERE product_id = $product), 0) AS product_demand,
+                   coalesce(fsum(product_units * consumption_per_unit), 0) AS total_demand,
+                   bool_or(product_id = $product) AS has_product
+            FROM bom_expanded
+            WHERE raw_material IS NOT NULL {in_horizon}
+            GROUP BY raw_material
+            ORDER BY raw_material
+        """, params))
+
+    def _consumption_funnel(self, params: dict, sales_where: str) -> dict:
+        filters = ["forecast_horizon = $horizon"]
+        if params["store"]:
+            filters.append("store_id = $store")
+        # Only SKUs with sales under the channel / store filters (when any are left)
+        filters.append(f"""(NOT EXISTS (SELECT 1 FROM sales WHERE {sales_where})
+                            OR sku_id IN (SELECT sku_id FROM sales WHERE {sales_where}))""")
+        if params["sku"]:
+            filters.append("sku_id = $sku")
+        if params["product"]:
+            filters.append("sku_id IN (SELECT sku_id FROM sku_master WHERE product_id = $product)")
+        if params["category"]:
+            filters.append("sku_id IN (SELECT sku_id FROM sku_master WHERE category = $category)")
+
+        sku_units, product_count, product_forecast_units = self.row(f"""
+            WITH forecast_rows AS (
+                SELECT sku_id, forecast_units FROM forecast WHERE {' AND '.join(filters)}
+            ),
+            products AS (
+                SELECT DISTINCT product_id FROM sku_master
+                WHERE sku_id IN (SELECT sku_id FROM forecast_rows)
+            ),
+            product_days AS (
+                SELECT arg_min(product_units, {ROW_COLUMN}) AS product_units
+                FROM bom_expanded
+                WHERE product_id IN (SELECT product_id FROM products)
+                GROUP BY product_id, date
+            )
+            SELECT
+                (SELECT CAST(coalesce(sum({_weighted('forecast_units')}), 0) AS BIGINT) FROM forecast_rows),
+                (SELECT count(*) FROM products),
+                (SELECT CAST(coalesce(sum(product_units), 0) AS BIGINT) FROM product_days)
+        """, params)
+        return {
+            "sku_units": sku_units,
+            "product_count": product_count,
+            "product_forecast_units": product_forecast_units if product_count > 0 else sku_units,
+        }
+
+    # --------------------------------------------------
+    # Sales dashboard
+    # --------------------------------------------------
+
+    def sales_aggregates(self, forecast_days, compute, channel=None, store=None, sku=None,
+                         product=None, category=None) -> dict:
+        """Same aggregates as api_server.sales_aggregates(), from SQL."""
+        if not self.has("sales", "forecast", "sku_master"):
+            raise ValueError("DuckDB engine needs every sales dashboard dataset")
+
+        compute = set(compute)
+        historical_start = self.cutoff - timedelta(days=forecast_days - 1)
+        params = {
+            "horizon": f"{forecast_days}day",
+            "start": _timestamp(historical_start),
+            "cutoff": _timestamp(self.cutoff),
+            "accuracy_start": _timestamp(self.cutoff - timedelta(days=self.accuracy_baseline_days - 1)),
+            "channel": channel,
+            "store": store,
+            "sku": sku,
+            "product": product,
+            "category": category,
+            "weight": 1.0,
+        }
+        aggregates = {}
+
+        # Accuracy KPI inputs: unfiltered
+        aggregates["forecast_all"], aggregates["sales_all"] = self.row("""
+            SELECT
+                (SELECT coalesce(sum(forecast_units), 0) FROM forecast WHERE forecast_horizon = $horizon),
+                (SELECT coalesce(sum(actual_sales_units), 0) FROM sales WHERE date BETWEEN $accuracy_start AND $cutoff)
+        """, params)
+
+        product_skus = "sku_id IN (SELECT sku_id FROM sku_master WHERE product_id = $product)"
+        sales_filters = ["date BETWEEN $start AND $cutoff"]
+        forecast_filters = ["forecast_horizon = $horizon"]
+        if product:
+            sales_filters.append(product_skus)
+            forecast_filters.append(product_skus)
+
+        # Channel share of the (product-filtered) historical window
+        if channel:
+            total, channel_sales = self.row(f"""
+                SELECT sum(actual_sales_units), sum(actual_sales_units) FILTER (WHERE sales_channel = $channel)
+                FROM sales WHERE {' AND '.join(sales_filters)}
+            """, params)
+            if total and total > 0:
+                params["weight"] = (channel_sales or 0) / total
+            sales_filters.append("sales_channel = $channel")
+
+        if store:
+            sales_filters.append("store_id = $store")
+            forecast_filters.append("store_id = $store")
+        if sku:
+            sales_filters.append("sku_id = $sku")
+            forecast_filters.append("sku_id = $sku")
+        if category:
+            category_skus = "sku_id IN (SELECT sku_id FROM sku_master WHERE category = $category)"
+            sales_filters.append(category_skus)
+            forecast_filters.append(category_skus)
+
+        views = f"""
+            WITH sales_rows AS (
+                SELECT date, sku_id, sales_channel, actual_sales_units, {ROW_COLUMN}
+                FROM sales WHERE {' AND '.join(sales_filters)}
+            ),
+            forecast_rows AS (
+                SELECT date, sku_id, {_weighted('forecast_units')} AS forecast_units
+                FROM forecast WHERE {' AND '.join(forecast_filters)}
+            )"""
+
+        (
+            aggregates["forecast_units"],
+            aggregates["forecast_volatility"],
+            forecast_rows,
+            aggregates["sales_units"],
+            sales_rows,
+        ) = self.row(f"""{views}
+            SELECT
+                (SELECT CAST(coalesce(sum(forecast_units), 0) AS BIGINT) FROM forecast_rows),
+                (SELECT stddev_samp(forecast_units) FROM forecast_rows),
+                (SELECT count(*) FROM forecast_rows),
+                (SELECT CAST(coalesce(sum(actual_sales_units), 0) AS BIGINT) FROM sales_rows),
+                (SELECT count(*) FROM sales_rows)
+        """, params)
+        aggregates["has_forecast"] = forecast_rows > 0
+        aggregates["has_sales"] = sales_rows > 0
+        if aggregates["forecast_volatility"] is None:
+            aggregates["forecast_volatility"] = np.nan if forecast_rows else 0
+
+        if {"trend", "rollingError"} & compute:
+            aggregates["channels"] = self.query(f"""{views}
+                SELECT sales_channel FROM sales_rows
+                GROUP BY sales_channel ORDER BY min({ROW_COLUMN})
+            """, params)["sales_channel"].tolist()
+            aggregates["sales_by_date_channel"] = self.query(f"""{views}
+                SELECT date, sales_channel, CAST(sum(actual_sales_units) AS BIGINT) AS actual_sales_units
+                FROM sales_rows GROUP BY date, sales_channel
+                ORDER BY date, sales_channel
+            """, params)
+            aggregates["forecast_by_date"] = self.query(f"""{views}
+                SELECT date, CAST(sum(forecast_units) AS BIGINT) AS forecast_units
+                FROM forecast_rows GROUP BY date ORDER BY date
+            """, params)
+
+        if {"performance", "heatmap", "topDrivers", "deviation"} & compute:
+            aggregates["sku_forecast"] = self.query(f"""{views}
+                SELECT sku_id,
+                       CAST(sum(forecast_units) AS BIGINT) AS total_forecast,
+                       stddev_samp(forecast_units) AS volatility,
+                       avg(forecast_units) AS avg_forecast_daily
+                FROM forecast_rows GROUP BY sku_id ORDER BY sku_id
+            """, params)
+
+        if "heatmap" in compute:
+            aggregates["forecast_by_sku_date"] = self.query(f"""{views}
+                SELECT sku_id, date, CAST(sum(forecast_units) AS BIGINT) AS forecast_units
+                FROM forecast_rows GROUP BY sku_id, date ORDER BY sku_id, date
+            """, params)
+
+        both = aggregates["has_forecast"] and aggregates["has_sales"]
+        sku_tables = f"""{views},
+            sku_forecast AS (
+                SELECT sku_id,
+                       sum(forecast_units) AS total_forecast,
+                       stddev_samp(forecast_units) AS volatility,
+                       avg(forecast_units) AS avg_forecast_daily
+                FROM forecast_rows GROUP BY sku_id
+            ),
+            sku_sales AS (
+                SELECT sku_id,
+                       sum(actual_sales_units) AS total_actual,
+                       avg(actual_sales_units) AS avg_daily,
+                       stddev_samp(actual_sales_units) AS actual_volatility
+                FROM sales_rows GROUP BY sku_id
+            )"""
+
+        if "performance" in compute and both:
+            # Outer join on SKU (missing metrics are 0), in SKU order, with the master category
+            aggregates["sku_metrics"] = self.query(f"""{sku_tables},
+                sku_category AS (SELECT DISTINCT sku_id, category FROM sku_master)
+                SELECT sku_id,
+                       coalesce(f.total_forecast, 0) AS total_forecast,
+                       coalesce(f.volatility, 0) AS volatility,
+                       coalesce(f.avg_forecast_daily, 0) AS avg_forecast_daily,
+                       coalesce(s.total_actual, 0) AS total_actual,
+                       coalesce(s.avg_daily, 0) AS avg_daily,
+                       coalesce(s.actual_volatility, 0) AS actual_volatility,
+                       c.category
+                FROM sku_forecast f
+                FULL OUTER JOIN sku_sales s USING (sku_id)
+                LEFT JOIN sku_category c USING (sku_id)
+                ORDER BY sku_id
+            """, params)
+
+        if "deviation" in compute and both:
+            aggregates["deviations"] = self.query(f"""{sku_tables}
+                SELECT (f.total_forecast - s.total_actual) / s.total_actual * 100 AS deviation
+                FROM sku_forecast f JOIN sku_sales s USING (sku_id)
+                WHERE s.total_actual > 0
+                ORDER BY sku_id
+            """, params)["deviation"].tolist()
+
+        mark_section("sql")
+        return aggregates
+
@@ -0,0 +1,51 @@
+"""
+Gunicorn Launcher (API Serving Layer)
+
+Purpose:
+Pre-forked production serving for the Woodland API.
+
+The master process imports the app through create_app(), which loads and
+indexes every dataset once. Workers are then forked from it and share
+those frames copy-on-write, so startup cost is paid once and adding
+workers does not multiply dataset memory.
+
+Run:
+    gunicorn -c gunicorn.conf.py
+
+Configuration (environment):
+- PORT: listen port (default 5051)
+- WEB_CONCURRENCY: worker processes (default: CPU count)
+- GUNICORN_THREADS: threads per worker (default 4)
+"""
+
+import gc
+import multiprocessing
+import os
+
+
+wsgi_app = "api_server:create_app()"
+bind = f"0.0.0.0:{os.environ.get('PORT', 5051)}"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Load (and warm) the app in the master before forking
+preload_app = True
+
+# Chatbot requests make several LLM round trips
+timeout = 120
+
+
+def when_ready(server):
+    # Runs in the master after the preload, before any worker is forked.
+    # Frozen objects are skipped by the collector, which would otherwise
+    # write to their headers and un-share the pages holding them.
+    gc.freeze()
+    server.log.info("Froze %d objects before forking workers", gc.get_freeze_count())
+
+
+def post_worker_init(worker):
+    # Each worker loads the chatbot in its own background thread once it is
+    # serving (threads started in the master would not survive the fork).
+    from api_server import CHATBOT
+    CHATBOT.ensure_started()
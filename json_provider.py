@@ -0,0 +1,115 @@
+"""
+JSON Provider (API Serving Layer)
+
+Purpose:
+Encode API responses with orjson instead of the stdlib encoder Flask
+uses by default, and serialize DataFrames column by column.
+
+Output stays compatible with Flask's default provider:
+- keys sorted, compact separators
+- datetimes / Timestamps as HTTP dates ("Fri, 06 Feb 2026 00:00:00 GMT")
+- NumPy ints, floats, bools and arrays encoded natively
+- NaN / NaT / pd.NA as null (the stdlib emitted bare NaN, which is not JSON)
+
+DataFrames passed to jsonify() become a list of records, like
+to_dict(orient="records"), built from whole-column conversions.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import uuid
+
+import numpy as np
+import orjson
+import pandas as pd
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_SORT_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+    | orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
+
+# --------------------------------------------------
+# Column conversion
+# --------------------------------------------------
+
+def http_dates(values: pd.Series) -> list:
+    """HTTP-date strings for a datetime column (None for NaT).
+
+    Dashboards hold few distinct dates, so each distinct value is
+    formatted once and broadcast back with a take.
+    """
+    codes, uniques = pd.factorize(values)
+    formatted = np.array([http_date(ts.to_pydatetime()) for ts in uniques] + [None], dtype=object)
+    # NaT has code -1, which picks the trailing None
+    return formatted[codes].tolist()
+
+
+def column_values(series: pd.Series) -> list:
+    """Python values for one column, converted in bulk."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return http_dates(series)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if series.dtype == object or pd.api.types.is_extension_array_dtype(series.dtype):
+        # Missing markers (pd.NA / NaT / NaN) → None
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
+
+
+def frame_records(df: pd.DataFrame) -> list:
+    """Equivalent of df.to_dict(orient="records"), built column-wise."""
+    columns = [str(col) for col in df.columns]
+    values = [column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def raw_json(body: bytes) -> orjson.Fragment:
+    """Already-encoded JSON embedded as-is in a response (not parsed again)."""
+    return orjson.Fragment(body)
+
+
+def _default(o):
+    if isinstance(o, pd.DataFrame):
+        return frame_records(o)
+    if isinstance(o, pd.Series):
+        return column_values(o)
+    if o is pd.NaT or o is pd.NA:
+        return None
+    if isinstance(o, datetime.date):
+        return http_date(o)
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+# --------------------------------------------------
+# Flask provider
+# --------------------------------------------------
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Trailing newline, as Flask's default provider emits
+        body = orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
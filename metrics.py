@@ -0,0 +1,160 @@
+"""
+API Metrics (API Serving Layer)
+
+Purpose:
+In-process counters and latency histograms for the Woodland API,
+rendered in the Prometheus text exposition format (version 0.0.4).
+
+Metric types:
+- Counter: monotonically increasing totals per label set
+- Histogram: fixed upper bounds; observe() is one bisect and one locked
+  increment (a few microseconds)
+- Collector callbacks: values read at scrape time from existing stats
+  (dataset and response caches), so nothing is tracked twice
+
+Every process keeps its own values; with several gunicorn workers each
+worker reports its own series (add a per-worker scrape target, or run
+one process, for exact totals).
+"""
+
+import bisect
+import threading
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency buckets (seconds): cached responses are sub-millisecond,
+# cold dashboards a few hundred ms
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Chatbot stages make LLM round trips
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# --------------------------------------------------
+# Metric types
+# --------------------------------------------------
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}  # {label values: float}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _labels(self.label_names, label_values), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.bounds = tuple(sorted(buckets))
+        self._series = {}  # {label values: [per-bucket counts (+Inf last), sum]}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.bounds) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {k: (list(counts), total) for k, (counts, total) in self._series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                yield f"{self.name}_bucket", _labels(self.label_names, label_values, (le,)), cumulative
+            labels = _labels(self.label_names, label_values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class CallbackMetric:
+    """Gauge or counter whose samples come from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, kind: str, labels, collect):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(labels)
+        self.collect = collect  # () -> iterable of (label values tuple, value)
+
+    def samples(self):
+        for label_values, value in self.collect():
+            yield self.name, _labels(self.label_names, label_values), value
+
+
+# --------------------------------------------------
+# Registry
+# --------------------------------------------------
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge_callback(self, name, help_text, labels, collect):
+        return self.register(CallbackMetric(name, help_text, "gauge", labels, collect))
+
+    def counter_callback(self, name, help_text, labels, collect):
+        return self.register(CallbackMetric(name, help_text, "counter", labels, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
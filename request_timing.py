@@ -0,0 +1,119 @@
+"""
+Request Timing (API Serving Layer)
+
+Purpose:
+Opt-in instrumentation for slow API requests: a per-request breakdown in
+the Server-Timing response header, and full profiles of single requests.
+
+Server-Timing:
+A request is timed when it sends the X-Server-Timing header, or when it
+is sampled (SERVER_TIMING_SAMPLE_RATE, 0.0–1.0, default 0). Handlers call
+mark_section(name) at section boundaries; each mark records the time since the
+previous one, so marks read as "the section that just ended". Repeated
+names add up. Untimed requests pay one attribute lookup per mark.
+
+    Server-Timing: load;dur=41.2, filter;dur=8.9, kpis;dur=55.0, total;dur=131.4
+
+Sampled requests are also logged one line each.
+
+Profiles:
+profile_call() runs a callable under cProfile (or pyinstrument, when
+installed) and returns the report as text; the API exposes it through
+its debug profile endpoint.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import time
+
+from flask import g
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # optional: cProfile is always available
+    InstrumentProfiler = None
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+TIMING_REQUEST_HEADER = "X-Server-Timing"
+SAMPLE_RATE = float(os.environ.get("SERVER_TIMING_SAMPLE_RATE", 0.0))
+
+PROFILE_ENGINES = ("cprofile", "pyinstrument") if InstrumentProfiler else ("cprofile",)
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "calls")
+
+
+# --------------------------------------------------
+# Server-Timing
+# --------------------------------------------------
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.sections = {}  # {name: seconds}, in first-mark order
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.sections.items()]
+        parts.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_timing(headers):
+    """Attach a timer to the current request when it asked for one or is sampled."""
+    if headers.get(TIMING_REQUEST_HEADER) or (SAMPLE_RATE and random.random() < SAMPLE_RATE):
+        g.request_timer = RequestTimer()
+        g.request_timer_sampled = not headers.get(TIMING_REQUEST_HEADER)
+
+
+def mark_section(name: str):
+    """Close the current section of a timed request (no-op otherwise)."""
+    timer = g.get("request_timer")
+    if timer is not None:
+        timer.mark(name)
+
+
+def finish_timing(response, path: str):
+    """Add the Server-Timing header to a timed request's response."""
+    timer = g.get("request_timer")
+    if timer is None:
+        return response
+    response.headers["Server-Timing"] = timer.header()
+    if g.get("request_timer_sampled"):
+        print(f"[timing] {path} {response.status_code} {response.headers['Server-Timing']}")
+    return response
+
+
+# --------------------------------------------------
+# Profiles
+# --------------------------------------------------
+
+def profile_call(func, engine: str = "cprofile", sort: str = "cumulative", limit: int = 40) -> tuple:
+    """(func's return value, text report) for one call profiled in this thread."""
+    if engine == "pyinstrument" and InstrumentProfiler is not None:
+        profiler = InstrumentProfiler(async_mode="disabled")
+        profiler.start()
+        try:
+            result = func()
+        finally:
+            profiler.stop()
+        return result, profiler.output_text(unicode=True, color=False)
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return result, out.getvalue()
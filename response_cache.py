@@ -0,0 +1,130 @@
+"""
+Response Cache (API Serving Layer)
+
+Purpose:
+Keep the serialized JSON of recent dashboard responses so repeated filter
+combinations are answered without recomputing the dashboard.
+
+Cache key:
+- endpoint path
+- version of the files the endpoint reads (see DatasetCache.files_version)
+- normalized filter query params
+
+A pipeline run that rewrites one of those files changes the version, so
+stale responses are never served; they simply age out of the LRU.
+
+Eviction:
+Least recently used first, bounded by both entry count and total body
+bytes.
+
+ETags:
+Each entry carries a strong ETag (digest of the body) so browsers can
+revalidate with If-None-Match and receive 304 Not Modified.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    mimetype: str
+    created_at: float
+
+
+def make_etag(body: bytes) -> str:
+    """Strong validator for a response body (unquoted; Werkzeug adds quotes)."""
+    return hashlib.sha1(body).hexdigest()
+
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+
+class ResponseCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # {key: CachedResponse}, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Cached response for key (marked most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body: bytes, mimetype: str = "application/json") -> CachedResponse:
+        """
+        Store a response body and return its entry.
+
+        Bodies larger than the whole byte budget are returned but not kept.
+        """
+        entry = CachedResponse(
+            body=body,
+            etag=make_etag(body),
+            mimetype=mimetype,
+            created_at=time.time(),
+        )
+        if len(body) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+
+            self._entries[key] = entry
+            self._bytes += len(body)
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+            }
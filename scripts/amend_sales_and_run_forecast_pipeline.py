@@ -13,6 +13,10 @@ runs, Consumption Forecast Accuracy is ~90% (no manual scaling of forecast).
 
 4. Run supply_demand_reconciliation → raw_material_reconciliation.csv.
 
+5. Rebuild the dashboard aggregate cube → dashboard_cube.csv.
+
+6. Publish Arrow snapshots of the refreshed datasets → datasets/arrow/.
+
 We do NOT run align_baseline_consumption_from_sales so that "historical consumption"
 (ledger) stays unchanged; only the forecast (from model) is lowered.
 """
@@ -103,6 +107,34 @@ def run_reconciliation():
     return True
 
 
+def run_dashboard_cube():
+    """Rebuild the dashboard aggregate cube from the refreshed datasets."""
+    print("\n--- Building dashboard aggregate cube ---")
+    r = subprocess.run(
+        [sys.executable, os.path.join(BASE_DIR, "dashboard_cube.py")],
+        cwd=BASE_DIR,
+        capture_output=False,
+    )
+    if r.returncode != 0:
+        print("WARNING: dashboard_cube.py returned", r.returncode)
+        return False
+    return True
+
+
+def run_arrow_snapshots():
+    """Publish Arrow snapshots of the refreshed datasets for the API to map."""
+    print("\n--- Publishing Arrow snapshots ---")
+    r = subprocess.run(
+        [sys.executable, os.path.join(BASE_DIR, "arrow_snapshots.py")],
+        cwd=BASE_DIR,
+        capture_output=False,
+    )
+    if r.returncode != 0:
+        print("WARNING: arrow_snapshots.py returned", r.returncode)
+        return False
+    return True
+
+
 def main():
     print("=" * 60)
     print("AMEND ACTUAL SALES & RUN FORECAST PIPELINE")
@@ -115,6 +147,8 @@ def main():
     if not run_forecast_pipeline():
         sys.exit(1)
     run_reconciliation()
+    run_dashboard_cube()
+    run_arrow_snapshots()
     print("\nDone. Consumption Forecast Accuracy should be ~90%.")
     print("Refresh the Consumption dashboard to verify.")
 
@@ -0,0 +1,151 @@
+"""
+Mixed-load latency benchmark for the Woodland API.
+
+Runs dashboard/filter clients and chatbot clients against a running
+server at the same time and reports latency percentiles per route class,
+to compare the serving modes under the same load:
+
+  WSGI (threaded Flask):  python3 api_server.py
+  ASGI (bounded pools):   uvicorn asgi_app:app --port 5051
+
+  python3 scripts/bench_mixed_load.py --url http://localhost:5051 --seconds 30
+
+Chat requests hit the configured LLM provider, so they are as slow as the
+real round trips; pass --chat-clients 0 for dashboard-only load.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+
+DASHBOARD_PATHS = (
+    "/api/consumption/dashboard",
+    "/api/sales/dashboard",
+)
+
+# Filter values sampled per request (dashboard responses are cached per combination)
+DASHBOARD_PARAMS = {
+    "dateRange": ("next-7", "next-30"),
+    "channel": ("all", "E-Commerce", "Offline Retail"),
+    "aggregation": ("daily", "weekly", "monthly"),
+    "rollingWindow": ("7", "30"),
+}
+
+FILTER_PATHS = (
+    "/api/filters",
+    "/api/filters/skus?category=Casuals",
+    "/api/filters/stores",
+    "/api/health",
+)
+
+CHAT_QUESTIONS = (
+    "What is the total forecasted demand for the next 7 days?",
+    "Which raw materials are at stockout risk?",
+    "Show top 5 SKUs by sales in the last 30 days",
+)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, route_class, seconds, ok):
+        with self.lock:
+            self.latencies[route_class].append(seconds)
+            if not ok:
+                self.errors[route_class] += 1
+
+
+def request(url, data=None, timeout=120):
+    """(ok, seconds) for one request."""
+    body = None if data is None else json.dumps(data).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 500
+    except urllib.error.HTTPError as e:
+        e.read()
+        ok = e.code < 500
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+def dashboard_client(base_url, deadline, recorder, rng):
+    while time.time() < deadline:
+        if rng.random() < 0.7:
+            params = urllib.parse.urlencode({k: rng.choice(v) for k, v in DASHBOARD_PARAMS.items()})
+            url = f"{base_url}{rng.choice(DASHBOARD_PATHS)}?{params}"
+            route_class = "dashboard"
+        else:
+            url = f"{base_url}{rng.choice(FILTER_PATHS)}"
+            route_class = "filters"
+        ok, seconds = request(url)
+        recorder.record(route_class, seconds, ok)
+
+
+def chat_client(base_url, deadline, recorder, rng):
+    while time.time() < deadline:
+        ok, seconds = request(f"{base_url}/api/chat/query", {"question": rng.choice(CHAT_QUESTIONS)})
+        recorder.record("chat", seconds, ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5051")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--dashboard-clients", type=int, default=16)
+    parser.add_argument("--chat-clients", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    recorder = Recorder()
+    deadline = time.time() + args.seconds
+    threads = [
+        threading.Thread(target=dashboard_client, args=(base_url, deadline, recorder, random.Random(args.seed + i)))
+        for i in range(args.dashboard_clients)
+    ] + [
+        threading.Thread(target=chat_client, args=(base_url, deadline, recorder, random.Random(-args.seed - i)))
+        for i in range(args.chat_clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{args.dashboard_clients} dashboard/filter clients, {args.chat_clients} chat clients, {args.seconds:.0f}s")
+    print(f"{'class':<10} {'requests':>8} {'errors':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for route_class in ("dashboard", "filters", "chat"):
+        values = recorder.latencies.get(route_class, [])
+        if not values:
+            continue
+        print(
+            f"{route_class:<10} {len(values):>8} {recorder.errors[route_class]:>6} "
+            f"{len(values) / args.seconds:>7.1f} "
+            f"{percentile(values, 50) * 1000:>8.1f} {percentile(values, 95) * 1000:>8.1f} "
+            f"{percentile(values, 99) * 1000:>8.1f} {max(values) * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Reproducible load test for the Woodland API.
+
+Starts api_server.py locally (LLM_PROVIDER=stub, so chat requests use
+canned answers after LLM_STUB_LATENCY seconds instead of a real model),
+replays a seeded mix of dashboard filter combinations, table pages,
+filter lookups and chat questions from concurrent clients, and reports
+throughput and p50 / p95 / p99 latency per route:
+
+  python3 scripts/load_test.py --clients 16 --seconds 60
+
+Against a server that is already running (any serving mode):
+
+  python3 scripts/load_test.py --url http://localhost:5051
+
+Baselines:
+  --save-baseline   write this run's per-route results to --baseline
+  (default)         compare with --baseline when it exists, flag routes
+                    whose p95 or throughput is worse by more than
+                    --tolerance, or whose error rate rose, and exit 1
+                    (routes with few requests in either run are skipped)
+
+Results depend on the machine and the datasets: save the baseline on
+the machine the comparisons will run on.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from bench_mixed_load import CHAT_QUESTIONS, Recorder, percentile, request
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "scripts", "load_test_baseline.json")
+
+STARTUP_TIMEOUT = 600
+
+# Routes with fewer requests (in either run) are reported but not compared: too noisy
+MIN_COMPARED_REQUESTS = 50
+
+
+# --------------------------------------------------
+# Workload
+# --------------------------------------------------
+
+# Share of requests per route (chat is the rarest and the slowest)
+ROUTE_WEIGHTS = {
+    "/api/consumption/dashboard": 25,
+    "/api/sales/dashboard": 25,
+    "/api/consumption/risk-table": 8,
+    "/api/consumption/material-table": 6,
+    "/api/sales/forecast-table": 8,
+    "/api/flow/funnel": 4,
+    "/api/filters": 6,
+    "/api/filters/skus": 5,
+    "/api/filters/stores": 4,
+    "/api/filters/products": 3,
+    "/api/filters/rawMaterials": 3,
+    "/api/chat/query": 3,
+}
+
+# Most planners keep a filter on "all"; the rest pick one value
+FILTER_ALL_SHARE = 0.6
+
+
+def pick(rng, values):
+    if not values or rng.random() < FILTER_ALL_SHARE:
+        return "all"
+    return rng.choice(values)
+
+
+def build_request(route, rng, options):
+    """(path with query, JSON body or None) for one request on route."""
+    params = {}
+    if route == "/api/consumption/dashboard":
+        params = {
+            "dateRange": rng.choice(("next-7", "next-30")),
+            "aggregation": rng.choice(("daily", "weekly", "monthly")),
+            "channel": pick(rng, options["channels"]),
+            "category": pick(rng, options["categories"]),
+            "product": pick(rng, options["products"]),
+            "rawMaterial": pick(rng, options["rawMaterials"]),
+        }
+    elif route == "/api/sales/dashboard":
+        params = {
+            "dateRange": rng.choice(("next-7", "next-30")),
+            "rollingWindow": rng.choice(("7", "30")),
+            "channel": pick(rng, options["channels"]),
+            "category": pick(rng, options["categories"]),
+            "store": pick(rng, options["stores"]),
+            "sku": pick(rng, options["skus"]),
+        }
+    elif route in ("/api/consumption/risk-table", "/api/consumption/material-table"):
+        params = {"material": pick(rng, options["rawMaterials"]), "limit": 100}
+    elif route == "/api/sales/forecast-table":
+        params = {
+            "forecastHorizon": rng.choice(options["forecastHorizons"] or ["30day"]),
+            "sku": pick(rng, options["skus"]),
+            "limit": 100,
+            "sort": rng.choice(("date", "-date")),
+        }
+    elif route == "/api/flow/funnel":
+        params = {"forecastHorizon": rng.choice(options["forecastHorizons"] or ["30day"])}
+    elif route == "/api/filters/skus":
+        params = {"category": pick(rng, options["categories"])}
+    elif route == "/api/filters/stores":
+        params = {"sku": pick(rng, options["skus"])}
+    elif route == "/api/filters/products":
+        params = {"rawMaterial": pick(rng, options["rawMaterials"])}
+    elif route == "/api/filters/rawMaterials":
+        params = {"product": pick(rng, options["products"])}
+    elif route == "/api/chat/query":
+        return route, {"question": rng.choice(CHAT_QUESTIONS)}
+
+    params = {k: v for k, v in params.items() if v != "all"}
+    return (f"{route}?{urllib.parse.urlencode(params)}" if params else route), None
+
+
+def client(base_url, deadline, recorder, rng, options):
+    routes, weights = list(ROUTE_WEIGHTS), list(ROUTE_WEIGHTS.values())
+    while time.time() < deadline:
+        route = rng.choices(routes, weights)[0]
+        path, body = build_request(route, rng, options)
+        ok, seconds = request(base_url + path, body)
+        recorder.record(route, seconds, ok)
+
+
+def run_load(base_url, clients, seconds, seed, options) -> Recorder:
+    recorder = Recorder()
+    deadline = time.time() + seconds
+    threads = [
+        threading.Thread(target=client, args=(base_url, deadline, recorder, random.Random(seed + i), options))
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+# --------------------------------------------------
+# Local server
+# --------------------------------------------------
+
+def start_server(port, stub_latency, log_path):
+    env = dict(os.environ, PORT=str(port), LLM_PROVIDER="stub", LLM_STUB_LATENCY=str(stub_latency))
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, "api_server.py")],
+        cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    return process, log
+
+
+def wait_until_healthy(base_url, process=None, timeout=STARTUP_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        ok, _ = request(f"{base_url}/api/health", timeout=5)
+        if ok:
+            return True
+        time.sleep(1)
+    return False
+
+
+def fetch_filter_options(base_url) -> dict:
+    with urllib.request.urlopen(f"{base_url}/api/filters", timeout=120) as response:
+        options = json.loads(response.read())
+    for key in ("channels", "categories", "products", "rawMaterials", "skus", "stores", "forecastHorizons"):
+        options.setdefault(key, [])
+    return options
+
+
+# --------------------------------------------------
+# Report and baseline
+# --------------------------------------------------
+
+def summarize(recorder, seconds) -> dict:
+    """{route: {"requests", "errors", "rps", "p50Ms", "p95Ms", "p99Ms"}}."""
+    results = {}
+    for route, values in sorted(recorder.latencies.items()):
+        results[route] = {
+            "requests": len(values),
+            "errors": recorder.errors[route],
+            "rps": round(len(values) / seconds, 2),
+            "p50Ms": round(percentile(values, 50) * 1000, 1),
+            "p95Ms": round(percentile(values, 95) * 1000, 1),
+            "p99Ms": round(percentile(values, 99) * 1000, 1),
+        }
+    return results
+
+
+def print_report(results, seconds):
+    total = sum(r["requests"] for r in results.values())
+    print(f"{total} requests in {seconds:.0f}s ({total / seconds:.1f} req/s)")
+    print(f"{'route':<34} {'requests':>8} {'errors':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in results.items():
+        print(
+            f"{route:<34} {r['requests']:>8} {r['errors']:>6} {r['rps']:>7.1f} "
+            f"{r['p50Ms']:>8.1f} {r['p95Ms']:>8.1f} {r['p99Ms']:>8.1f}"
+        )
+
+
+def find_regressions(results, baseline, tolerance, min_requests=MIN_COMPARED_REQUESTS) -> list:
+    regressions = []
+    for route, base in baseline["routes"].items():
+        current = results.get(route)
+        if current is None or min(current["requests"], base["requests"]) < min_requests:
+            continue
+        if current["p95Ms"] > base["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {current['p95Ms']} ms (baseline {base['p95Ms']} ms)")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: {current['rps']} req/s (baseline {base['rps']} req/s)")
+        error_rate = current["errors"] / max(current["requests"], 1)
+        base_error_rate = base["errors"] / max(base["requests"], 1)
+        if error_rate > base_error_rate:
+            regressions.append(f"{route}: error rate {error_rate:.1%} (baseline {base_error_rate:.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=5099, help="port for the local server")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=10, help="unrecorded load before measuring")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stub-latency", type=float, default=0.8, help="seconds per stub LLM call")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 / throughput change")
+    args = parser.parse_args()
+
+    process = log = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        log_path = os.path.join(tempfile.gettempdir(), f"woodland_load_test_{args.port}.log")
+        print(f"Starting api_server.py on port {args.port} (log: {log_path})")
+        process, log = start_server(args.port, args.stub_latency, log_path)
+
+    try:
+        if not wait_until_healthy(base_url, process):
+            print(f"{base_url} did not become healthy")
+            sys.exit(1)
+        options = fetch_filter_options(base_url)
+
+        if args.warmup > 0:
+            run_load(base_url, args.clients, args.warmup, args.seed - 1000, options)
+        recorder = run_load(base_url, args.clients, args.seconds, args.seed, options)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+            log.close()
+
+    results = summarize(recorder, args.seconds)
+    print(f"{args.clients} clients, seed {args.seed}")
+    print_report(results, args.seconds)
+
+    run = {
+        "clients": args.clients,
+        "seconds": args.seconds,
+        "seed": args.seed,
+        "stubLatency": args.stub_latency,
+        "routes": results,
+    }
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with (run with --save-baseline)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline["clients"], baseline["seed"]) != (args.clients, args.seed):
+        print(f"Warning: baseline used {baseline['clients']} clients, seed {baseline['seed']}")
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
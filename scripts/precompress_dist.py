@@ -0,0 +1,89 @@
+"""
+Precompress the built frontend for the API's static serving.
+
+Run after `npm run build` in Woodland/:
+
+  python3 scripts/precompress_dist.py
+
+Writes <file>.gz (and <file>.br when the optional brotli package is
+installed) next to every compressible file in Woodland/dist larger than
+MIN_BYTES, skipping variants that are already newer than their source
+and ones that would not be smaller. The API picks them up on restart
+(see static_assets.py).
+"""
+
+import argparse
+import gzip
+import mimetypes
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from static_assets import ENCODINGS, is_compressible  # noqa: E402
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+DIST_DIR = os.path.join(BASE_DIR, "Woodland", "dist")
+MIN_BYTES = 1024
+
+COMPRESSORS = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=11)
+
+
+def precompress(dist_dir: str, force: bool = False) -> dict:
+    """{encoding: files written}."""
+    written = {encoding: 0 for encoding in COMPRESSORS}
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            if name.endswith(suffixes):
+                continue
+            path = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(name)[0] or ""
+            if not is_compressible(mimetype) or os.path.getsize(path) < MIN_BYTES:
+                continue
+
+            with open(path, "rb") as f:
+                data = f.read()
+            for encoding, suffix in ENCODINGS:
+                if encoding not in COMPRESSORS:
+                    continue
+                target = path + suffix
+                if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                compressed = COMPRESSORS[encoding](data)
+                if len(compressed) >= len(data):
+                    continue
+                with open(target, "wb") as f:
+                    f.write(compressed)
+                written[encoding] += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dist", default=DIST_DIR)
+    parser.add_argument("--force", action="store_true", help="rewrite up-to-date variants")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dist):
+        print(f"{args.dist} not found; run `npm run build` in Woodland first.")
+        sys.exit(1)
+
+    written = precompress(args.dist, force=args.force)
+    for encoding, count in written.items():
+        print(f"{encoding}: {count} file(s) written")
+    if brotli is None:
+        print("brotli not installed: only .gz variants written (pip install brotli)")
+
+
+if __name__ == "__main__":
+    main()
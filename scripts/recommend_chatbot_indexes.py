@@ -0,0 +1,61 @@
+"""
+Index recommendations for chatbot.db from the chatbot query log.
+
+Every chatbot query is logged with its EXPLAIN QUERY PLAN to
+Text2SQL_V2/query_log.jsonl (CHATBOT_QUERY_LOG). This script counts the
+recurring full-scan patterns, (table, filtered columns), and prints the
+index that would serve each:
+
+  python3 scripts/recommend_chatbot_indexes.py --min-scans 5
+
+--apply creates them in chatbot.db. Indexes created this way are lost
+when the table is rebuilt from a changed CSV; add the ones worth keeping
+to TABLE_INDEXES in Text2SQL_V2/core/db_builder.py.
+"""
+
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from Text2SQL_V2.config import config  # noqa: E402
+from Text2SQL_V2.core.db_builder import open_connection, write_transaction  # noqa: E402
+from Text2SQL_V2.utils.query_log import read_scans, recommend  # noqa: E402
+
+DB_PATH = os.path.join(BASE_DIR, "Text2SQL_V2", "chatbot.db")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=config.QUERY_LOG_PATH)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--min-scans", type=int, default=config.AUTO_INDEX_MIN_SCANS)
+    parser.add_argument("--apply", action="store_true", help="create the recommended indexes")
+    args = parser.parse_args()
+
+    if not args.log or not os.path.exists(args.log):
+        print(f"No query log at {args.log!r} (set CHATBOT_QUERY_LOG and run some chatbot queries)")
+        sys.exit(1)
+
+    recommendations = recommend(read_scans(args.log), args.min_scans)
+    if not recommendations:
+        print(f"No scan pattern seen {args.min_scans}+ times in {args.log}")
+        return
+
+    for r in recommendations:
+        print(f"{r['queries']:>6} queries scan {r['table']} on {', '.join(r['columns'])}")
+        print(f"       {r['sql']};")
+
+    if args.apply:
+        conn = open_connection(args.db)
+        with write_transaction(conn):
+            for r in recommendations:
+                conn.execute(r["sql"])
+        conn.close()
+        print(f"Created {len(recommendations)} index(es) in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,11 +19,22 @@ Daily forecasts for 2025-12-31 to 2026-01-29 (30-day)
 NOTE:
 This IS daily forecasting (not horizon-aggregated).
 Provides granular daily demand predictions.
+
+Backtest mode:
+python sku_forecast.py --backtest --cutoffs 2025-12-07,2025-12-21,2026-01-04
+
+Re-fits the model for every (cutoff, SKU) pair on the history up to the
+cutoff, in a process pool, and scores the next 7/30 days against actuals.
+Output: reports/sku_forecast_backtest.csv (WAPE / MAPE / bias per SKU and
+horizon), kept out of datasets/ so the API and chatbot never load it.
 """
 
 import pandas as pd
+import numpy as np
 from statsmodels.tsa.statespace.sarimax import SARIMAX
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
+import argparse
 import warnings
 import os
 
@@ -41,10 +52,18 @@ SOURCE_FILE = os.path.join(DATASETS_DIR, "sku_daily_sales.csv")
 OUTPUT_FILE_7DAY = os.path.join(DATASETS_DIR, "sku_daily_forecast_7day.csv")
 OUTPUT_FILE_30DAY = os.path.join(DATASETS_DIR, "sku_daily_forecast_30day.csv")
 OUTPUT_FILE_COMBINED = os.path.join(DATASETS_DIR, "sku_daily_forecast.csv")
+REPORTS_DIR = os.path.join(BASE_DIR, "reports")
+
+BACKTEST_OUTPUT_FILE = os.path.join(REPORTS_DIR, "sku_forecast_backtest.csv")
 
 # Forecast horizons
 FORECAST_HORIZONS = [7, 30]
 
+# Model configuration
+SARIMAX_ORDER = (1, 1, 1)
+SARIMAX_SEASONAL_ORDER = (1, 1, 1, 7)
+MIN_HISTORY_DAYS = 30
+
 
 # --------------------------------------------------
 # Load Data
@@ -72,6 +91,46 @@ def load_data(filepath: str) -> pd.DataFrame:
     return df
 
 
+# --------------------------------------------------
+# Shared Model Helpers
+# --------------------------------------------------
+
+def aggregate_sku_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """Sum store-level sales to one row per (sku_id, date)."""
+    return (
+        df.groupby(["sku_id", "date"], as_index=False)["actual_sales_units"]
+        .sum()
+    )
+
+
+def build_sku_series(sku_daily: pd.DataFrame) -> dict:
+    """
+    Split the SKU daily aggregate into one date-indexed series per SKU.
+
+    Returns:
+        dict: {sku_id: Series of actual_sales_units sorted by date}
+    """
+    return {
+        sku_id: group.sort_values("date").set_index("date")["actual_sales_units"]
+        for sku_id, group in sku_daily.groupby("sku_id", sort=False)
+    }
+
+
+def fit_forecast(ts: pd.Series, steps: int) -> pd.Series:
+    """Fit the SKU model on a history series and forecast `steps` days (non-negative)."""
+    model = SARIMAX(
+        ts,
+        order=SARIMAX_ORDER,
+        seasonal_order=SARIMAX_SEASONAL_ORDER,
+        enforce_stationarity=False,
+        enforce_invertibility=False
+    )
+
+    model_fit = model.fit(disp=False)
+
+    return model_fit.forecast(steps=steps).clip(lower=0)
+
+
 # --------------------------------------------------
 # Daily Forecast Logic
 # --------------------------------------------------
@@ -96,10 +155,7 @@ def generate_daily_forecasts(df: pd.DataFrame) -> dict:
     # ----------------------------------
     # Step 1: SKU daily aggregation
     # ----------------------------------
-    sku_daily = (
-        df.groupby(["sku_id", "date"], as_index=False)["actual_sales_units"]
-        .sum()
-    )
+    sku_daily = aggregate_sku_daily(df)
 
     # ----------------------------------
     # Step 2: Store contribution weights
@@ -127,43 +183,21 @@ def generate_daily_forecasts(df: pd.DataFrame) -> dict:
     
     print(f"\nForecasting {sku_daily['sku_id'].nunique()} SKUs...")
     
-    skus = sku_daily["sku_id"].unique()
+    sku_series = build_sku_series(sku_daily)
     processed = 0
     failed = 0
     
-    for sku_id in skus:
-        group = sku_daily[sku_daily["sku_id"] == sku_id]
-        
-        ts = (
-            group.sort_values("date")
-            .set_index("date")["actual_sales_units"]
-        )
-
+    for sku_id, ts in sku_series.items():
         # Minimum data sufficiency
-        if len(ts) < 30:
+        if len(ts) < MIN_HISTORY_DAYS:
             failed += 1
             continue
 
         try:
-            model = SARIMAX(
-                ts,
-                order=(1, 1, 1),
-                seasonal_order=(1, 1, 1, 7),
-                enforce_stationarity=False,
-                enforce_invertibility=False
-            )
-
-            model_fit = model.fit(disp=False)
-
             # ----------------------------------
-            # Forecast daily values for max horizon
+            # Forecast daily values for max horizon (non-negative)
             # ----------------------------------
-            daily_forecast = model_fit.forecast(steps=max_horizon)
-            
-            # Ensure non-negative forecasts
-            daily_forecast = daily_forecast.clip(lower=0)
-            
-            sku_forecasts[sku_id] = daily_forecast
+            sku_forecasts[sku_id] = fit_forecast(ts, max_horizon)
             processed += 1
 
         except Exception as e:
@@ -220,6 +254,145 @@ def generate_daily_forecasts(df: pd.DataFrame) -> dict:
     return results
 
 
+# --------------------------------------------------
+# Rolling-Origin Backtest
+# --------------------------------------------------
+
+# Per-worker copy of the SKU series, installed once by the pool initializer
+# so tasks only carry (cutoff, sku_id) instead of the history itself.
+_BACKTEST_SERIES = {}
+
+
+def _init_backtest_worker(sku_series: dict):
+    global _BACKTEST_SERIES
+    _BACKTEST_SERIES = sku_series
+    warnings.filterwarnings("ignore")
+
+
+def _backtest_one(cutoff: pd.Timestamp, sku_id: str, horizons: list) -> list:
+    """
+    Fit on history up to `cutoff` and score each horizon against actuals.
+
+    Returns one row of additive error sums per horizon so results can be
+    rolled up across cutoffs. Horizons whose window runs past the last
+    actual are skipped; returns [] when the SKU cannot be evaluated.
+    """
+    ts = _BACKTEST_SERIES[sku_id]
+    history = ts[ts.index <= cutoff]
+
+    # Only score horizons whose own window has actuals
+    horizons = [h for h in horizons if ts.index.max() >= cutoff + timedelta(days=h)]
+    if len(history) < MIN_HISTORY_DAYS or not horizons:
+        return []
+    max_horizon = max(horizons)
+
+    try:
+        forecast = fit_forecast(history, max_horizon).to_numpy()
+    except Exception as e:
+        print(f"  Backtest failed for SKU={sku_id} cutoff={cutoff.date()}: {e}")
+        return []
+
+    window = pd.date_range(cutoff + timedelta(days=1), periods=max_horizon, freq="D")
+    actual = ts.reindex(window, fill_value=0).to_numpy(dtype=float)
+
+    rows = []
+    for horizon in horizons:
+        a = actual[:horizon]
+        f = forecast[:horizon]
+        nonzero = a > 0
+        rows.append({
+            "cutoff_date": cutoff.strftime("%Y-%m-%d"),
+            "sku_id": sku_id,
+            "forecast_horizon": f"{horizon}day",
+            "actual_units": a.sum(),
+            "forecast_units": f.sum(),
+            "abs_error": np.abs(f - a).sum(),
+            "ape_sum": (np.abs(f[nonzero] - a[nonzero]) / a[nonzero]).sum(),
+            "ape_days": int(nonzero.sum()),
+        })
+    return rows
+
+
+def _score(group: pd.DataFrame) -> pd.Series:
+    actual = group["actual_units"].sum()
+    forecast = group["forecast_units"].sum()
+    ape_days = group["ape_days"].sum()
+    return pd.Series({
+        "cutoffs": group["cutoff_date"].nunique(),
+        "actual_units": round(actual, 2),
+        "forecast_units": round(forecast, 2),
+        "wape_pct": round(group["abs_error"].sum() / actual * 100, 2) if actual > 0 else np.nan,
+        "mape_pct": round(group["ape_sum"].sum() / ape_days * 100, 2) if ape_days > 0 else np.nan,
+        "bias_pct": round((forecast - actual) / actual * 100, 2) if actual > 0 else np.nan,
+    })
+
+
+def run_backtest(df: pd.DataFrame, cutoffs: list, horizons: list = FORECAST_HORIZONS,
+                 workers: int = None) -> pd.DataFrame:
+    """
+    Rolling-origin backtest over every (cutoff, SKU) pair.
+
+    The SKU series are aggregated once here and shared with the pool
+    workers; each task re-fits the production model on the truncated
+    history. Error sums are pooled across cutoffs before scoring.
+
+    Returns:
+        DataFrame: sku_id, forecast_horizon, cutoffs, actual_units,
+        forecast_units, wape_pct, mape_pct, bias_pct
+        (plus one "ALL" row per horizon)
+    """
+    sku_series = build_sku_series(aggregate_sku_daily(df))
+    cutoffs = [pd.Timestamp(c) for c in cutoffs]
+    tasks = [(cutoff, sku_id) for cutoff in cutoffs for sku_id in sku_series]
+
+    print(f"Backtesting {len(sku_series)} SKUs x {len(cutoffs)} cutoffs = {len(tasks)} fits...")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_backtest_worker,
+        initargs=(sku_series,)
+    ) as pool:
+        futures = [pool.submit(_backtest_one, cutoff, sku_id, horizons) for cutoff, sku_id in tasks]
+        rows = [row for future in futures for row in future.result()]
+
+    columns = ["sku_id", "forecast_horizon", "cutoffs", "actual_units",
+               "forecast_units", "wape_pct", "mape_pct", "bias_pct"]
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    errors = pd.DataFrame(rows)
+    per_sku = errors.groupby(["sku_id", "forecast_horizon"]).apply(_score).reset_index()
+    overall = errors.groupby("forecast_horizon").apply(_score).reset_index()
+    overall.insert(0, "sku_id", "ALL")
+
+    report = pd.concat([per_sku, overall], ignore_index=True)
+    report["cutoffs"] = report["cutoffs"].astype(int)
+    return report[columns]
+
+
+def backtest_main(cutoffs: list, workers: int = None):
+    print("=" * 60)
+    print("SKU FORECAST BACKTEST (ROLLING ORIGIN)")
+    print("=" * 60)
+    print()
+
+    print("Loading SKU sales data...")
+    sales_df = load_data(SOURCE_FILE)
+    print(f"  Loaded {len(sales_df)} rows")
+
+    report = run_backtest(sales_df, cutoffs, workers=workers)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    report.to_csv(BACKTEST_OUTPUT_FILE, index=False)
+
+    print(f"\nOutput: {BACKTEST_OUTPUT_FILE}")
+    print(f"  Rows: {len(report)}")
+
+    print("\n--- Overall Accuracy ---")
+    for _, row in report[report["sku_id"] == "ALL"].iterrows():
+        print(f"  {row['forecast_horizon']}: WAPE={row['wape_pct']}%  "
+              f"MAPE={row['mape_pct']}%  Bias={row['bias_pct']}%")
+
+
 # --------------------------------------------------
 # Main
 # --------------------------------------------------
@@ -295,4 +468,19 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="SKU daily-level forecasting")
+    parser.add_argument("--backtest", action="store_true",
+                        help="Run a rolling-origin backtest instead of the forecast")
+    parser.add_argument("--cutoffs", default="",
+                        help="Comma-separated backtest cutoff dates (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Backtest worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.backtest:
+        cutoff_dates = [c.strip() for c in args.cutoffs.split(",") if c.strip()]
+        if not cutoff_dates:
+            parser.error("--backtest requires --cutoffs")
+        backtest_main(cutoff_dates, workers=args.workers)
+    else:
+        main()
@@ -0,0 +1,156 @@
+"""
+Static Assets (API Serving Layer)
+
+Purpose:
+Serve the built frontend (Woodland/dist) without touching the
+filesystem per request for lookups, and with the smallest encoding the
+client accepts.
+
+Manifest:
+Built once per process (at startup or first use): every file's
+mimetype, cache policy and precompressed siblings. Requests are answered from the
+manifest, so unknown paths never hit the disk, and index.html (the SPA
+fallback) is held in memory with its gzip form. A new frontend build is
+picked up on restart.
+
+Precompressed variants:
+<file>.br and <file>.gz next to an asset are served when the request's
+Accept-Encoding allows them (br preferred), with Vary: Accept-Encoding.
+scripts/precompress_dist.py writes them after `npm run build`.
+
+Caching:
+Vite names bundles with a content hash (assets/index-B1x2c3d4.js); those
+are sent with Cache-Control: public, max-age=31536000, immutable.
+Everything else, including index.html, is revalidated (no-cache).
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+
+from flask import Response, send_file
+from werkzeug.http import parse_accept_header
+
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+
+# Encodings in preference order: (Accept-Encoding token, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Content-hashed build output, e.g. assets/index-B1x2c3d4.js
+HASHED_ASSET_PATTERN = re.compile(r"^assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def is_compressible(mimetype: str) -> bool:
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    mimetype: str
+    immutable: bool
+    variants: dict = field(default_factory=dict)  # {encoding: file path}
+
+
+# --------------------------------------------------
+# Manifest
+# --------------------------------------------------
+
+class StaticManifest:
+    def __init__(self, dist_dir: str):
+        self.dist_dir = dist_dir
+        self.assets = {}  # {relative path with "/": StaticAsset}
+        self.index_html = None
+        self.index_html_gzip = None
+        self.index_etag = None
+
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for root, _, files in os.walk(dist_dir):
+            names = set(files)
+            for name in files:
+                if name.endswith(suffixes) and name.rsplit(".", 1)[0] in names:
+                    continue  # a variant, attached to its original below
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, dist_dir).replace(os.sep, "/")
+                mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                asset = StaticAsset(
+                    path=full_path,
+                    mimetype=mimetype,
+                    immutable=bool(HASHED_ASSET_PATTERN.match(rel_path)),
+                )
+                for encoding, suffix in ENCODINGS:
+                    if name + suffix in names:
+                        asset.variants[encoding] = full_path + suffix
+                self.assets[rel_path] = asset
+
+        index = self.assets.get("index.html")
+        if index is not None:
+            with open(index.path, "rb") as f:
+                self.index_html = f.read()
+            self.index_html_gzip = gzip.compress(self.index_html, compresslevel=9)
+            self.index_etag = hashlib.sha1(self.index_html).hexdigest()
+
+    def __len__(self):
+        return len(self.assets)
+
+    def stats(self) -> dict:
+        return {
+            "assets": len(self.assets),
+            "immutable": sum(1 for a in self.assets.values() if a.immutable),
+            "precompressed": sum(1 for a in self.assets.values() if a.variants),
+            "indexHtmlBytes": len(self.index_html or b""),
+        }
+
+
+# --------------------------------------------------
+# Serving
+# --------------------------------------------------
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Content codings the client accepts (q > 0)."""
+    accepted = parse_accept_header(accept_encoding or "")
+    return {value.lower() for value, quality in accepted if quality > 0}
+
+
+def serve_index(manifest: StaticManifest, request) -> Response:
+    """index.html from memory (gzip when accepted)."""
+    if "gzip" in accepted_encodings(request.headers.get("Accept-Encoding")):
+        response = Response(manifest.index_html_gzip, mimetype="text/html")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(manifest.index_html, mimetype="text/html")
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    response.set_etag(f"{manifest.index_etag}-{response.headers.get('Content-Encoding', 'identity')}")
+    return response.make_conditional(request)
+
+
+def serve_asset(asset: StaticAsset, request) -> Response:
+    """One manifest asset, in the best precompressed encoding accepted."""
+    path, encoding = asset.path, None
+    if asset.variants:
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+        for candidate, _ in ENCODINGS:
+            if candidate in asset.variants and candidate in accepted:
+                path, encoding = asset.variants[candidate], candidate
+                break
+
+    # The ETag comes from the file actually sent, so each encoding has its own
+    response = send_file(path, mimetype=asset.mimetype, conditional=True, etag=True)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    if asset.variants:
+        response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+    return response
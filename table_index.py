@@ -0,0 +1,126 @@
+"""
+Table Index (API Serving Layer)
+
+Purpose:
+Serve large table endpoints page by page without re-sorting or scanning
+the whole table on every request.
+
+Built once per dataset version (see DatasetCache.derive):
+- sort orders: row positions sorted by each sortable column
+- ranks: inverse of each sort order (position → place in that order)
+- postings: {column: {value: ascending row positions}} for filter columns
+- date order: row positions sorted by date, for date range filters
+
+Query cost:
+- unfiltered page: O(page size) — a slice of a pre-sorted order
+- filtered page: O(matching rows) — postings lookups plus a rank sort
+  of the matches only
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class TableIndex:
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        sort_columns=(),
+        filter_columns=(),
+        date_column: str = "date",
+        default_order=None
+    ):
+        """
+        Args:
+            df: table rows, in the order the endpoint historically served them
+            sort_columns: columns a client may sort by
+            filter_columns: columns with exact-match filters
+            date_column: column used for date range filters (if present)
+            default_order: row positions for requests without a sort
+                (defaults to the frame order)
+        """
+        self.df = df.reset_index(drop=True)
+        n = len(self.df)
+
+        self.orders = {}
+        self.ranks = {}
+        for col in sort_columns:
+            if col in self.df.columns:
+                # rank rather than argsort the raw values: object columns with a
+                # missing value (str vs float NaN) are not orderable by numpy
+                rank = self.df[col].rank(method="first", na_option="bottom").to_numpy()
+                self._add_order(col, np.argsort(rank, kind="stable"))
+
+        default = np.arange(n) if default_order is None else np.asarray(default_order)
+        self._add_order(None, default)
+
+        self.postings = {}
+        for col in filter_columns:
+            if col in self.df.columns:
+                groups = self.df.groupby(col, sort=False).indices
+                self.postings[col] = {str(value): positions for value, positions in groups.items()}
+
+        self.date_column = date_column if date_column in self.df.columns else None
+        if self.date_column is not None:
+            dates = self.df[self.date_column].to_numpy()
+            self.date_order = np.argsort(dates, kind="stable")
+            self.sorted_dates = dates[self.date_order]
+
+    def _add_order(self, col, order):
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        self.orders[col] = order
+        self.ranks[col] = rank
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def select(self, filters=None, date_from=None, date_to=None):
+        """
+        Ascending row positions matching every filter, or None for all rows.
+
+        filters: {column: [values]} — a row matches if its value is any of them.
+        """
+        selected = None
+
+        for col, values in (filters or {}).items():
+            postings = self.postings.get(col)
+            if postings is None:
+                raise KeyError(col)
+            hits = [postings[v] for v in set(values) if v in postings]
+            if len(hits) == 1:
+                positions = hits[0]
+            else:
+                positions = np.unique(np.concatenate(hits)) if hits else np.array([], dtype=np.int64)
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+
+        if (date_from is not None or date_to is not None) and self.date_column is not None:
+            lo = 0 if date_from is None else self.sorted_dates.searchsorted(np.datetime64(date_from), side="left")
+            hi = len(self.sorted_dates) if date_to is None else self.sorted_dates.searchsorted(np.datetime64(date_to), side="right")
+            positions = np.sort(self.date_order[lo:hi])
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+
+        return selected
+
+    def page(self, selected=None, sort=None, descending=False, offset=0, limit=None):
+        """
+        (page frame, total matching rows) for the selection in sort order.
+
+        sort=None keeps the default order; descending reverses it.
+        """
+        if sort not in self.orders:
+            raise KeyError(sort)
+        order = self.orders[sort]
+
+        if selected is None:
+            total = len(order)
+            ordered = order[::-1] if descending else order
+        else:
+            total = len(selected)
+            ordered = selected[np.argsort(self.ranks[sort][selected], kind="stable")]
+            if descending:
+                ordered = ordered[::-1]
+
+        stop = total if limit is None else offset + limit
+        return self.df.iloc[ordered[offset:stop]], total
@@ -0,0 +1,192 @@
+import os
+
+import pytest
+
+import api_server
+
+
+@pytest.fixture
+def client():
+    api_server.RESPONSE_CACHE.clear()
+    api_server.PANEL_CACHE.clear()
+    return api_server.app.test_client()
+
+
+@pytest.fixture
+def touch_dataset():
+    """Bump a dataset file's mtime; restored afterwards."""
+    touched = {}
+
+    def touch(filename):
+        path = os.path.join(api_server.DATA_DIR, filename)
+        stat = os.stat(path)
+        touched.setdefault(path, (stat.st_atime_ns, stat.st_mtime_ns))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    yield touch
+    for path, times in touched.items():
+        os.utime(path, ns=times)
+
+
+# --------------------------------------------------
+# Consumption dashboard
+# --------------------------------------------------
+
+@pytest.mark.parametrize("query, expected", [
+    # Matches the baseline
+    ("dateRange=next-30", 10.0),
+    # Product-filtered: the baseline failed on pandas 3 (float closing
+    # inventory written into an int column) and fell back to 999
+    ("product=WL-PROD-101&dateRange=next-7", 13.0),
+    ("product=WL-PROD-101&dateRange=next-30", 12.0),
+])
+def test_consumption_days_to_stockout(client, query, expected):
+    response = client.get(f"/api/consumption/dashboard?{query}&panels=kpis")
+    assert response.status_code == 200
+    assert response.get_json()["kpis"]["daysToStockout"]["value"] == expected
+
+
+def test_consumption_product_without_bom(client):
+    # WL-PROD-126 has expanded-BOM rows with no raw material; these used
+    # to fail the integer cast of material_demand_units
+    response = client.get("/api/consumption/dashboard?product=WL-PROD-126")
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["rawMaterialRiskTable"]
+
+
+def test_dashboard_cache_expires_only_with_its_inputs(client, touch_dataset):
+    url = "/api/consumption/dashboard?panels=kpis"
+    first = client.get(url)
+    assert first.headers["X-Cache"] == "MISS"
+
+    touch_dataset("order_log.csv")
+    cached = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.status_code == 304
+
+    touch_dataset("raw_material_demand.csv")
+    assert client.get(url).headers["X-Cache"] == "MISS"
+
+
+# --------------------------------------------------
+# Sales dashboard
+# --------------------------------------------------
+
+@pytest.mark.parametrize("query", [
+    "sku=WL-SKU-001",
+    "product=WL-PROD-101",
+    "category=Casuals",
+    "category=Casuals&store=Store_03&dateRange=next-7",
+])
+def test_filtered_sales_dashboard(client, query):
+    response = client.get(f"/api/sales/dashboard?{query}")
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body["kpis"]
+    assert body["skuSalesTrend"]
+
+
+# --------------------------------------------------
+# Batch
+# --------------------------------------------------
+
+def _latency_sum(route, method="GET"):
+    """Seconds recorded so far in the request latency histogram for route."""
+    for name, labels, value in api_server.HTTP_LATENCY.samples():
+        if name.endswith("_sum") and f'route="{route}"' in labels and f'method="{method}"' in labels:
+            return value
+    return 0.0
+
+
+def test_batch_pins_one_snapshot(client, monkeypatch, touch_dataset):
+    seen = []
+    subrequest = api_server.subrequest
+
+    def recording_subrequest(path, **kwargs):
+        seen.append(api_server.DATASET_CACHE.data_version())
+        # A pipeline write mid-batch must not reach later sub-requests
+        touch_dataset("order_log.csv")
+        return subrequest(path, **kwargs)
+
+    monkeypatch.setattr(api_server, "subrequest", recording_subrequest)
+    response = client.post("/api/batch", json={"requests": [
+        "/api/consumption/dashboard?panels=kpis",
+        "/api/sales/dashboard?panels=kpis",
+        "/api/filters",
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [r["status"] for r in body["responses"]] == [200, 200, 200]
+    # Inline and worker-thread sub-requests all read the batch's snapshot
+    assert seen == [body["dataVersion"]] * 3
+
+
+def test_batch_rejects_non_get_endpoints(client):
+    response = client.post("/api/batch", json={"requests": ["/api/batch"]})
+    assert response.status_code == 400
+
+
+def test_batch_keeps_outer_request_timing(client):
+    before = _latency_sum("/api/batch", "POST")
+    dashboard_before = _latency_sum("/api/sales/dashboard")
+    response = client.post(
+        "/api/batch",
+        # The dashboard runs on a batch worker, /api/filters inline after it
+        json={"requests": ["/api/sales/dashboard?category=Casuals", "/api/filters"]},
+        headers={"X-Server-Timing": "1"},
+    )
+    assert response.status_code == 200
+    statuses = [r["status"] for r in response.get_json()["responses"]]
+    assert statuses == [200, 200]
+
+    # The batch covers its sub-requests, and their sections stay out of its header
+    batch_seconds = _latency_sum("/api/batch", "POST") - before
+    assert batch_seconds >= _latency_sum("/api/sales/dashboard") - dashboard_before
+    sections = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert sections == ["total"]
+
+
+# --------------------------------------------------
+# Debug profile
+# --------------------------------------------------
+
+def test_profile_keeps_outer_request_timing(client, monkeypatch):
+    monkeypatch.setattr(api_server, "PROFILING_ENDPOINT_ENABLED", True)
+    before = _latency_sum("/api/debug/profile")
+    response = client.get(
+        "/api/debug/profile",
+        query_string={"path": "/api/consumption/risk-table?limit=5"},
+        headers={"X-Server-Timing": "1"},
+    )
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith("GET /api/consumption/risk-table?limit=5 -> 200")
+
+    # The profiled request's sections belong to its own Server-Timing only
+    sections = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert sections == ["total"]
+    assert _latency_sum("/api/debug/profile") - before > 0.001
+
+
+# --------------------------------------------------
+# Tables
+# --------------------------------------------------
+
+def test_unknown_partition_returns_empty_page(client):
+    response = client.get("/api/sales/forecast-table?forecastHorizon=90day&sort=-forecast_units&limit=10")
+    assert response.status_code == 200
+    assert response.get_json() == {"items": [], "total": 0, "offset": 0, "limit": 10, "nextCursor": None}
+
+
+def test_table_cursor_expires_only_with_its_table(client, touch_dataset):
+    first = client.get("/api/consumption/risk-table?limit=2&sort=raw_material").get_json()
+    cursor = first["nextCursor"]
+    assert cursor
+
+    touch_dataset("order_log.csv")
+    second = client.get(f"/api/consumption/risk-table?limit=2&sort=raw_material&cursor={cursor}")
+    assert second.status_code == 200
+    assert second.get_json()["offset"] == 2
+
+    touch_dataset("raw_material_risk.csv")
+    expired = client.get(f"/api/consumption/risk-table?limit=2&sort=raw_material&cursor={cursor}")
+    assert expired.status_code == 400
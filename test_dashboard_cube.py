@@ -0,0 +1,78 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+from dashboard_cube import CUBE_DTYPES, GRAINS, build_cube, split_cube
+
+
+@pytest.fixture
+def sources():
+    sales = pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-01", "2025-01-02"],
+        "sku_id": ["S1", "S2", "S1"],
+        "store_id": ["ST1", "ST1", "ST2"],
+        "sales_channel": ["Online", "Online", "Retail"],
+        "actual_sales_units": [3, 4, 5],
+    })
+    forecast = pd.DataFrame({
+        "forecast_horizon": ["7day", "7day", "7day"],
+        "date": ["2025-01-03", "2025-01-03", "2025-01-03"],
+        "sku_id": ["S1", "S1", "S2"],
+        "store_id": ["ST1", "ST2", "ST1"],
+        "forecast_units": [2, 6, 1],
+    })
+    sku_master = pd.DataFrame({"sku_id": ["S1", "S2"], "category": ["Casuals", "Formals"]})
+    demand = pd.DataFrame({
+        "forecast_horizon": ["7day"],
+        "date": ["2025-01-03"],
+        "raw_material": ["Leather"],
+        "material_demand_units": [10],
+    })
+    bom_expanded = pd.DataFrame({
+        "forecast_horizon": ["7day", "7day", "7day"],
+        "date": ["2025-01-03", "2025-01-03", "2025-01-03"],
+        "product_id": ["P1", "P1", "P2"],
+        "raw_material": ["Leather", "Leather", None],
+        "product_units": [3, 2, 1],
+        "consumption_per_unit": [0.5, 0.5, None],
+    })
+    ledger = pd.DataFrame({"date": ["2025-01-01"], "raw_material": ["Leather"], "consumed_quantity": [7]})
+    return dict(
+        sales=sales, forecast=forecast, sku_master=sku_master,
+        demand=demand, bom_expanded=bom_expanded, ledger=ledger,
+    )
+
+
+def test_grains_are_rollups(sources):
+    grains = split_cube(build_cube(**sources))
+
+    by_channel = grains["sales_by_channel"].set_index("sales_channel")["actual_sales_units"]
+    assert by_channel.to_dict() == {"Online": 7, "Retail": 5}
+
+    by_sku = grains["forecast_by_sku"].set_index("sku_id")
+    assert by_sku["forecast_units"].to_dict() == {"S1": 8, "S2": 1}
+    assert by_sku["category"].to_dict() == {"S1": "Casuals", "S2": "Formals"}
+
+    # Rounded per row (2 + 1), products without a BOM dropped
+    product_demand = grains["product_material_demand"]
+    assert product_demand[["product_id", "material_demand_units"]].values.tolist() == [["P1", 3]]
+
+
+def test_no_store_level_grains():
+    assert all("store_id" not in spec["dims"] for spec in GRAINS.values())
+
+
+def test_csv_round_trip(sources, tmp_path):
+    cube = build_cube(**sources)
+    path = tmp_path / "dashboard_cube.csv"
+    cube.to_csv(path, index=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        restored = pd.read_csv(path, dtype=CUBE_DTYPES)
+
+    expected, actual = split_cube(cube), split_cube(restored)
+    for grain in GRAINS:
+        pd.testing.assert_frame_equal(actual[grain], expected[grain], check_dtype=False)
+        assert list(actual[grain].dtypes) == list(expected[grain].dtypes)
@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dataset_cache import DatasetCache
+
+
+def _write(path, rows, bump_ns=0):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    if bump_ns:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump_ns))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    _write(tmp_path / "sales.csv", {"date": ["2025-01-01"], "units": [1]})
+    _write(tmp_path / "other.csv", {"x": [1]})
+    return tmp_path
+
+
+@pytest.fixture
+def cache(data_dir):
+    return DatasetCache(str(data_dir), use_snapshots=False)
+
+
+def test_reloads_only_changed_files(cache, data_dir):
+    assert cache.get("sales.csv")["units"].tolist() == [1]
+    assert pd.api.types.is_datetime64_any_dtype(cache.get("sales.csv")["date"])
+    cache.get("other.csv")
+
+    _write(data_dir / "sales.csv", {"date": ["2025-01-01"], "units": [2]}, bump_ns=10**9)
+    assert cache.get("sales.csv")["units"].tolist() == [2]
+    cache.get("other.csv")
+    assert cache.stats()["reloads"] == 1
+
+
+def test_files_version_ignores_unrelated_files(cache, data_dir):
+    version, data_version = cache.files_version(("sales.csv",)), cache.data_version()
+    _write(data_dir / "other.csv", {"x": [2]}, bump_ns=10**9)
+    assert cache.files_version(("sales.csv",)) == version
+    assert cache.data_version() != data_version
+
+
+def test_derive_rebuilds_with_its_inputs(cache, data_dir):
+    builds = []
+
+    def build(df):
+        builds.append(1)
+        return int(df["units"].sum())
+
+    assert cache.derive("total", ("sales.csv",), build) == 1
+    _write(data_dir / "other.csv", {"x": [2]}, bump_ns=10**9)
+    assert cache.derive("total", ("sales.csv",), build) == 1
+    assert len(builds) == 1
+
+    _write(data_dir / "sales.csv", {"date": ["2025-01-01"], "units": [5]}, bump_ns=10**9)
+    assert cache.derive("total", ("sales.csv",), build) == 5
+    assert len(builds) == 2
+
+
+def test_pinned_snapshot_keeps_frames_and_versions(cache, data_dir):
+    with cache.pinned() as snapshot:
+        before = cache.get("sales.csv")
+        version = cache.files_version(("sales.csv",))
+        _write(data_dir / "sales.csv", {"date": ["2025-01-01"], "units": [9]}, bump_ns=10**9)
+
+        assert cache.get("sales.csv")["units"].tolist() == before["units"].tolist() == [1]
+        assert cache.files_version(("sales.csv",)) == version
+        assert cache.data_version() == snapshot.version
+
+    assert cache.get("sales.csv")["units"].tolist() == [9]
@@ -0,0 +1,90 @@
+import math
+
+import pytest
+
+import api_server
+
+pytest.importorskip("duckdb")
+
+CONSUMPTION_QUERIES = [
+    "",
+    "aggregation=weekly",
+    "channel=E-Commerce",
+    "store=Store_02&aggregation=monthly",
+    "channel=Offline Retail&store=Store_04",
+    "sku=WL-SKU-001",
+    "product=WL-PROD-101",
+    "product=WL-PROD-126",  # no BOM rows
+    "category=Casuals",
+    "rawMaterial=Leather_FG",
+    "product=WL-PROD-101&rawMaterial=Rubber_Sole",
+    "product=WL-PROD-101&rawMaterial=Metal_Zip",  # not in the product's BOM
+    "store=Store_99",  # no rows
+    "channel=E-Commerce&product=WL-PROD-101&aggregation=weekly",
+]
+
+SALES_QUERIES = [
+    "",
+    "rollingWindow=30",
+    "channel=E-Commerce",
+    "store=Store_03",
+    "sku=WL-SKU-001",
+    "product=WL-PROD-101",
+    "category=Casuals&channel=Offline Retail",
+    "category=Casuals&store=Store_03&rollingWindow=30",
+]
+
+
+def _dashboard(client, monkeypatch, engine, url):
+    monkeypatch.setattr(api_server, "DASHBOARD_ENGINE", engine)
+    api_server.RESPONSE_CACHE.clear()
+    api_server.PANEL_CACHE.clear()
+    response = client.get(url)
+    assert response.status_code == 200, (engine, response.get_json())
+    return response.get_json()
+
+
+def assert_same(expected, actual, path=""):
+    """Equal JSON; floats to 1e-9 (sums may run in a different order)."""
+    assert type(expected) is type(actual), (path, expected, actual)
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys(), path
+        for key in expected:
+            assert_same(expected[key], actual[key], f"{path}/{key}")
+    elif isinstance(expected, list):
+        assert len(expected) == len(actual), path
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            assert_same(e, a, f"{path}[{i}]")
+    elif isinstance(expected, float):
+        assert math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9), (path, expected, actual)
+    else:
+        assert expected == actual, (path, expected, actual)
+
+
+@pytest.fixture
+def client():
+    yield api_server.app.test_client()
+    api_server.RESPONSE_CACHE.clear()
+    api_server.PANEL_CACHE.clear()
+
+
+@pytest.mark.parametrize("date_range", ["next-7", "next-30"])
+@pytest.mark.parametrize("query", CONSUMPTION_QUERIES)
+def test_consumption_engines_match(client, monkeypatch, query, date_range):
+    url = f"/api/consumption/dashboard?{query}&dateRange={date_range}"
+    expected = _dashboard(client, monkeypatch, "pandas", url)
+    assert_same(expected, _dashboard(client, monkeypatch, "duckdb", url))
+
+
+@pytest.mark.parametrize("date_range", ["next-7", "next-30"])
+@pytest.mark.parametrize("query", SALES_QUERIES)
+def test_sales_engines_match(client, monkeypatch, query, date_range):
+    url = f"/api/sales/dashboard?{query}&dateRange={date_range}"
+    expected = _dashboard(client, monkeypatch, "pandas", url)
+    assert_same(expected, _dashboard(client, monkeypatch, "duckdb", url))
+
+
+def test_filter_values_are_bound(client, monkeypatch):
+    url = "/api/sales/dashboard?sku=x' OR '1'='1&panels=kpis"
+    body = _dashboard(client, monkeypatch, "duckdb", url)
+    assert body["kpis"]["totalForecastedUnits"]["value"] == 0
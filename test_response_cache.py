@@ -0,0 +1,32 @@
+from response_cache import ResponseCache, make_etag
+
+
+def test_hit_and_etag():
+    cache = ResponseCache()
+    assert cache.get("a") is None
+    entry = cache.put("a", b'{"x": 1}')
+    assert entry.etag == make_etag(b'{"x": 1}')
+    assert cache.get("a") is entry
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_evicts_by_bytes_and_skips_oversized_bodies():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", b"123456")
+    cache.put("b", b"123456")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("b") is not None
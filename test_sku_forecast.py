@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import sku_forecast
+
+
+def _install_series(days):
+    dates = pd.date_range("2025-10-01", periods=days, freq="D")
+    units = 20 + 5 * np.sin(np.arange(days) * 2 * np.pi / 7)
+    sku_forecast._init_backtest_worker({"S1": pd.Series(units.round(), index=dates)})
+    return dates
+
+
+def test_backtest_scores_each_horizon_against_its_own_window():
+    dates = _install_series(60)
+    # 10 days of actuals after the cutoff: enough for 7-day, not for 30-day
+    cutoff = dates[-11]
+
+    rows = sku_forecast._backtest_one(cutoff, "S1", [7, 30])
+
+    assert [row["forecast_horizon"] for row in rows] == ["7day"]
+    assert rows[0]["actual_units"] > 0
+    assert rows[0]["ape_days"] == 7
+
+
+def test_backtest_skips_cutoff_without_actuals():
+    dates = _install_series(60)
+    assert sku_forecast._backtest_one(dates[-3], "S1", [7, 30]) == []
+
+
+def test_backtest_report_is_outside_datasets():
+    report_dir = os.path.dirname(sku_forecast.BACKTEST_OUTPUT_FILE)
+    assert report_dir != sku_forecast.DATASETS_DIR
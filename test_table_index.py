@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_index import TableIndex
+
+
+@pytest.fixture
+def index():
+    df = pd.DataFrame({
+        "date": pd.to_datetime(["2025-01-03", "2025-01-01", "2025-01-02", "2025-01-04"]),
+        "material": ["Leather", np.nan, "Rubber", "Leather"],
+        "qty": [5, 7, np.nan, 1],
+    })
+    return TableIndex(df, sort_columns=df.columns, filter_columns=("material",))
+
+
+def test_sort_puts_missing_values_last(index):
+    page, total = index.page(sort="material")
+    assert total == 4
+    assert page["material"].tolist()[:3] == ["Leather", "Leather", "Rubber"]
+    assert pd.isna(page["material"].iloc[3])
+
+    page, _ = index.page(sort="qty")
+    assert page["qty"].tolist()[:3] == [1, 5, 7]
+
+
+def test_filtered_page(index):
+    selected = index.select({"material": ["Leather"]}, date_from="2025-01-02")
+    page, total = index.page(selected, sort="qty", descending=True, offset=0, limit=1)
+    assert total == 2
+    assert page["qty"].tolist() == [5]
+
+
+def test_default_order_without_sort(index):
+    page, _ = index.page(offset=1, limit=2)
+    assert page["date"].dt.strftime("%m-%d").tolist() == ["01-01", "01-02"]
+
+
+def test_empty_index_pages_like_a_populated_one(index):
+    empty = TableIndex(index.df.iloc[:0], sort_columns=index.columns, filter_columns=("material",))
+    selected = empty.select({"material": ["Leather"]}, date_from="2025-01-01")
+    page, total = empty.page(selected, sort="qty", descending=True, limit=10)
+    assert total == 0
+    assert list(page.columns) == index.columns